@@ -4,8 +4,6 @@
 import os
 import gc
 import sys
-import pyvisa
-from pyvisa.constants import StopBits, Parity
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -87,8 +85,7 @@ class Agilent_53181a:
             elif self.config['interface'] == 'rs232':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
+                    self.device = cutil.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
                     write_termination=self.config['write_termination'], baud_rate=self.config['baudrate'],
                     data_bits=self.config['databits'], parity=self.config['parity'], stop_bits=self.config['stopbits'])
                     self.device.timeout = self.config['timeout'] # in ms
@@ -120,7 +117,7 @@ class Agilent_53181a:
                         #    general.message('During internal device test errors are found')
                         #    self.status_flag = 0
                         #    sys.exit()
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         self.status_flag = 0
                         general.message("No connection")
                         sys.exit()
@@ -128,7 +125,7 @@ class Agilent_53181a:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -5,6 +5,7 @@ import os
 import gc
 import sys
 import math
+import numpy as np
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -127,6 +128,10 @@ class BH_15:
         self.field_step = None      # the field steps to be used
         self.is_init = False        # flag, set if magnet_setup() has been called
         self.max_field_dev = 0.     # maximum field deviation (in test run)
+        self.plan_fields = None     # requested fields of the sweep planned by magnet_field_plan()
+        self.plan_cf = None         # CF settings for the planned fields
+        self.plan_swa = None        # SWA settings for the planned fields
+        self.plan_sw = None         # SW setting of the planned sweep
 
         self.max_sw = self.max_sweep_width
         if self.max_sw > self.max_field - self.min_field:
@@ -365,6 +370,57 @@ class BH_15:
                     steps += 1
                 return steps*self.fc_resolution
 
+    def magnet_field_plan(self, start_field, end_field, field_step):
+        """
+        Function precomputes the CF and SWA settings for a sweep from start_field
+        to end_field with field_step. magnet_field() with one of the planned fields
+        then only writes the SWA; CF is written and the LEDs are checked only when
+        the sweep leaves the range of the current CF.
+        Returns the fields that will actually be set.
+        """
+        start_field = float(start_field)
+        end_field = float(end_field)
+        field_step = abs(float(field_step))
+        self.field_check(start_field)
+        self.field_check(end_field)
+
+        if self.test_flag != 'test':
+            if field_step < self.min_field_step:
+                general.message(f"Field sweep step size {field_step} G too small, minimum is {self.min_field_step} G.")
+                sys.exit()
+        elif self.test_flag == 'test':
+            assert(field_step >= self.min_field_step), f"Field sweep step size {field_step} G too small, \
+                minimum is {self.min_field_step} G."
+
+        points = round(abs(end_field - start_field)/field_step) + 1
+        direction = 1 if end_field >= start_field else -1
+        fields = start_field + direction*field_step*np.arange(points)
+
+        # the same sweep width as in fc_start_field()
+        sw = self.max_swa*field_step
+        if sw > self.max_sw:
+            sw /= math.ceil(sw/self.max_sw)
+        sw = self.fc_sw_resolution*round(sw/self.fc_sw_resolution)
+        swa_step = sw/self.max_swa
+
+        cf_list = np.empty(points)
+        swa_list = np.empty(points, dtype = np.int64)
+        cf = None
+        for i, field in enumerate(fields):
+            if cf is not None:
+                swa = self.center_swa + round((field - cf)/swa_step)
+            if cf is None or swa < self.min_swa or swa > self.max_swa:
+                cf, swa = self.fc_plan_center_field(field, direction, sw, swa_step)
+            cf_list[i] = cf
+            swa_list[i] = swa
+
+        self.plan_fields = fields
+        self.plan_cf = cf_list
+        self.plan_swa = swa_list
+        self.plan_sw = sw
+
+        return cf_list + (swa_list - self.center_swa)*swa_step
+
     # Auxiliary functions
     def get_field(self):
         if self.test_flag != 'test':
@@ -382,10 +438,100 @@ class BH_15:
         field = float(field)
         self.field_check(field)
 
+        if self.plan_fields is not None:
+            index = self.fc_plan_index(field)
+            if index is not None:
+                return self.fc_set_planned_field(index)
+
         if self.is_act_field != True:
             return self.fc_initial_field_setup(field)
 
         return self.fc_set_field(field)
+
+    def fc_plan_center_field(self, field, direction, sw, swa_step):
+        """
+        Function for choosing a new CF in the planned sweep. The field is put
+        at a quarter of the SWA range, so that the following fields of the sweep
+        can be set by the SWA only. The SWA offsets up to max_add_steps are
+        checked to find a CF that fits the CF resolution best.
+        """
+        swa = self.center_swa - direction*((self.max_swa + 1)//4) + \
+              np.arange(-self.max_add_steps, self.max_add_steps + 1)
+        cf_exact = field - (swa - self.center_swa)*swa_step
+        cf = self.fc_cf_resolution*np.round(cf_exact/self.fc_cf_resolution)
+
+        valid = (cf - 0.5*sw >= self.min_field) & (cf + 0.5*sw <= self.max_field)
+        if np.any(valid):
+            # the smallest offset among the ones with a deviation below 2 mG
+            deviation = np.maximum(np.abs(cf - cf_exact), 2*self.min_field_step)
+            order = np.lexsort( (np.abs(swa - swa[self.max_add_steps]), deviation, ~valid) )
+            return cf[order[0]], int(swa[order[0]])
+
+        # close to the field limits the CF is shifted inside and the CF settings
+        # nearby are checked; the SWA range is not symmetric, so the limits
+        # themselves may be slightly missed
+        cf = min(max(field, self.min_field + 0.5*sw), self.max_field - 0.5*sw)
+        cf = self.fc_cf_resolution*(round(cf/self.fc_cf_resolution) + \
+             np.arange(-self.max_add_steps, self.max_add_steps + 1))
+        cf = cf[(cf - 0.5*sw >= self.min_field) & (cf + 0.5*sw <= self.max_field)]
+        swa = np.clip(self.center_swa + np.round((field - cf)/swa_step), self.min_swa, self.max_swa)
+        achieved = cf + (swa - self.center_swa)*swa_step
+        deviation = np.where( (achieved >= self.min_field) & (achieved <= self.max_field), \
+                              np.maximum(np.abs(field - achieved), 2*self.min_field_step), np.inf )
+        # the CF that leaves more room in the sweep direction
+        best = np.lexsort( (-direction*cf, deviation) )[0]
+        cf, swa = cf[best], int(swa[best])
+
+        return cf, swa
+
+    def fc_plan_index(self, field):
+        """
+        Index of the field in the planned sweep or None. Both the requested
+        and the achieved fields returned by magnet_field_plan() are accepted.
+        """
+        points = len(self.plan_fields)
+        if points > 1:
+            index = round((field - self.plan_fields[0])/(self.plan_fields[1] - self.plan_fields[0]))
+        else:
+            index = 0
+
+        if index < 0 or index >= points:
+            return None
+
+        achieved = self.plan_cf[index] + (self.plan_swa[index] - self.center_swa)*self.plan_sw/self.max_swa
+        if abs(field - self.plan_fields[index]) < self.min_field_step or abs(field - achieved) < self.min_field_step:
+            return index
+
+        return None
+
+    def fc_set_planned_field(self, index):
+        """
+        Function for setting a field of the planned sweep with the minimal
+        number of commands.
+        """
+        cf = self.plan_cf[index]
+        swa = int(self.plan_swa[index])
+
+        if self.is_act_field != True or self.is_sw != True or abs(self.sw - self.plan_sw) > 0.5*self.fc_sw_resolution:
+            # as in fc_start_field()
+            self.fc_set_sw(0.)
+            self.cf = self.fc_set_cf(cf)
+            self.swa = self.fc_set_swa(swa)
+            self.sw = self.fc_set_sw(self.plan_sw)
+            self.fc_test_leds()
+        elif abs(self.cf - cf) >= 0.5*self.fc_cf_resolution:
+            self.swa = self.fc_set_swa(swa)
+            self.cf = self.fc_set_cf(cf)
+            self.fc_test_leds()
+        elif self.swa != swa:
+            # CF is unchanged, so there is no need to check the LEDs
+            self.swa = self.fc_set_swa(swa)
+
+        self.is_act_field = True
+        self.fc_deviation(self.plan_fields[index])
+        self.act_field = self.cf + (self.swa - self.center_swa)*self.swa_step
+
+        return self.act_field
     
     def fc_initial_field_setup(self, field):
         """
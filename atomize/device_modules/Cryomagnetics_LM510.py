@@ -4,8 +4,6 @@
 import os
 import gc
 import sys
-import pyvisa
-from pyvisa.constants import StopBits, Parity
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -57,8 +55,7 @@ class Cryomagnetics_LM510:
             if self.config['interface'] == 'ethernet':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['ethernet_address'], read_termination=self.config['read_termination'],
+                    self.device = cutil.open_resource(self.config['ethernet_address'], read_termination=self.config['read_termination'],
                     write_termination=self.config['write_termination'])
                     self.device.timeout = self.config['timeout'] # in ms
                     try:
@@ -72,7 +69,7 @@ class Cryomagnetics_LM510:
                             general.message('During internal device test errors are found')
                             self.status_flag = 0
                             sys.exit()
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
@@ -80,7 +77,7 @@ class Cryomagnetics_LM510:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -4,8 +4,6 @@
 import os
 import gc
 import sys
-import pyvisa
-from pyvisa.constants import StopBits, Parity
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -43,8 +41,7 @@ class ECC_15K:
             if self.config['interface'] == 'rs232':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['serial_address'],
+                    self.device = cutil.open_resource(self.config['serial_address'],
                     write_termination=self.config['write_termination'], read_termination=self.config['read_termination'], \
                     baud_rate=self.config['baudrate'], data_bits=self.config['databits'], parity=self.config['parity'], \
                     stop_bits=self.config['stopbits'])
@@ -53,7 +50,7 @@ class ECC_15K:
                     try:
                         # test should be here
                         self.status_flag = 1
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         self.status_flag = 0
                         general.message("No connection")
                         sys.exit()
@@ -61,7 +58,7 @@ class ECC_15K:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                         general.message("No connection")
                         sys.exit()
                 except BrokenPipeError:
@@ -4,8 +4,6 @@
 import os
 import gc
 import sys
-import pyvisa
-from pyvisa.constants import StopBits, Parity
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -72,8 +70,7 @@ class ITC_503:
             elif self.config['interface'] == 'rs232':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
+                    self.device = cutil.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
                     write_termination=self.config['write_termination'], baud_rate=self.config['baudrate'],
                     data_bits=self.config['databits'], parity=self.config['parity'], stop_bits=self.config['stopbits'])
                     self.device.timeout = self.config['timeout'] # in ms
@@ -81,7 +78,7 @@ class ITC_503:
                         # test should be here
                         self.device_write('Q0') # \r terminator
                         self.device_query('C3') # Remote and Unlocked; C1 - remote and locked
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         self.status_flag = 0
                         general.message("No connection")
                         sys.exit()
@@ -89,7 +86,7 @@ class ITC_503:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -4,7 +4,6 @@
 import os
 import gc
 import sys
-import pyvisa
 import numpy as np 
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
@@ -55,6 +54,12 @@ class Keysight_2000_Xseries:
         self.win_left = 0
         self.win_right = 1
 
+        # y_inc, y_orig, y_ref of the channels and the time resolution;
+        # they are queried once and cleared by the functions changing them
+        self.preamble_cache = {}
+        self.time_resolution_cache = 0
+        self.word_format_flag = 0
+
         # Test run parameters
         # These values are returned by the modules in the test run 
         if len(sys.argv) > 1:
@@ -64,10 +69,9 @@ class Keysight_2000_Xseries:
 
         if self.test_flag != 'test':
             if self.config['interface'] == 'ethernet':
-                rm = pyvisa.ResourceManager()
                 try:
                     self.status_flag = 1
-                    self.device = rm.open_resource(self.config['ethernet_address'])
+                    self.device = cutil.open_resource(self.config['ethernet_address'])
                     self.device.timeout = self.config['timeout'] # in ms
                     self.device.read_termination = self.config['read_termination']  # for WORD (a kind of binary) format
                     try:
@@ -147,6 +151,20 @@ class Keysight_2000_Xseries:
             self.status_flag = 0
             sys.exit()
 
+    def waveform_scaling(self, flag):
+        # the waveform source should be already set to flag
+        try:
+            return self.preamble_cache[flag]
+        except KeyError:
+            preamble = self.device_query_ascii(":WAVeform:PREamble?")
+            #x_orig = preamble[5]
+            self.preamble_cache[flag] = ( preamble[7], preamble[8], preamble[9] )
+            return self.preamble_cache[flag]
+
+    def clear_preamble(self):
+        self.preamble_cache = {}
+        self.time_resolution_cache = 0
+
     #### Device specific functions
     def oscilloscope_name(self):
         if self.test_flag != 'test':
@@ -166,11 +184,13 @@ class Keysight_2000_Xseries:
                     if int(poi) != temp:
                         general.message("Desired record length cannot be set, the nearest available value is used")
                     self.device_write(":WAVeform:POINts " + str(poi))
+                    self.clear_preamble()
                 else:
                     poi = min(self.points_list, key = lambda x: abs(x - temp))
                     if int(poi) != temp:
                         general.message("Desired record length cannot be set, the nearest available value is used")
                     self.device_write(":WAVeform:POINts " + str(poi))
+                    self.clear_preamble()
 
             elif len(points) == 0:
                 answer = int(self.device_query(':WAVeform:POINts?'))
@@ -196,6 +216,7 @@ class Keysight_2000_Xseries:
                 if at in self.ac_type_dic:
                     flag = self.ac_type_dic[at]
                     self.device_write(":ACQuire:TYPE " + str(flag))
+                    self.clear_preamble()
                 else:
                     general.message("Invalid acquisition type")
                     sys.exit()
@@ -264,6 +285,7 @@ class Keysight_2000_Xseries:
                     coef = self.timebase_dict[scaling]
                     if tb/coef >= self.timebase_min and tb/coef <= self.timebase_max:
                         self.device_write(":TIMebase:RANGe "+ str(tb/coef))
+                        self.clear_preamble()
                     else:
                         general.message("Incorrect timebase range")
                         sys.exit()                        
@@ -295,8 +317,10 @@ class Keysight_2000_Xseries:
 
     def oscilloscope_time_resolution(self):
         if self.test_flag != 'test':
-            points = int(self.oscilloscope_record_length())
-            answer = 1000000*float(self.device_query(":TIMebase:RANGe?"))/points
+            if self.time_resolution_cache == 0:
+                points = int(self.oscilloscope_record_length())
+                self.time_resolution_cache = 1000000*float(self.device_query(":TIMebase:RANGe?"))/points
+            answer = self.time_resolution_cache
             return answer
         elif self.test_flag == 'test':
             answer = 1000000*float(self.test_timebase)/self.test_record_length
@@ -306,6 +330,10 @@ class Keysight_2000_Xseries:
         if self.test_flag != 'test':
             #start_time = datetime.now()
             self.device_write(':WAVeform:FORMat WORD')
+            if self.word_format_flag == 0:
+                # the preamble depends on the format
+                self.clear_preamble()
+                self.word_format_flag = 1
             self.device_write('*ESR?;:DIGitize;*OPC?') # return 1, if everything is ok; #;*OPC?
             # the whole sequence is the following 1-binary format; 2-clearing; 3-digitizing; 4-checking of the completness
             #end_time=datetime.now()
@@ -368,11 +396,7 @@ class Keysight_2000_Xseries:
                 if flag[0] == 'C' and int(flag[-1]) <= self.analog_channels:
                     self.device_write(':WAVeform:SOURce ' + str(flag))
                     array_y = self.device_read_binary(':WAVeform:DATA?')
-                    preamble = self.device_query_ascii(":WAVeform:PREamble?")
-                    #x_orig = preamble[5]
-                    y_inc = preamble[7]
-                    y_orig = preamble[8]
-                    y_ref = preamble[9]
+                    y_inc, y_orig, y_ref = self.waveform_scaling(flag)
                     #print(y_inc)
                     #print(y_orig)
                     #print(y_ref)
@@ -414,6 +438,46 @@ class Keysight_2000_Xseries:
                     xs = np.arange( len(array_y) ) * ( 10**(-6) * self.oscilloscope_time_resolution() )
                     return xs, array_y, integ
 
+    def oscilloscope_get_curves(self, *channels):
+        if self.test_flag != 'test':
+            flags = []
+            for channel in channels:
+                ch = str(channel)
+                if ch in self.channel_dict and self.channel_dict[ch][0] == 'C' and \
+                                        int(self.channel_dict[ch][-1]) <= self.analog_channels:
+                    flags.append( self.channel_dict[ch] )
+                else:
+                    general.message("Invalid channel is given")
+                    sys.exit()
+
+            if len(flags) == 0:
+                general.message("Invalid argument")
+                sys.exit()
+
+            raw_data = []
+            scaling = []
+            for flag in flags:
+                self.device_write(':WAVeform:SOURce ' + str(flag))
+                raw_data.append( self.device_read_binary(':WAVeform:DATA?') )
+                scaling.append( self.waveform_scaling(flag) )
+
+            # y_inc, y_orig, y_ref as columns for all channels at once
+            y_inc, y_orig, y_ref = np.asarray(scaling).T[:, :, np.newaxis]
+            array_y = (np.asarray(raw_data) - y_ref)*y_inc + y_orig
+            return array_y
+
+        elif self.test_flag == 'test':
+            assert(len(channels) > 0), 'Invalid argument'
+            for channel in channels:
+                ch = str(channel)
+                assert(ch in self.channel_dict), 'Invalid channel is given'
+                flag = self.channel_dict[ch]
+                if flag[0] == 'C' and int(flag[-1]) > self.analog_channels:
+                    assert(1 == 2), 'Invalid channel is given'
+
+            array_y = np.tile( np.arange(self.test_record_length), (len(channels), 1) )
+            return array_y
+
     def oscilloscope_sensitivity(self, *channel):
         if self.test_flag != 'test':
             if len(channel) == 2:
@@ -428,6 +492,7 @@ class Keysight_2000_Xseries:
                             flag = self.channel_dict[ch]
                             if flag[0] == 'C' and int(flag[-1]) <= self.analog_channels:
                                 self.device_write(':' + str(flag) + ':SCALe ' + str(val/coef))
+                                self.clear_preamble()
                             else:
                                 general.message("Invalid channel is given")
                                 sys.exit()
@@ -499,6 +564,7 @@ class Keysight_2000_Xseries:
                         flag = self.channel_dict[ch]
                         if flag[0] == 'C' and int(flag[-1]) <= self.analog_channels:
                             self.device_write(':' + str(flag) + ':OFFSet ' + str(val/coef))
+                            self.clear_preamble()
                         else:
                             general.message("Invalid channel is given")
                             sys.exit()
@@ -558,6 +624,7 @@ class Keysight_2000_Xseries:
                 if scaling in self.timebase_dict:
                     coef = self.timebase_dict[scaling]
                     self.device_write(":TIMebase:DELay "+ str(offset/coef))
+                    self.clear_preamble()
                 else:
                     general.message("Incorrect horizontal offset")
                     sys.exit()
@@ -812,6 +879,9 @@ class Keysight_2000_Xseries:
     def oscilloscope_command(self, command):
         if self.test_flag != 'test':
             self.device_write(command)
+            # any setting can be changed
+            self.clear_preamble()
+            self.word_format_flag = 0
         elif self.test_flag == 'test':
             pass
 
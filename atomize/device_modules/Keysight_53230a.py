@@ -4,8 +4,6 @@
 import os
 import gc
 import sys
-import pyvisa
-from pyvisa.constants import StopBits, Parity
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -76,8 +74,7 @@ class Keysight_53230a:
             elif self.config['interface'] == 'rs232':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
+                    self.device = cutil.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
                     write_termination=self.config['write_termination'], baud_rate=self.config['baudrate'],
                     data_bits=self.config['databits'], parity=self.config['parity'], stop_bits=self.config['stopbits'])
                     self.device.timeout = self.config['timeout'] # in ms
@@ -98,7 +95,7 @@ class Keysight_53230a:
                         #    general.message('During internal device test errors are found')
                         #    self.status_flag = 0
                         #    sys.exit()
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         self.status_flag = 0
                         general.message("No connection")
                         sys.exit()
@@ -106,7 +103,7 @@ class Keysight_53230a:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -118,8 +115,7 @@ class Keysight_53230a:
             elif self.config['interface'] == 'ethernet':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['ethernet_address'])
+                    self.device = cutil.open_resource(self.config['ethernet_address'])
                     self.device.timeout = self.config['timeout'] # in ms
                     try:
                         # test should be here
@@ -138,7 +134,7 @@ class Keysight_53230a:
                         #    general.message('During internal device test errors are found')
                         #    self.status_flag = 0
                         #    sys.exit()
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         self.status_flag = 0
                         general.message("No connection")
                         sys.exit()
@@ -147,7 +143,7 @@ class Keysight_53230a:
                         self.status_flag = 0
                         sys.exit()ag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
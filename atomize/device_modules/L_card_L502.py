@@ -6,6 +6,7 @@ import gc
 import sys
 import time
 import ctypes
+import threading
 import numpy as np
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
@@ -161,18 +162,26 @@ class L_card_L502:
             self.log_channels = 1 # number of logical channels
             self.interframe_delay = 0 # interframe delay
 
-            # define the buffers
-            self.recv_buffer = np.zeros( self.points, dtype = np.uint32 )
-            self.buffer = np.zeros( self.points, dtype = np.double )
+            # ring buffer of the received blocks in volts; one block is self.points words
+            # it is filled by the receiver thread started in digitizer_setup()
+            self.ring_blocks = 64
+            self.ring_buffer = np.zeros( (self.ring_blocks, self.points), dtype = np.double )
+            # number of blocks written since the start of the stream
+            self.ring_count = 0
+            self.ring_condition = threading.Condition()
+            # next block for digitizer_get_curve()
+            self.read_count = 0
+            self.receiver = None
+            self.receiver_stop = threading.Event()
+            self.receiver_error = 0
+            # timeout in ms
+            self.receiver_timeout = 2000
 
             # state counter
             self.state = 0
 
             # change of settings
             self.setting_change_count = 0
-            
-            # get_curve counter
-            self.get_curve_counter = 0
 
         elif self.test_flag == 'test':        
             self.test_ref_clock = '2 MHz'
@@ -181,11 +190,8 @@ class L_card_L502:
             self.test_points = 128
             self.test_log_channels = 1
             self.interframe_delay = 0
-
-
-            # define the buffers
-            self.recv_buffer = np.zeros( self.test_points, dtype = np.uint32 )
-            self.buffer = np.zeros( self.test_points, dtype = np.double )
+            self.points = self.test_points
+            self.log_channels = self.test_log_channels
 
             # state counter
             self.state = 0
@@ -194,9 +200,9 @@ class L_card_L502:
             self.setting_change_count = 0
 
             self.clock_mode = 0
-            
-            # get_curve counter
-            self.get_curve_counter = 0
+
+            self.ring_blocks = 64
+            self.read_count = 0
 
     # Module functions
     def digitizer_name(self):
@@ -211,7 +217,12 @@ class L_card_L502:
         This function should be called after all functions that change settings are called
         """
         if self.test_flag != 'test':
-            
+
+            # the stream should be stopped before the settings are changed
+            if self.receiver is not None:
+                self.__receiver_stop()
+                self.libX.X502_StreamsStop( self.hCard )
+
             if self.state == 0:
                 # open card
                 self.hCard = self.libX.X502_Create()
@@ -266,14 +277,21 @@ class L_card_L502:
             self.__error_check(ans)
 
             
-            # define the buffers
-            self.recv_buffer = np.zeros( self.points, dtype = np.uint32 )
-            self.buffer = np.zeros( self.points, dtype = np.double )
+            # define the buffers; the receiver thread has its own buffer for the raw words
+            self.ring_buffer = np.zeros( (self.ring_blocks, self.points), dtype = np.double )
+            self.ring_count = 0
+            self.read_count = 0
+            self.receiver_error = 0
 
             # start stream
             start_time = time.time()
             self.libX.X502_StreamsStart( self.hCard ) # 22 ms
             general.message(str(time.time() - start_time))
+
+            # the stream is drained continuously in the background
+            self.receiver_stop.clear()
+            self.receiver = threading.Thread( target = self.__receiver, daemon = True )
+            self.receiver.start()
             
         elif self.test_flag == 'test':
             pass
@@ -286,7 +304,9 @@ class L_card_L502:
 
     def digitizer_get_curve(self, integral = False):
         """
-        Start digitizer. No argument; No output
+        Get the next block of self.points samples in volts. No argument; Output: numpy array
+        The blocks are returned one by one in the order they were received,
+        so no samples are lost as long as the script keeps up with the ring buffer.
         Default settings:
         Sample clock is 2 MHz; Clock mode is 'Internal'; Reference clock is 2 MHz; Card mode is 'PLS';
         Number of averages is 1;
@@ -296,35 +316,78 @@ class L_card_L502:
         """
         if self.test_flag != 'test':
 
-            self.get_curve_counter += 1
-            
-            # receive data to recv_buffer; 607 ms
-            # handle; pointer to buffer; number of points; timeout in ms
-            self.libX.X502_Recv( self.hCard, self.recv_buffer.ctypes.data_as(ctypes.POINTER(ctypes.c_uint32)), \
-                                 ctypes.c_uint32( self.points ), ctypes.c_uint32( 2000 ) )
-            # process data; 50 us
-            # NULL pointer      ctypes.POINTER(ctypes.c_uint32)()
-            self.libX.X502_ProcessData( self.hCard, self.recv_buffer.ctypes.data_as(ctypes.POINTER(ctypes.c_uint32)), ctypes.c_uint32( self.points ), \
-                              ctypes.c_uint32( X502_PROC_FLAGS_VOLT ), self.buffer.ctypes.data_as(ctypes.POINTER(ctypes.c_double)), \
-                              ctypes.byref( ctypes.c_uint32( self.points ) ), ctypes.POINTER(ctypes.c_uint32)(), ctypes.POINTER(ctypes.c_uint32)() )
+            with self.ring_condition:
+                # the oldest block that is not overwritten yet
+                oldest = self.ring_count - self.ring_blocks + 1
+            if self.read_count < oldest:
+                general.message('Ring buffer overflow; ' + str(oldest - self.read_count) + ' blocks are lost')
+                self.read_count = oldest
 
-            if self.get_curve_counter == 100:
-                r2 = ctypes.c_uint32()
-                self.libX.X502_GetRecvReadyCount( self.hCard, ctypes.byref(r2) )
-                general.message(r2.value)
-                self.get_curve_counter = 0
+            data = self.__ring_copy( self.read_count )
+            self.read_count += 1
 
-            return self.buffer
+            return data
 
         elif self.test_flag == 'test':
             return np.zeros( self.points )
 
+    def digitizer_get_latest(self, channel = None):
+        """
+        Get the last received block without waiting. Output: numpy array
+        channel is the number of the logical channel; None returns all the channels interleaved
+        Zeros are returned if nothing is received yet
+        """
+        if self.test_flag != 'test':
+
+            with self.ring_condition:
+                n = self.ring_count - 1
+
+            if n < 0:
+                block = np.zeros( self.ring_buffer.shape[1] )
+            else:
+                block = self.__ring_copy( n )
+
+            return self.__channel_view( block, channel )
+
+        elif self.test_flag == 'test':
+            if channel is not None:
+                assert( int(channel) >= 0 and int(channel) < self.test_log_channels ), 'Incorrect logical channel'
+
+            return self.__channel_view( np.zeros( self.points ), channel )
+
+    def digitizer_get_block(self, n, channel = None):
+        """
+        Get the block number n counted from the start of the stream. Output: numpy array
+        Waits if the block is not received yet;
+        Only the last self.ring_blocks blocks are available
+        channel is the number of the logical channel; None returns all the channels interleaved
+        """
+        if self.test_flag != 'test':
+
+            n = int(n)
+            with self.ring_condition:
+                oldest = self.ring_count - self.ring_blocks + 1
+            if n < max(oldest, 0):
+                general.message('Block ' + str(n) + ' is already overwritten; The oldest available block is ' + str(max(oldest, 0)))
+                sys.exit()
+
+            return self.__channel_view( self.__ring_copy( n ), channel )
+
+        elif self.test_flag == 'test':
+            assert( int(n) >= 0 ), 'Incorrect block number'
+            if channel is not None:
+                assert( int(channel) >= 0 and int(channel) < self.test_log_channels ), 'Incorrect logical channel'
+
+            return self.__channel_view( np.zeros( self.points ), channel )
+
     def digitizer_close(self):
         """
         Close the ADC. No argument; No output
         """
         if self.test_flag != 'test':
-            # stop streams
+            # stop the receiver and streams
+            if self.receiver is not None:
+                self.__receiver_stop()
             self.libX.X502_StreamsStop( self.hCard )
             
             # clean up
@@ -507,6 +570,81 @@ class L_card_L502:
             general.message( error_name )
             #sys.exit()
 
+    def __receiver(self):
+        """
+        Receiver thread. The stream is read by parts with a short timeout, so
+        the thread can be stopped quickly. Every full block is converted to volts
+        directly into the next slot of the ring buffer
+        """
+        # the number of points can be changed while the stream is running
+        points = self.ring_buffer.shape[1]
+        recv_buffer = np.zeros( points, dtype = np.uint32 )
+        received = 0
+
+        while not self.receiver_stop.is_set():
+            # handle; pointer to buffer; number of points; timeout in ms
+            ans = self.libX.X502_Recv( self.hCard, recv_buffer[received:].ctypes.data_as(ctypes.POINTER(ctypes.c_uint32)), \
+                                       ctypes.c_uint32( points - received ), ctypes.c_uint32( 100 ) )
+            if ans < 0:
+                with self.ring_condition:
+                    self.receiver_error = ans
+                    self.ring_condition.notify_all()
+                return
+
+            received += ans
+            if received < points:
+                continue
+
+            # this slot belongs to the block that was overwritten
+            slot = self.ring_count % self.ring_blocks
+            # process data; 50 us
+            self.libX.X502_ProcessData( self.hCard, recv_buffer.ctypes.data_as(ctypes.POINTER(ctypes.c_uint32)), ctypes.c_uint32( points ), \
+                              ctypes.c_uint32( X502_PROC_FLAGS_VOLT ), self.ring_buffer[slot].ctypes.data_as(ctypes.POINTER(ctypes.c_double)), \
+                              ctypes.byref( ctypes.c_uint32( points ) ), ctypes.POINTER(ctypes.c_uint32)(), ctypes.POINTER(ctypes.c_uint32)() )
+            received = 0
+
+            with self.ring_condition:
+                self.ring_count += 1
+                self.ring_condition.notify_all()
+
+    def __receiver_stop(self):
+        self.receiver_stop.set()
+        self.receiver.join()
+        self.receiver = None
+
+    def __ring_copy(self, n):
+        """
+        Copy of the block number n; waits for the receiver if necessary
+        """
+        with self.ring_condition:
+            self.ring_condition.wait_for( lambda: self.ring_count > n or self.receiver_error != 0, \
+                                          timeout = self.receiver_timeout / 1000 )
+            if self.ring_count <= n:
+                if self.receiver_error != 0:
+                    self.__error_check( self.receiver_error )
+                else:
+                    general.message('Timeout; No data is received')
+                sys.exit()
+
+        block = self.ring_buffer[ n % self.ring_blocks ].copy()
+
+        # the slot can be overwritten during copying
+        with self.ring_condition:
+            if n < self.ring_count - self.ring_blocks + 1:
+                general.message('Ring buffer overflow; Block ' + str(n) + ' is lost')
+                sys.exit()
+
+        return block
+
+    def __channel_view(self, block, channel):
+        """
+        The samples of the logical channels are interleaved in a block
+        """
+        if channel is None:
+            return block
+        else:
+            return block[ int(channel)::self.log_channels ]
+
     def get_info(self, hnd):
         """
         """
@@ -7,7 +7,7 @@ import struct
 import datetime
 import socket
 from math import exp, sqrt
-from threading import Thread
+from threading import Thread, Lock
 import numpy as np
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
@@ -26,6 +26,18 @@ class Mikran_X_band_MW_bridge_v2:
         self.specific_parameters = cutil.read_specific_parameters(self.path_config_file)
 
         # auxilary dictionaries
+        # query commands and the number of bytes to recieve
+        self.read_dict = {
+            'synthesizer': (b'\x1e' + b'\x08' + (0).to_bytes(8, byteorder = 'big'), 10),
+            'att1_prd': (b'\x1f' + b'\x01' + b'\x00', 3),
+            'att2_prd': (b'\x20' + b'\x01' + b'\x00', 3),
+            'fv_ctrl': (b'\x21' + b'\x01' + b'\x00', 3),
+            'fv_prm': (b'\x23' + b'\x01' + b'\x00', 3),
+            'att_prm': (b'\x26' + b'\x01' + b'\x00', 3),
+            'att2_prm': (b'\x24' + b'\x01' + b'\x00', 3),
+            'cut_off': (b'\x25' + b'\x01' + b'\x00', 3),
+            'telemetry': (b'\x0d' + b'\x08' + (0).to_bytes(8, byteorder = 'big'), 10)
+        }
         self.curr_dB = 60
         self.prev_dB = 60
         # first initialization
@@ -49,7 +61,9 @@ class Mikran_X_band_MW_bridge_v2:
             self.test_flag = 'None'
 
         if self.test_flag != 'test':
-            pass
+            self.sock = None
+            self.request_lock = Lock()
+            self.batch_answers = {}
         elif self.test_flag == 'test':
             self.test_freq_str = 'Frequency: 9750 MHz'
             self.test_telemetry = 'Temperature: 28; State: INIT'
@@ -59,25 +73,61 @@ class Mikran_X_band_MW_bridge_v2:
 
         #self.mw_bridge_rotary_vane(60, mode = 'Limit')
 
-    def device_query(self, command, bytes_to_recieve):
-        # MW bridge answers every command
-        try:
-            self.sock = socket.socket( socket.AF_INET, socket.SOCK_STREAM )
-            # timeout in sec
-            self.sock.settimeout(10) 
-            self.sock.connect( (self.TCP_IP, self.TCP_PORT) )
-
-            self.sock.sendto( command, (self.TCP_IP, self.TCP_PORT) )
-            data_raw, addr = self.sock.recvfrom( int(bytes_to_recieve) )
-
-            self.sock.shutdown(socket.SHUT_RDWR)
+    def device_connect(self):
+        # one socket is kept open for all the commands
+        self.sock = socket.socket( socket.AF_INET, socket.SOCK_STREAM )
+        # timeout in sec
+        self.sock.settimeout(10)
+        self.sock.setsockopt( socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 )
+        self.sock.connect( (self.TCP_IP, self.TCP_PORT) )
+
+    def device_close(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
             self.sock.close()
+            self.sock = None
+
+    def device_read(self, bytes_to_recieve):
+        # the answer can come in several TCP segments
+        data_raw = b''
+        while len(data_raw) < bytes_to_recieve:
+            chunk = self.sock.recv( bytes_to_recieve - len(data_raw) )
+            if not chunk:
+                raise ConnectionResetError
+            data_raw += chunk
+
+        return data_raw
+
+    def device_query_batch(self, commands):
+        # commands is a list of (command, bytes_to_recieve)
+        # all the commands are sent at once, the answers are read back in the same order
+        with self.request_lock:
+            # if the bridge has closed the connection, reconnect once
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self.device_connect()
+
+                    self.sock.sendall( b''.join( [ command for command, bytes_to_recieve in commands ] ) )
+                    return [ self.device_read( int(bytes_to_recieve) ) for command, bytes_to_recieve in commands ]
+
+                except socket.error:
+                    self.device_close()
 
-            return data_raw
-        except socket.error:
             general.message("No Connection")
             sys.exit()
 
+    def device_query(self, command, bytes_to_recieve):
+        # MW bridge answers every command
+        # answers already read by mw_bridge_batch()
+        try:
+            return self.batch_answers.pop(command)
+        except KeyError:
+            return self.device_query_batch( [ (command, bytes_to_recieve) ] )[0]
+
     #### device specific functions
     def mw_bridge_name(self):
         if self.test_flag != 'test':
@@ -104,9 +154,7 @@ class Mikran_X_band_MW_bridge_v2:
             elif len(freq) == 0:
 
                 # get frequency
-                MESSAGE = b'\x1e' + b'\x08' + (0).to_bytes(8, byteorder = 'big')
-                # 10 bytes to recieve
-                data_raw = self.device_query( MESSAGE, 10)
+                data_raw = self.device_query( *self.read_dict['synthesizer'] )
 
                 if chr(data_raw[4]) == '1':
                     state = 'ON'
@@ -149,9 +197,7 @@ class Mikran_X_band_MW_bridge_v2:
 
             elif len(atten) == 0:
 
-                MESSAGE = b'\x1f' + b'\x01' + b'\x00'
-                # 3 bytes to recieve
-                data_raw = self.device_query( MESSAGE, 3)
+                data_raw = self.device_query( *self.read_dict['att1_prd'] )
 
                 answer = 'Attenuator RECT: ' + str(data_raw[2]/2) + ' dB'
 
@@ -181,9 +227,7 @@ class Mikran_X_band_MW_bridge_v2:
 
             elif len(atten) == 0:
 
-                MESSAGE = b'\x20' + b'\x01' + b'\x00'
-                # 3 bytes to recieve
-                data_raw = self.device_query( MESSAGE, 3)
+                data_raw = self.device_query( *self.read_dict['att2_prd'] )
 
                 answer = 'Attenuator AWG: ' + str(data_raw[2]/2) + ' dB'
 
@@ -213,9 +257,7 @@ class Mikran_X_band_MW_bridge_v2:
 
             elif len(phase) == 0:
 
-                MESSAGE = b'\x21' + b'\x01' + b'\x00'
-                # 3 bytes to recieve
-                data_raw = self.device_query( MESSAGE, 3)
+                data_raw = self.device_query( *self.read_dict['fv_ctrl'] )
 
                 answer = 'Phase CTRL: ' + str(data_raw[2]*5.625) + ' deg'
 
@@ -245,9 +287,7 @@ class Mikran_X_band_MW_bridge_v2:
 
             elif len(phase) == 0:
 
-                MESSAGE = b'\x23' + b'\x01' + b'\x00'
-                # 3 bytes to recieve
-                data_raw = self.device_query( MESSAGE, 3)
+                data_raw = self.device_query( *self.read_dict['fv_prm'] )
 
                 answer = 'Phase PRM: ' + str(data_raw[2]*5.625) + ' deg'
 
@@ -277,9 +317,7 @@ class Mikran_X_band_MW_bridge_v2:
 
             elif len(atten) == 0:
 
-                MESSAGE = b'\x26' + b'\x01' + b'\x00'
-                # 3 bytes to recieve
-                data_raw = self.device_query( MESSAGE, 3)
+                data_raw = self.device_query( *self.read_dict['att_prm'] )
 
                 answer = 'Video Attenuation 1: ' + str(data_raw[2]*2) + ' dB'
 
@@ -309,9 +347,7 @@ class Mikran_X_band_MW_bridge_v2:
 
             elif len(atten) == 0:
 
-                MESSAGE = b'\x24' + b'\x01' + b'\x00'
-                # 3 bytes to recieve
-                data_raw = self.device_query( MESSAGE, 3)
+                data_raw = self.device_query( *self.read_dict['att2_prm'] )
 
                 answer = 'Video Attenuation 2: ' + str(data_raw[2]/2) + ' dB'
 
@@ -346,9 +382,7 @@ class Mikran_X_band_MW_bridge_v2:
                 garb = self.device_query( MESSAGE, 3)
 
             elif len(cutoff) == 0:
-                MESSAGE = b'\x25' + b'\x01' + b'\x00'
-                # 3 bytes to recieve
-                data_raw = self.device_query( MESSAGE, 3)
+                data_raw = self.device_query( *self.read_dict['cut_off'] )
 
                 if data_raw[2] == 0:
                     freq = '30'
@@ -483,9 +517,7 @@ class Mikran_X_band_MW_bridge_v2:
     def mw_bridge_telemetry(self):
         if self.test_flag != 'test':
 
-            MESSAGE = b'\x0d' + b'\x08' + (0).to_bytes(8, byteorder = 'big')
-            # 10 bytes to recieve
-            data_raw = self.device_query( MESSAGE, 10)
+            data_raw = self.device_query( *self.read_dict['telemetry'] )
 
             if int(data_raw[4]) == 1:
                 state = 'INIT'
@@ -503,6 +535,30 @@ class Mikran_X_band_MW_bridge_v2:
 
             return self.test_telemetry
 
+    def mw_bridge_batch(self, *functions):
+        if self.test_flag != 'test':
+            names = list( dict.fromkeys( functions ) )
+            for name in names:
+                if name not in self.read_dict:
+                    general.message('Incorrect function name. Available names are: ' + str( list(self.read_dict) ))
+                    sys.exit()
+
+            commands = [ self.read_dict[name] for name in names ]
+            answers = self.device_query_batch( commands )
+            self.batch_answers = { command[0]: data_raw for command, data_raw in zip( commands, answers ) }
+
+            try:
+                return [ getattr(self, 'mw_bridge_' + name)() for name in functions ]
+            finally:
+                self.batch_answers = {}
+
+        elif self.test_flag == 'test':
+            assert( len(functions) > 0 ), 'No functions are specified'
+            for name in functions:
+                assert( name in self.read_dict ), 'Incorrect function name. Available names are: ' + str( list(self.read_dict) )
+
+            return [ getattr(self, 'mw_bridge_' + name)() for name in functions ]
+
     def mw_bridge_initialize(self):
         if self.test_flag != 'test':
 
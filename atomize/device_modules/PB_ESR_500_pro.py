@@ -5,11 +5,13 @@ import os
 import sys
 import math
 from copy import deepcopy
+from collections import OrderedDict
 from operator import iconcat
 from functools import reduce
 from itertools import groupby, chain
 import numpy as np
 import atomize.device_modules.config.config_utils as cutil
+import atomize.device_modules.config.pulse_table as pt
 import atomize.general_modules.general_functions as general
 import atomize.general_modules.spinapi as spinapi
 
@@ -58,6 +60,9 @@ class PB_ESR_500_Pro:
                         self.ch6: 6, self.ch7: 7, self.ch8: 8, 'CH9': 9, 'CH10': 10, 'CH11': 11,\
                         'CH12': 12, 'CH13': 13, 'CH14': 14, 'CH15': 15, 'CH16': 16, 'CH17': 17,\
                         'CH18': 18, 'CH19': 19, 'CH20': 20, 'CH21': 21, }
+        # operations of the acquisition cycle as (real, imag) weights
+        self.acq_weights_dict = {'+': (1, 0), '+x': (1, 0), '-': (-1, 0), '-x': (-1, 0), \
+                        '+i': (0, 1), '+y': (0, 1), '-i': (0, -1), '-y': (0, -1), }
 
         # Limits and Ranges (depends on the exact model):
         self.clock = float(self.specific_parameters['clock'])
@@ -110,6 +115,13 @@ class PB_ESR_500_Pro:
         # if there is no AMP_ON/LNA_PROTECT pulses
         self.add_shift = int(25) # in ns; *self.timebase
 
+        # maximum number of compiled pulse programs kept in self.program_cache
+        # the least recently used program is evicted when the cache is full;
+        # the size grows up to the number of distinct programs in one scan
+        # (between two pulser_reset() calls), but not above program_cache_max
+        self.program_cache_size = int(float(self.specific_parameters['program_cache_size']))
+        self.program_cache_max = 100000
+
         # Test run parameters
         # These values are returned by the modules in the test run 
         if len(sys.argv) > 1:
@@ -123,6 +135,10 @@ class PB_ESR_500_Pro:
             self.phase_array_length = []
             self.pulse_name_array = []
             self.pulse_array_init = []
+            # parsed times of the pulses
+            self.pulse_table = pt.PulseTable()
+            # weights of the acquisition cycles
+            self.acq_weights_cache = {}
             self.rep_rate = (self.repetition_rate, )
             self.shift_count = 0
             self.rep_rate_count = 0
@@ -133,6 +149,11 @@ class PB_ESR_500_Pro:
             self.phase_pulses = 0
             self.instr_from_file = 0
             self.iterator_of_updates = 0
+            self.program_cache = OrderedDict()
+            self.program_cache_hits = 0
+            self.program_cache_misses = 0
+            # keys of the programs used since the last pulser_reset()
+            self.scan_programs = set()
 
         elif self.test_flag == 'test':
             open('instructions.out', 'w').close()
@@ -142,6 +163,10 @@ class PB_ESR_500_Pro:
             self.phase_array_length = []
             self.pulse_name_array = []
             self.pulse_array_init = []
+            # parsed times of the pulses
+            self.pulse_table = pt.PulseTable()
+            # weights of the acquisition cycles
+            self.acq_weights_cache = {}
             self.rep_rate = (self.repetition_rate, )
             self.shift_count = 0
             self.rep_rate_count = 0
@@ -151,6 +176,11 @@ class PB_ESR_500_Pro:
             self.awg_pulses = 0
             self.phase_pulses = 0
             self.instr_from_file = 0
+            self.program_cache = OrderedDict()
+            self.program_cache_hits = 0
+            self.program_cache_misses = 0
+            # keys of the programs used since the last pulser_reset()
+            self.scan_programs = set()
 
     # Module functions
     def pulser_name(self):
@@ -168,6 +198,7 @@ class PB_ESR_500_Pro:
              'length_increment': length_increment, 'phase_list': phase_list}
 
             self.pulse_array.append( pulse )
+            self.pulse_table.add( start = start, length = length, delta_start = delta_start, length_increment = length_increment )
             # for saving the initial pulse_array without increments
             # deepcopy helps to create a TRULY NEW array and not a link to the object
             self.pulse_array_init = deepcopy( self.pulse_array )
@@ -238,6 +269,7 @@ class PB_ESR_500_Pro:
             if channel in self.channel_dict:
                 if self.auto_defense == 'False':
                     self.pulse_array.append( pulse )
+                    self.pulse_table.add( start = start, length = length, delta_start = delta_start, length_increment = length_increment )
                     # for saving the initial pulse_array without increments
                     # deepcopy helps to create a TRULY NEW array and not a link to the object
                     self.pulse_array_init = deepcopy(self.pulse_array)
@@ -246,6 +278,7 @@ class PB_ESR_500_Pro:
                         assert( 1 == 2), 'In auto_defense mode AMP_ON and LNA_PROTECT pulses are set automatically'
                     else:
                         self.pulse_array.append( pulse )
+                        self.pulse_table.add( start = start, length = length, delta_start = delta_start, length_increment = length_increment )
                         # for saving the initial pulse_array without increments
                         # deepcopy helps to create a TRULY NEW array and not a link to the object
                         self.pulse_array_init = deepcopy(self.pulse_array)
@@ -269,6 +302,7 @@ class PB_ESR_500_Pro:
             while i < len( self.pulse_array ):
                 if name == self.pulse_array[i]['name']:
                     self.pulse_array[i]['start'] = str(start)
+                    self.pulse_table.set(i, 'start', start)
                     self.shift_count = 1
                 else:
                     pass
@@ -293,6 +327,7 @@ class PB_ESR_500_Pro:
                         assert( 1 == 2 ), 'Incorrect time dimension (s, ms, us, ns)'
 
                     self.pulse_array[i]['start'] = str(start)
+                    self.pulse_table.set(i, 'start', start)
                     self.shift_count = 1
                 else:
                     pass
@@ -314,6 +349,7 @@ class PB_ESR_500_Pro:
             while i < len( self.pulse_array ):
                 if name == self.pulse_array[i]['name']:
                     self.pulse_array[i]['delta_start'] = str(delta_start)
+                    self.pulse_table.set(i, 'delta_start', delta_start)
                     self.shift_count = 1
                 else:
                     pass
@@ -338,6 +374,7 @@ class PB_ESR_500_Pro:
                         assert( 1 == 2 ), 'Incorrect time dimension (s, ms, us, ns)'
 
                     self.pulse_array[i]['delta_start'] = str(delta_start)
+                    self.pulse_table.set(i, 'delta_start', delta_start)
                     self.shift_count = 1
                 else:
                     pass
@@ -359,6 +396,7 @@ class PB_ESR_500_Pro:
             while i < len( self.pulse_array ):
                 if name == self.pulse_array[i]['name']:
                     self.pulse_array[i]['length_increment'] = str(length_increment)
+                    self.pulse_table.set(i, 'length_increment', length_increment)
                     self.increment_count = 1
                 else:
                     pass
@@ -384,6 +422,7 @@ class PB_ESR_500_Pro:
                         assert( 1 == 2 ), 'Incorrect time dimension (s, ms, us, ns)'
 
                     self.pulse_array[i]['length_increment'] = str(length_increment)
+                    self.pulse_table.set(i, 'length_increment', length_increment)
                     self.increment_count = 1
                 else:
                     pass
@@ -426,8 +465,8 @@ class PB_ESR_500_Pro:
                     elif element['phase_list'][self.current_phase_index] == '-x':
                         name = element['name'] + '_ph_seq-x'
                         # taking into account delays of phase switching
-                        start = self.change_pulse_settings(element['start'], -self.switch_phase_delay)
-                        length = self.change_pulse_settings(element['length'], self.phase_delay + self.switch_phase_delay)
+                        start = self.pulse_table.to_string(index, 'start', -self.switch_phase_delay)
+                        length = self.pulse_table.to_string(index, 'length', self.phase_delay + self.switch_phase_delay)
 
                         self.pulse_array.append({'name': name, 'channel': '-X', 'start': start, \
                             'length': length, 'delta_start' : '0 ns', 'length_increment': '0 ns', 'phase_list': []})
@@ -438,8 +477,8 @@ class PB_ESR_500_Pro:
                     elif element['phase_list'][self.current_phase_index] == '+y':
                         name = element['name'] + '_ph_seq+y'
                         # taking into account delays of phase switching
-                        start = self.change_pulse_settings(element['start'], -self.switch_phase_delay)
-                        length = self.change_pulse_settings(element['length'], self.phase_delay + self.switch_phase_delay)
+                        start = self.pulse_table.to_string(index, 'start', -self.switch_phase_delay)
+                        length = self.pulse_table.to_string(index, 'length', self.phase_delay + self.switch_phase_delay)
 
                         self.pulse_array.append({'name': name, 'channel': '+Y', 'start': start, \
                             'length': length, 'delta_start' : '0 ns', 'length_increment': '0 ns', 'phase_list': []})
@@ -450,8 +489,8 @@ class PB_ESR_500_Pro:
                     elif element['phase_list'][self.current_phase_index] == '-y':
                         name = element['name'] + '_ph_seq-y'
                         # taking into account delays of phase switching
-                        start = self.change_pulse_settings(element['start'], -self.switch_phase_delay)
-                        length = self.change_pulse_settings(element['length'], self.phase_delay + self.switch_phase_delay)
+                        start = self.pulse_table.to_string(index, 'start', -self.switch_phase_delay)
+                        length = self.pulse_table.to_string(index, 'length', self.phase_delay + self.switch_phase_delay)
 
                         # -Y for Mikran bridge is simutaneously turned on -X; +Y
                         # that is why there is no -Y channel
@@ -501,8 +540,8 @@ class PB_ESR_500_Pro:
                     elif element['phase_list'][self.current_phase_index] == '-x':
                         name = element['name'] + '_ph_seq-x'
                         # taking into account delays
-                        start = self.change_pulse_settings(element['start'], -self.switch_phase_delay)
-                        length = self.change_pulse_settings(element['length'], self.phase_delay + self.switch_phase_delay)
+                        start = self.pulse_table.to_string(index, 'start', -self.switch_phase_delay)
+                        length = self.pulse_table.to_string(index, 'length', self.phase_delay + self.switch_phase_delay)
 
                         self.pulse_array.append({'name': name, 'channel': '-X', 'start': start, \
                             'length': length, 'delta_start' : '0 ns', 'length_increment': '0 ns', 'phase_list': []})
@@ -514,8 +553,8 @@ class PB_ESR_500_Pro:
                     elif element['phase_list'][self.current_phase_index] == '+y':
                         name = element['name'] + '_ph_seq+y'
                         # taking into account delays
-                        start = self.change_pulse_settings(element['start'], -self.switch_phase_delay)
-                        length = self.change_pulse_settings(element['length'], self.phase_delay + self.switch_phase_delay)
+                        start = self.pulse_table.to_string(index, 'start', -self.switch_phase_delay)
+                        length = self.pulse_table.to_string(index, 'length', self.phase_delay + self.switch_phase_delay)
 
                         self.pulse_array.append({'name': name, 'channel': '+Y', 'start': start, \
                             'length': length, 'delta_start' : '0 ns', 'length_increment': '0 ns', 'phase_list': []})
@@ -527,8 +566,8 @@ class PB_ESR_500_Pro:
                     elif element['phase_list'][self.current_phase_index] == '-y':
                         name = element['name'] + '_ph_seq-y'
                         # taking into account delays
-                        start = self.change_pulse_settings(element['start'], -self.switch_phase_delay)
-                        length = self.change_pulse_settings(element['length'], self.phase_delay + self.switch_phase_delay)
+                        start = self.pulse_table.to_string(index, 'start', -self.switch_phase_delay)
+                        length = self.pulse_table.to_string(index, 'length', self.phase_delay + self.switch_phase_delay)
 
                         # -Y for Mikran bridge is simutaneously turned on -X; +Y
                         # that is why there is no -Y channel
@@ -584,7 +623,7 @@ class PB_ESR_500_Pro:
                 
                 #to_spinapi = self.instruction_pulse( temp, rep_time )
                 if self.instr_from_file == 0:
-                    to_spinapi = self.split_into_parts( self.pulse_array, rep_time )
+                    to_spinapi = self.compile_instructions( self.pulse_array, rep_time )
                 elif self.instr_from_file == 1:
                     raw_data = np.fromstring( self.raw_instructions[self.iterator_of_updates], dtype = int, sep = ',' )
                     to_spinapi = raw_data.reshape( ( int(len(raw_data)/3), 3 ) ).tolist()
@@ -670,7 +709,7 @@ class PB_ESR_500_Pro:
             if self.reset_count == 0 or self.shift_count == 1 or self.increment_count == 1:
                 # using a special functions for convertion to instructions
                 #to_spinapi = self.instruction_pulse( self.convert_to_bit_pulse( self.pulse_array ) )
-                to_spinapi = self.split_into_parts( self.pulse_array, rep_time )
+                to_spinapi = self.compile_instructions( self.pulse_array, rep_time )
                 
                 # instructions from file:
                 if self.instr_from_file == 1:
@@ -714,90 +753,30 @@ class PB_ESR_500_Pro:
         """
         A function to shift the start of the pulses.
         The function directly affects the pulse_array.
+        Starts are shifted in self.pulse_table; the string values
+        in the pulse_array are updated only for the shifted pulses
         """
         if self.test_flag != 'test':
             if len(pulses) == 0:
-                i = 0
-                while i < len( self.pulse_array ):
-                    if int( self.pulse_array[i]['delta_start'][:-3] ) == 0:
-                        pass
-                    else:
-                        # convertion to ns
-                        temp = self.pulse_array[i]['delta_start'].split(' ')
-                        if temp[1] in self.timebase_dict:
-                            flag = self.timebase_dict[temp[1]]
-                            d_start = int((temp[0]))*flag
-                        else:
-                            pass
-
-                        temp2 = self.pulse_array[i]['start'].split(' ')
-                        if temp2[1] in self.timebase_dict:
-                            flag2 = self.timebase_dict[temp2[1]]
-                            st = int((temp2[0]))*flag2
-                        else:
-                            pass
-                                
-                        self.pulse_array[i]['start'] = str( st + d_start ) + ' ns'
- 
-                    i += 1
+                index = self.pulse_table.shift()
 
                 self.shift_count = 1
                 self.current_phase_index = 0
 
             else:
-                set_from_list = set(pulses)
-                for element in set_from_list:
-                    if element in self.pulse_name_array:
-                        pulse_index = self.pulse_name_array.index(element)
+                index = [ self.pulse_name_array.index(element) for element in set(pulses) if element in self.pulse_name_array ]
+                if len(index) != 0:
+                    self.shift_count = 1
+                    self.current_phase_index = 0
 
-                        if int( self.pulse_array[pulse_index]['delta_start'][:-3] ) == 0:
-                            pass
-                        else:
-                            # convertion to ns
-                            temp = self.pulse_array[pulse_index]['delta_start'].split(' ')
-                            if temp[1] in self.timebase_dict:
-                                flag = self.timebase_dict[temp[1]]
-                                d_start = int((temp[0]))*flag
-                            else:
-                                pass
+                index = self.pulse_table.shift( index )
 
-                            temp2 = self.pulse_array[pulse_index]['start'].split(' ')
-                            if temp2[1] in self.timebase_dict:
-                                flag2 = self.timebase_dict[temp2[1]]
-                                st = int((temp2[0]))*flag2
-                            else:
-                                pass
-                                    
-                            self.pulse_array[pulse_index]['start'] = str( st + d_start ) + ' ns'
-
-                        self.shift_count = 1
-                        self.current_phase_index = 0
+            for i in index:
+                self.pulse_array[i]['start'] = self.pulse_table.to_string(i, 'start')
 
         elif self.test_flag == 'test':
             if len(pulses) == 0:
-                i = 0
-                while i < len( self.pulse_array ):
-                    if int( self.pulse_array[i]['delta_start'][:-3] ) == 0:
-                        pass
-                    else:
-                        # convertion to ns
-                        temp = self.pulse_array[i]['delta_start'].split(' ')
-                        if temp[1] in self.timebase_dict:
-                            flag = self.timebase_dict[temp[1]]
-                            d_start = int((temp[0]))*flag
-                        else:
-                            assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
-
-                        temp2 = self.pulse_array[i]['start'].split(' ')
-                        if temp2[1] in self.timebase_dict:
-                            flag2 = self.timebase_dict[temp2[1]]
-                            st = int((temp2[0]))*flag2
-                        else:
-                            assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
-                                
-                        self.pulse_array[i]['start'] = str( st + d_start ) + ' ns'
-
-                    i += 1
+                index = self.pulse_table.shift()
 
                 self.shift_count = 1
                 self.current_phase_index = 0
@@ -806,125 +785,46 @@ class PB_ESR_500_Pro:
                 set_from_list = set(pulses)
                 for element in set_from_list:
                     if element in self.pulse_name_array:
+                        pass
+                    else:
+                        assert(1 == 2), "There is no pulse with the specified name"
 
-                        pulse_index = self.pulse_name_array.index(element)
-                        if int( self.pulse_array[pulse_index]['delta_start'][:-3] ) == 0:
-                            pass
-                        else:
-                            # convertion to ns
-                            temp = self.pulse_array[pulse_index]['delta_start'].split(' ')
-                            if temp[1] in self.timebase_dict:
-                                flag = self.timebase_dict[temp[1]]
-                                d_start = int((temp[0]))*flag
-                            else:
-                                assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
-
-                            temp2 = self.pulse_array[pulse_index]['start'].split(' ')
-                            if temp2[1] in self.timebase_dict:
-                                flag2 = self.timebase_dict[temp2[1]]
-                                st = int((temp2[0]))*flag2
-                            else:
-                                assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
-                                    
-                            self.pulse_array[pulse_index]['start'] = str( st + d_start ) + ' ns'
+                index = self.pulse_table.shift( [ self.pulse_name_array.index(element) for element in set_from_list ] )
 
-                        self.shift_count = 1
-                        self.current_phase_index = 0
+                self.shift_count = 1
+                self.current_phase_index = 0
 
-                    else:
-                        assert(1 == 2), "There is no pulse with the specified name"
+            for i in index:
+                self.pulse_array[i]['start'] = self.pulse_table.to_string(i, 'start')
 
     def pulser_increment(self, *pulses):
         """
         A function to increment the length of the pulses.
         The function directly affects the pulse_array.
+        Lengths are incremented in self.pulse_table; the string values
+        in the pulse_array are updated only for the incremented pulses
         """
         if self.test_flag != 'test':
             if len(pulses) == 0:
-                i = 0
-                while i < len( self.pulse_array ):
-                    if int( self.pulse_array[i]['length_increment'][:-3] ) == 0:
-                        pass
-                    else:
-                        # convertion to ns
-                        temp = self.pulse_array[i]['length_increment'].split(' ')
-                        if temp[1] in self.timebase_dict:
-                            flag = self.timebase_dict[temp[1]]
-                            d_length = int(float(temp[0]))*flag
-                        else:
-                            pass
-
-                        temp2 = self.pulse_array[i]['length'].split(' ')
-                        if temp2[1] in self.timebase_dict:
-                            flag2 = self.timebase_dict[temp2[1]]
-                            leng = int(float(temp2[0]))*flag2
-                        else:
-                            pass
-
-                        self.pulse_array[i]['length'] = str( leng + d_length ) + ' ns'
- 
-                    i += 1
+                index = self.pulse_table.increment()
 
                 self.increment_count = 1
                 self.current_phase_index = 0
 
             else:
-                set_from_list = set(pulses)
-                for element in set_from_list:
-                    if element in self.pulse_name_array:
-                        pulse_index = self.pulse_name_array.index(element)
-
-                        if int( self.pulse_array[pulse_index]['length_increment'][:-3] ) == 0:
-                            pass
-                        else:
-                            # convertion to ns
-                            temp = self.pulse_array[pulse_index]['length_increment'].split(' ')
-                            if temp[1] in self.timebase_dict:
-                                flag = self.timebase_dict[temp[1]]
-                                d_length = int(float(temp[0]))*flag
-                            else:
-                                pass
+                index = [ self.pulse_name_array.index(element) for element in set(pulses) if element in self.pulse_name_array ]
+                if len(index) != 0:
+                    self.increment_count = 1
+                    self.current_phase_index = 0
 
-                            temp2 = self.pulse_array[pulse_index]['length'].split(' ')
-                            if temp2[1] in self.timebase_dict:
-                                flag2 = self.timebase_dict[temp2[1]]
-                                leng = int(float(temp2[0]))*flag2
-                            else:
-                                pass
-                            
-                            self.pulse_array[pulse_index]['length'] = str( leng + d_length ) + ' ns'
+                index = self.pulse_table.increment( index )
 
-                        self.increment_count = 1
-                        self.current_phase_index = 0
+            for i in index:
+                self.pulse_array[i]['length'] = self.pulse_table.to_string(i, 'length')
 
         elif self.test_flag == 'test':
             if len(pulses) == 0:
-                i = 0
-                while i < len( self.pulse_array ):
-                    if int( self.pulse_array[i]['length_increment'][:-3] ) == 0:
-                        pass
-                    else:
-                        # convertion to ns
-                        temp = self.pulse_array[i]['length_increment'].split(' ')
-                        if temp[1] in self.timebase_dict:
-                            flag = self.timebase_dict[temp[1]]
-                            d_length = int(float(temp[0]))*flag
-                        else:
-                            assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
-
-                        temp2 = self.pulse_array[i]['length'].split(' ')
-                        if temp2[1] in self.timebase_dict:
-                            flag2 = self.timebase_dict[temp2[1]]
-                            leng = int(float(temp2[0]))*flag2
-                        else:
-                            assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
-                        
-                        if ( leng + d_length ) <= self.max_pulse_length:
-                            self.pulse_array[i]['length'] = str( leng + d_length ) + ' ns'
-                        else:
-                            assert(1 == 2), 'Exceeded maximum pulse length (1900 ns) when increment the pulse'
-
-                    i += 1
+                index = self.pulse_table.increment()
 
                 self.increment_count = 1
                 self.current_phase_index = 0
@@ -933,36 +833,20 @@ class PB_ESR_500_Pro:
                 set_from_list = set(pulses)
                 for element in set_from_list:
                     if element in self.pulse_name_array:
+                        pass
+                    else:
+                        assert(1 == 2), "There is no pulse with the specified name"
 
-                        pulse_index = self.pulse_name_array.index(element)
-                        if int( self.pulse_array[pulse_index]['length_increment'][:-3] ) == 0:
-                            pass
-                        else:
-                            # convertion to ns
-                            temp = self.pulse_array[pulse_index]['length_increment'].split(' ')
-                            if temp[1] in self.timebase_dict:
-                                flag = self.timebase_dict[temp[1]]
-                                d_length = int(float(temp[0]))*flag
-                            else:
-                                assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
+                index = self.pulse_table.increment( [ self.pulse_name_array.index(element) for element in set_from_list ] )
 
-                            temp2 = self.pulse_array[pulse_index]['length'].split(' ')
-                            if temp2[1] in self.timebase_dict:
-                                flag2 = self.timebase_dict[temp2[1]]
-                                leng = int(float(temp2[0]))*flag2
-                            else:
-                                assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
-                                    
-                            if ( leng + d_length ) <= self.max_pulse_length:
-                                self.pulse_array[pulse_index]['length'] = str( leng + d_length ) + ' ns'
-                            else:
-                                assert(1 == 2), 'Exceeded maximum pulse length (1900 ns) when increment the pulse'
+                self.increment_count = 1
+                self.current_phase_index = 0
 
-                        self.increment_count = 1
-                        self.current_phase_index = 0
+            assert( np.all( self.pulse_table.table['length'][index] <= self.max_pulse_length ) ), \
+                    'Exceeded maximum pulse length (1900 ns) when increment the pulse'
 
-                    else:
-                        assert(1 == 2), "There is no pulse with the specified name"
+            for i in index:
+                self.pulse_array[i]['length'] = self.pulse_table.to_string(i, 'length')
 
     #UNDOCUMENTED
     def pulser_phase_reset(self):
@@ -977,6 +861,9 @@ class PB_ESR_500_Pro:
         It includes the complete functionality of pulser_pulse_reset(), but also immediately
         updates the pulser as it is done by calling pulser_update().
         """
+        # a new scan starts; see compile_instructions()
+        self.scan_programs.clear()
+
         if self.test_flag != 'test':
             # get repetition rate
             rep_rate = self.rep_rate[0]
@@ -989,6 +876,7 @@ class PB_ESR_500_Pro:
 
             # reset the pulses; deepcopy helps to create a TRULY NEW array
             self.pulse_array = deepcopy( self.pulse_array_init )
+            self.pulse_table.reset()
             # using a special functions for convertion to instructions
             # we get two return arrays because of pulser_visualizer. It is not the case for test flag.
             #temp, visualizer = self.convert_to_bit_pulse( self.pulse_array )
@@ -998,7 +886,7 @@ class PB_ESR_500_Pro:
                 pass
 
             if self.instr_from_file == 0:
-                to_spinapi = self.split_into_parts( self.pulse_array, rep_time )
+                to_spinapi = self.compile_instructions( self.pulse_array, rep_time )
             elif self.instr_from_file == 1:
                 #self.iterator_of_updates = 0
                 raw_data = np.fromstring( self.raw_instructions[self.iterator_of_updates], dtype = int, sep = ',' )
@@ -1069,9 +957,10 @@ class PB_ESR_500_Pro:
 
             # reset the pulses; deepcopy helps to create a TRULY NEW array
             self.pulse_array = deepcopy( self.pulse_array_init )
+            self.pulse_table.reset()
             # using a special functions for convertion to instructions
             #to_spinapi = self.instruction_pulse( self.convert_to_bit_pulse( self.pulse_array ), rep_time )
-            to_spinapi = self.split_into_parts( self.pulse_array, rep_time )
+            to_spinapi = self.compile_instructions( self.pulse_array, rep_time )
 
             self.reset_count = 1
             self.increment_count = 0
@@ -1087,6 +976,7 @@ class PB_ESR_500_Pro:
         if self.test_flag != 'test':
             if len(pulses) == 0:
                 self.pulse_array = deepcopy(self.pulse_array_init)
+                self.pulse_table.reset()
                 self.reset_count = 0
                 self.increment_count = 0
                 self.shift_count = 0
@@ -1104,6 +994,7 @@ class PB_ESR_500_Pro:
 
                         self.pulse_array[pulse_index]['start'] = self.pulse_array_init[pulse_index]['start']
                         self.pulse_array[pulse_index]['length'] = self.pulse_array_init[pulse_index]['length']
+                        self.pulse_table.reset( pulse_index, fields = ('start', 'length') )
 
                         self.reset_count = 0
                         self.increment_count = 0
@@ -1115,6 +1006,7 @@ class PB_ESR_500_Pro:
         elif self.test_flag == 'test':
             if len(pulses) == 0:
                 self.pulse_array = deepcopy(self.pulse_array_init)
+                self.pulse_table.reset()
                 self.reset_count = 0
                 self.increment_count = 0
                 self.shift_count = 0
@@ -1127,6 +1019,7 @@ class PB_ESR_500_Pro:
 
                         self.pulse_array[pulse_index]['start'] = self.pulse_array_init[pulse_index]['start']
                         self.pulse_array[pulse_index]['length'] = self.pulse_array_init[pulse_index]['length']
+                        self.pulse_table.reset( pulse_index, fields = ('start', 'length') )
 
                         self.reset_count = 0
                         self.increment_count = 0
@@ -1234,6 +1127,7 @@ class PB_ESR_500_Pro:
         self.phase_array_length = []
         self.pulse_name_array = []
         self.pulse_array_init = []
+        self.pulse_table.clear()
         self.rep_rate = (self.repetition_rate, )
         self.shift_count = 0
         self.rep_rate_count = 0
@@ -1242,6 +1136,17 @@ class PB_ESR_500_Pro:
         self.current_phase_index = 0
         self.awg_pulses = 0
         self.phase_pulses = 0
+        self.program_cache.clear()
+        self.program_cache_hits = 0
+        self.program_cache_misses = 0
+        self.scan_programs.clear()
+
+    def pulser_cache_info(self):
+        """
+        A function to get the statistics of the compiled programs cache
+        in the form of (hits, misses, number of cached programs)
+        """
+        return self.program_cache_hits, self.program_cache_misses, len(self.program_cache)
 
     def pulser_test_flag(self, flag):
         """
@@ -1251,42 +1156,62 @@ class PB_ESR_500_Pro:
         self.test_flag = flag
 
     def pulser_acquisition_cycle(self, data1, data2, acq_cycle = []):
+        """
+        Phase cycling of the data from a quadrature detector.
+        data1 and data2 have the shape (len(acq_cycle), ...), i.e. integrated values
+        (1D arrays) or oscillograms (2D arrays) for each step of the cycle.
+        The acq_cycle is converted to weights only once; the whole block is then
+        weighted by a matrix product instead of the loop over acq_cycle
+        """
         if self.test_flag != 'test':
-            answer = np.zeros( data1.shape ) + 1j*np.zeros( data2.shape )
+            weights = self.acquisition_weights( acq_cycle )
+            data1 = np.asarray( data1, dtype = np.float64 )
+            data2 = np.asarray( data2, dtype = np.float64 )
+            shape = data1.shape[1:]
+
+            # (2, n) x (n, points); [real weights, imag weights]
+            block1 = weights @ data1.reshape( len(acq_cycle), -1 )
+            block2 = weights @ data2.reshape( len(acq_cycle), -1 )
 
-            for index, element in enumerate(acq_cycle):
-                if element == '+' or element == '+x':
-                    answer = answer + data1[index] + 1j*data2[index]
-                elif element == '-' or element == '-x':
-                    answer = answer - data1[index] - 1j*data2[index]
-                elif element == '+i' or element == '+y':
-                    answer = answer + 1j*data1[index] - data2[index]
-                elif element == '-i' or element == '-y':
-                    answer = answer - 1j*data1[index] + data2[index]
+            # (wr + 1j*wi)*(data1 + 1j*data2)
+            x = ( block1[0] - block2[1] ).reshape( shape )
+            y = ( block1[1] + block2[0] ).reshape( shape )
 
-            return (answer.real / len(acq_cycle))[0], (answer.imag / len(acq_cycle))[0]
+            return x[()], y[()]
 
         elif self.test_flag == 'test':
 
             assert( len(acq_cycle) == len(data1) ), 'Acquisition cycle and Data 1 have incompatible size'
             assert( len(acq_cycle) == len(data2) ), 'Acquisition cycle and Data 2 have incompatible size'
+            assert( np.shape(data1) == np.shape(data2) ), 'Data 1 and Data 2 have incompatible shape'
 
-            answer = np.zeros( data1.shape ) + 1j*np.zeros( data2.shape )
-
-            ##for index, element in enumerate(acq_cycle):
-            ##    if element == '+':
-            ##        answer = answer + data1[index] + 1j*data2[index]
-            ##    elif element == '-':
-            ##        answer = answer - data1[index] - 1j*data2[index]
-            ##    elif element == '+i':
-            ##        answer = answer + 1j*data1[index] - data2[index]
-            ##    elif element == '-i':
-            ##        answer = answer - 1j*data1[index] + data2[index]
-            ##    else:
-            ##        assert (1 == 2), 'Incorrect operation in the acquisition cycle'
+            self.acquisition_weights( acq_cycle )
+            answer = np.zeros( np.shape(data1)[1:] )
 
-            return (answer.real / len(acq_cycle))[0], (answer.imag / len(acq_cycle))[0]
-    
+            return answer[()], answer[()]
+
+    def acquisition_weights(self, acq_cycle):
+        """
+        ['+', '-i', ...] -> array([[1, 0, ...], [0, -1, ...]]) / len(acq_cycle)
+        The first row is the real part of the weights; the second row is the imaginary part.
+        The weights are calculated once for each acq_cycle
+        """
+        key = tuple( acq_cycle )
+        try:
+            return self.acq_weights_cache[key]
+        except KeyError:
+            weights = np.zeros( (2, len(key)) )
+            for index, element in enumerate( key ):
+                if element in self.acq_weights_dict:
+                    weights[:, index] = self.acq_weights_dict[element]
+                elif self.test_flag == 'test':
+                    assert (1 == 2), 'Incorrect operation in the acquisition cycle'
+
+            if len(key) != 0:
+                weights = weights / len(key)
+
+            self.acq_weights_cache[key] = weights
+            return weights
     #UNDOCUMENTED
     def pulser_instruction_from_file(self, flag, filename = 'instructions.out'):
         """
@@ -1329,62 +1254,16 @@ class PB_ESR_500_Pro:
                 if ch in self.channel_dict:
                     ch_num = self.channel_dict[ch]
 
-                # get start
+                # get start and length; time strings are parsed only once
                 if ch != 'AWG':
-                    st = p_array[i]['start']
+                    st_time = int(pt.parse_time(p_array[i]['start'])/self.timebase)
+                    leng_time = int(pt.parse_time(p_array[i]['length'])/self.timebase)
                 else:
                     # shift AWG pulse to get RECT_AWG
-                    st = self.change_pulse_settings(p_array[i]['start'], -self.rect_awg_switch_delay)
+                    st_time = int((pt.parse_time(p_array[i]['start']) - self.rect_awg_switch_delay)/self.timebase)
+                    leng_time = int((pt.parse_time(p_array[i]['length']) + self.rect_awg_switch_delay + self.rect_awg_delay)/self.timebase)
                     self.awg_pulses = 1
 
-                if st[-2:] == 'ns':
-                    st_time = int(float(st[:-3])/self.timebase)
-                elif st[-2:] == 'us':
-                    st_time = int(float(st[:-3])*1000/self.timebase)
-                elif st[-2:] == 'ms':
-                    st_time = int(float(st[:-3])*1000000/self.timebase)
-                elif st[-2:] == 's':
-                    st_time = int(float(st[:-3])*1000000000/self.timebase)
-                
-                # get length
-                if ch != 'AWG':
-                    leng = p_array[i]['length']
-                else:
-                    # shift AWG pulse to get RECT_AWG
-                    leng = self.change_pulse_settings(p_array[i]['length'], self.rect_awg_switch_delay + self.rect_awg_delay)
-                    self.awg_pulses = 1
-
-                if leng[-2:] == 'ns':
-                    leng_time = int(float(leng[:-3])/self.timebase)
-                elif leng[-2:] == 'us':
-                    leng_time = int(float(leng[:-3])*1000/self.timebase)
-                elif leng[-2:] == 'ms':
-                    leng_time = int(float(leng[:-3])*1000000/self.timebase)
-                elif leng[-2:] == 's':
-                    leng_time = int(float(leng[:-3])*1000000000/self.timebase)
-
-                # get delta start
-                del_st = p_array[i]['delta_start']
-                if del_st[-2:] == 'ns':
-                    delta_start = int(float(del_st[:-3])/self.timebase)
-                elif del_st[-2:] == 'us':
-                    delta_start = int(float(del_st[:-3])*1000/self.timebase)
-                elif del_st[-2:] == 'ms':
-                    delta_start = int(float(del_st[:-3])*1000000/self.timebase)
-                elif del_st[-2:] == 's':
-                    delta_start = int(float(del_st[:-3])*1000000000/self.timebase)
-
-                # get length_increment
-                len_in = p_array[i]['length_increment']
-                if len_in[-2:] == 'ns':
-                    length_increment = int(float(len_in[:-3])/self.timebase)
-                elif len_in[-2:] == 'us':
-                    length_increment = int(float(len_in[:-3])*1000/self.timebase)
-                elif len_in[-2:] == 'ms':
-                    length_increment = int(float(len_in[:-3])*1000000/self.timebase)
-                elif len_in[-2:] == 's':
-                    length_increment = int(float(len_in[:-3])*1000000000/self.timebase)
-
                 # creating converted array
                 # in terms of bits the number of channel is 2**(ch_num - 1)
                 #pulse_temp_array.append( (2**(ch_num), st_time, st_time + leng_time, delta_start, length_increment) )
@@ -1405,60 +1284,15 @@ class PB_ESR_500_Pro:
                 if ch in self.channel_dict:
                     ch_num = self.channel_dict[ch]
 
-                # get start
+                # get start and length; time strings are parsed only once
                 if ch != 'AWG':
-                    st = p_array[i]['start']
-                else:
-                    st = self.change_pulse_settings(p_array[i]['start'], -self.rect_awg_switch_delay)
-                    self.awg_pulses = 1
-
-                if st[-2:] == 'ns':
-                    st_time = int(float(st[:-3])/self.timebase)
-                elif st[-2:] == 'us':
-                    st_time = int(float(st[:-3])*1000/self.timebase)
-                elif st[-2:] == 'ms':
-                    st_time = int(float(st[:-3])*1000000/self.timebase)
-                elif st[-2:] == 's':
-                    st_time = int(float(st[:-3])*1000000000/self.timebase)
-
-                # get length
-                if ch != 'AWG':
-                    leng = p_array[i]['length']
+                    st_time = int(pt.parse_time(p_array[i]['start'])/self.timebase)
+                    leng_time = int(pt.parse_time(p_array[i]['length'])/self.timebase)
                 else:
                     # shift AWG pulse to get RECT_AWG
-                    leng = self.change_pulse_settings(p_array[i]['length'], self.rect_awg_switch_delay + self.rect_awg_delay)
+                    st_time = int((pt.parse_time(p_array[i]['start']) - self.rect_awg_switch_delay)/self.timebase)
+                    leng_time = int((pt.parse_time(p_array[i]['length']) + self.rect_awg_switch_delay + self.rect_awg_delay)/self.timebase)
                     self.awg_pulses = 1
-                
-                if leng[-2:] == 'ns':
-                    leng_time = int(float(leng[:-3])/self.timebase)
-                elif leng[-2:] == 'us':
-                    leng_time = int(float(leng[:-3])*1000/self.timebase)
-                elif leng[-2:] == 'ms':
-                    leng_time = int(float(leng[:-3])*1000000/self.timebase)
-                elif leng[-2:] == 's':
-                    leng_time = int(float(leng[:-3])*1000000000/self.timebase)
-
-                # get delta start
-                del_st = p_array[i]['delta_start']
-                if del_st[-2:] == 'ns':
-                    delta_start = int(float(del_st[:-3])/self.timebase)
-                elif del_st[-2:] == 'us':
-                    delta_start = int(float(del_st[:-3])*1000/self.timebase)
-                elif del_st[-2:] == 'ms':
-                    delta_start = int(float(del_st[:-3])*1000000/self.timebase)
-                elif del_st[-2:] == 's':
-                    delta_start = int(float(del_st[:-3])*1000000000/self.timebase)
-
-                # get length_increment
-                len_in = p_array[i]['length_increment']
-                if len_in[-2:] == 'ns':
-                    length_increment = int(float(len_in[:-3])/self.timebase)
-                elif len_in[-2:] == 'us':
-                    length_increment = int(float(len_in[:-3])*1000/self.timebase)
-                elif len_in[-2:] == 'ms':
-                    length_increment = int(float(len_in[:-3])*1000000/self.timebase)
-                elif len_in[-2:] == 's':
-                    length_increment = int(float(len_in[:-3])*1000000000/self.timebase)
 
                 # creating converted array
                 # in terms of bits the number of channel is 2**(ch_num - 1)
@@ -1982,6 +1816,109 @@ class PB_ESR_500_Pro:
                 except UnboundLocalError:
                     return self.extending_rect_awg( self.pulse_array )
 
+    def compile_instructions(self, p_array, rep_time):
+        """
+        A function that returns SpinAPI instructions for the pulse array.
+        Already compiled programs are taken from self.program_cache, which is
+        keyed on the canonical pulse set and the repetition time.
+        Only channel, start and length of the pulses are used in the key,
+        pulses are sorted according to channel number in the same way
+        as in convertion_to_numpy().
+        The least recently used program is evicted when the cache is full.
+        The cache grows to hold all the programs of one scan, otherwise
+        a sweep with more points than program_cache_size evicts every
+        program before it is used again in the next scan.
+
+        It is used in pulser_update() and pulser_reset()
+        """
+        # all checks of the pulse sequence (in the test run) are done inside convert_to_instructions()
+        key = ( rep_time, tuple( sorted( ( (element['channel'], element['start'], element['length']) \
+            for element in p_array ), key = lambda x: self.channel_dict.get(x[0], 0) ) ) )
+
+        self.scan_programs.add(key)
+        if len( self.scan_programs ) > self.program_cache_size:
+            self.program_cache_size = min( len( self.scan_programs ), self.program_cache_max )
+
+        if key in self.program_cache:
+            self.program_cache.move_to_end(key)
+            self.program_cache_hits += 1
+            return self.program_cache[key]
+
+        to_spinapi = self.convert_to_instructions( p_array, rep_time )
+        self.program_cache_misses += 1
+
+        self.program_cache[key] = to_spinapi
+        if len( self.program_cache ) > self.program_cache_size:
+            self.program_cache.popitem(last = False)
+
+        return to_spinapi
+
+    def convert_to_instructions(self, np_array, rep_time):
+        """
+        Convertion of the pulse array into pulse blaster instructions
+        [channel, start, length] using event_instructions().
+        The result is the same as for split_into_parts(), but the time and memory
+        depend on the number of pulses and not on the length of the pulse sequence.
+        In the test run the result is compared with split_into_parts()
+        """
+        one_array = self.event_instructions(np_array)
+
+        if self.test_flag != 'test':
+            if rep_time - one_array[-1][2] - one_array[-1][1] > (self.min_pulse_length + 4):
+                one_array.append( [0, one_array[-1][1] + one_array[-1][2], \
+                    rep_time - one_array[-1][2] - one_array[-1][1]] )
+                return one_array
+            else:
+                general.message('Pulse sequence is longer than one period of the repetition rate')
+                sys.exit()
+
+        elif self.test_flag == 'test':
+            # the checks of the pulse sequence are done inside split_into_parts()
+            bit_pulse_array = self.split_into_parts(np_array, rep_time)
+
+            one_array.append( [0, one_array[-1][1] + one_array[-1][2], \
+                rep_time - one_array[-1][2] - one_array[-1][1]] )
+
+            assert( one_array == bit_pulse_array ), 'Event-based instructions differ from the bit array instructions'
+
+            return one_array
+
+    def event_instructions(self, np_array):
+        """
+        Event-based (sweep-line) convertion of the pulse array into
+        pulse blaster instructions [channel, start, length] without the final
+        instruction up to the repetition time.
+        Each pulse [2**ch, start, end] gives two edge events: +2**ch at start
+        and -2**ch at end. Events are sorted, the cumulative sum of the events
+        gives the channel value between two neighbouring edges, and the intervals
+        with the same channel value are joined into one instruction.
+        """
+        pulses = self.preparing_to_bit_pulse(np_array)
+
+        # the first pulse in sequence will start at 50 ns all other shifted accordingly
+        # see also convert_to_bit_pulse()
+        min_pulse = np.amin(pulses[:,1]) - self.add_shift
+
+        edges = np.concatenate( (pulses[:,1], pulses[:,2]) ) - min_pulse
+        events = np.concatenate( (pulses[:,0], -pulses[:,0]) )
+        order = np.argsort(edges, kind = 'stable')
+
+        # unique edges and the channel value after each edge
+        edges, first_index = np.unique( edges[order], return_index = True )
+        values = np.cumsum( np.add.reduceat( events[order], first_index ) )
+
+        # interval from 0 to the first edge is empty; after the last edge all channels are off
+        starts = np.concatenate( ([0], edges[:-1]) )
+        values = np.concatenate( ([0], values[:-1]) )
+
+        # join neighbouring intervals with the same channel value
+        change = np.concatenate( ([True], np.diff(values) != 0) )
+        starts = starts[change]
+        values = values[change]
+        lengths = np.diff( np.concatenate( (starts, [edges[-1]]) ) )
+
+        return np.stack( (values, self.timebase*starts, self.timebase*lengths), axis = 1 ).tolist()
+
     def split_into_parts(self, np_array, rep_time):
         """
         When we have situation with a big distance (> 2000 ns) between
@@ -4,8 +4,6 @@
 import os
 import gc
 import sys
-import pyvisa
-from pyvisa.constants import StopBits, Parity
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -50,8 +48,7 @@ class Rigol_DP800_Series:
             if self.config['interface'] == 'rs232':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
+                    self.device = cutil.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
                     write_termination=self.config['write_termination'], baud_rate=self.config['baudrate'],
                     data_bits=self.config['databits'], parity=self.config['parity'], stop_bits=self.config['stopbits'])
                     self.device.timeout = self.config['timeout'] # in ms
@@ -59,7 +56,7 @@ class Rigol_DP800_Series:
                         # test should be here
                         self.device_write('*CLS')
                         general.wait('50 ms')
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         self.status_flag = 0
                         general.message("No connection")
                         sys.exit()
@@ -67,7 +64,7 @@ class Rigol_DP800_Series:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -79,13 +76,12 @@ class Rigol_DP800_Series:
             elif self.config['interface'] == 'ethernet':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['ethernet_address'])
+                    self.device = cutil.open_resource(self.config['ethernet_address'])
                     self.device.timeout = self.config['timeout'] # in ms
                     try:
                         # test should be here
                         self.device_write('*CLS')
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
@@ -93,7 +89,7 @@ class Rigol_DP800_Series:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -4,8 +4,7 @@
 import os
 import gc
 import sys
-import pyvisa
-from pyvisa.constants import StopBits, Parity
+import numpy as np
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -38,6 +37,9 @@ class SR_830:
         self.ref_slope_dict = {'Sine': 0, 'PosTTL': 1, 'NegTTL': 2}
         self.sync_dict = {'Off': 0, 'On': 1}
         self.lp_fil_dict = {'6 dB': 0, '12 dB': 1, "18 dB": 2, "24 dB": 3}
+        self.buffer_rate_dict = {'62.5 mHz': 0, '125 mHz': 1, '250 mHz': 2, '500 mHz': 3, '1 Hz': 4,
+                            '2 Hz': 5, '4 Hz': 6, '8 Hz': 7, '16 Hz': 8, '32 Hz': 9, '64 Hz': 10,
+                            '128 Hz': 11, '256 Hz': 12, '512 Hz': 13, 'Trigger': 14}
 
         # Ranges and limits
         self.ref_freq_min = 0.001
@@ -76,8 +78,7 @@ class SR_830:
             elif self.config['interface'] == 'rs232':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
+                    self.device = cutil.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
                     write_termination=self.config['write_termination'], baud_rate=self.config['baudrate'],
                     data_bits=self.config['databits'], parity=self.config['parity'], stop_bits=self.config['stopbits'])
                     self.device.timeout = self.config['timeout'] # in ms
@@ -85,7 +86,7 @@ class SR_830:
                         # test should be here
                         self.status_flag = 1
                         self.device_write('*CLS')
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         self.status_flag = 0
                         general.message("No connection")
                         sys.exit();
@@ -93,7 +94,7 @@ class SR_830:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -113,6 +114,9 @@ class SR_830:
             self.test_sync = 'On'
             self.test_lp_filter = '6 dB'
             self.test_harmonic = 1
+            self.test_buffer_rate = '64 Hz'
+            self.test_buffer_points = 100
+            self.test_buffer_flag = 0
 
     def close_connection(self):
         if self.test_flag != 'test':
@@ -144,6 +148,22 @@ class SR_830:
             self.status_flag = 0
             sys.exit()
 
+    def device_read_binary(self, command, points):
+        # IEEE floats; 4 bytes, little endian
+        if self.status_flag == 1:
+            if self.config['interface'] == 'gpib':
+                self.device.write(command)
+                raw_answer = self.device.read(4*points)
+            elif self.config['interface'] == 'rs232':
+                self.device.write(command)
+                raw_answer = self.device.read_bytes(4*points)
+            answer = np.frombuffer(raw_answer, dtype = '<f4').astype(np.float64)
+            return answer
+        else:
+            general.message("No Connection")
+            self.status_flag = 0
+            sys.exit()
+
     #### device specific functions
     def lock_in_name(self):
         if self.test_flag != 'test':
@@ -545,6 +565,90 @@ class SR_830:
                 answer = self.test_harmonic
                 return answer
 
+    def lock_in_buffer_rate(self, *rate):
+        if self.test_flag != 'test':
+            if len(rate) == 1:
+                rt = str(rate[0])
+                if rt in self.buffer_rate_dict:
+                    flag = self.buffer_rate_dict[rt]
+                    self.device_write("SRAT "+ str(flag))
+                else:
+                    general.message("Invalid sample rate")
+                    sys.exit()
+            elif len(rate) == 0:
+                raw_answer = int(self.device_query("SRAT?"))
+                answer = cutil.search_keys_dictionary(self.buffer_rate_dict, raw_answer)
+                return answer
+            else:
+                general.message("Invalid Argument")
+                sys.exit()
+
+        elif self.test_flag == 'test':
+            if len(rate) == 1:
+                rt = str(rate[0])
+                assert(rt in self.buffer_rate_dict), "Invalid sample rate is given"
+            elif len(rate) == 0:
+                answer = self.test_buffer_rate
+                return answer
+
+    def lock_in_buffer_start(self):
+        if self.test_flag != 'test':
+            # X and Y are stored as CH1 and CH2 displays
+            self.device_write('REST')
+            self.device_write('DDEF 1,0,0')
+            self.device_write('DDEF 2,0,0')
+            self.device_write('SEND 0')
+            self.device_write('STRT')
+        elif self.test_flag == 'test':
+            self.test_buffer_flag = 1
+
+    def lock_in_buffer_stop(self):
+        if self.test_flag != 'test':
+            self.device_write('PAUS')
+        elif self.test_flag == 'test':
+            pass
+
+    def lock_in_buffer_points(self):
+        if self.test_flag != 'test':
+            answer = int(self.device_query('SPTS?'))
+            return answer
+        elif self.test_flag == 'test':
+            answer = self.test_buffer_points
+            return answer
+
+    def lock_in_buffer_get_data(self, *channel):
+        if self.test_flag != 'test':
+            if len(channel) == 0:
+                channel = (1, )
+
+            if all( int(ch) in (1, 2) for ch in channel ) and len(channel) <= 2:
+                self.device_write('PAUS')
+                points = int(self.device_query('SPTS?'))
+                if points == 0:
+                    answer = [ np.zeros(0) for ch in channel ]
+                else:
+                    answer = [ self.device_read_binary('TRCB? ' + str(int(ch)) + ',0,' + str(points), points) for ch in channel ]
+
+                if len(answer) == 1:
+                    return answer[0]
+                else:
+                    return tuple(answer)
+            else:
+                general.message("Invalid Argument")
+                sys.exit()
+
+        elif self.test_flag == 'test':
+            if len(channel) == 0:
+                channel = (1, )
+            assert(all( int(ch) in (1, 2) for ch in channel ) and len(channel) <= 2), 'Invalid channel is given'
+            assert(self.test_buffer_flag == 1), 'Buffer is not started. Please, call lock_in_buffer_start() first'
+
+            answer = [ np.full(self.test_buffer_points, self.test_signal) for ch in channel ]
+            if len(answer) == 1:
+                return answer[0]
+            else:
+                return tuple(answer)
+
     def lock_in_command(self, command):
         if self.test_flag != 'test':
             self.device_write(command)
@@ -4,8 +4,7 @@
 import os
 import gc
 import sys
-import pyvisa
-from pyvisa.constants import StopBits, Parity
+import numpy as np
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -46,6 +45,10 @@ class SR_865a:
         self.ref_ampl_max = 2
         self.harm_max = 99
         self.harm_min = 1
+        # capture buffer length in kB
+        self.buffer_length_max = 4096
+        self.buffer_rate_scale = {'mHz': 0.001, 'Hz': 1, 'kHz': 1000, 'MHz': 1000000, }
+        self.buffer_trigger = 0
 
         # Test run parameters
         # These values are returned by the modules in the test run 
@@ -82,8 +85,7 @@ class SR_865a:
             elif self.config['interface'] == 'rs232':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
+                    self.device = cutil.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
                     write_termination=self.config['write_termination'], baud_rate=self.config['baudrate'],
                     data_bits=self.config['databits'], parity=self.config['parity'], stop_bits=self.config['stopbits'])
                     self.device.timeout = self.config['timeout']; # in ms
@@ -97,7 +99,7 @@ class SR_865a:
                             general.message('During internal device test errors are found')
                             self.status_flag = 0
                             sys.exit()
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         self.status_flag = 0
                         general.message("No connection")
                         sys.exit()
@@ -105,7 +107,7 @@ class SR_865a:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -116,8 +118,7 @@ class SR_865a:
             elif self.config['interface'] == 'ethernet':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['ethernet_address'])
+                    self.device = cutil.open_resource(self.config['ethernet_address'])
                     self.device.timeout = self.config['timeout'] # in ms
                     try:
                         # test should be here
@@ -129,7 +130,7 @@ class SR_865a:
                             general.message('During internal device test errors are found')
                             self.status_flag = 0
                             sys.exit()
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
@@ -137,7 +138,7 @@ class SR_865a:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit();
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -157,6 +158,9 @@ class SR_865a:
             self.test_sync = 'On'
             self.test_lp_filter = '6 dB'
             self.test_harmonic = 1
+            self.test_buffer_rate = '1250.0 Hz'
+            self.test_buffer_points = 100
+            self.test_buffer_flag = 0
 
     def close_connection(self):
         if self.test_flag != 'test':
@@ -190,6 +194,25 @@ class SR_865a:
             self.status_flag = 0
             sys.exit()
 
+    def device_query_binary(self, command):
+        # IEEE 488.2 block of IEEE floats; 4 bytes, little endian
+        if self.status_flag == 1:
+            if self.config['interface'] == 'gpib':
+                self.device.write(command)
+                header = self.device.read(2).decode()
+                length = int(self.device.read(int(header[1])).decode())
+                raw_answer = self.device.read(length)
+                answer = np.frombuffer(raw_answer, dtype = '<f4').astype(np.float64)
+            elif self.config['interface'] == 'rs232':
+                answer = self.device.query_binary_values(command, datatype = 'f', is_big_endian = False, container = np.array).astype(np.float64)
+            elif self.config['interface'] == 'ethernet':
+                answer = self.device.query_binary_values(command, datatype = 'f', is_big_endian = False, container = np.array).astype(np.float64)
+            return answer
+        else:
+            general.message("No Connection")
+            self.status_flag = 0
+            sys.exit()
+
     #### device specific functions
     def lock_in_name(self):
         if self.test_flag != 'test':
@@ -581,6 +604,113 @@ class SR_865a:
                 answer = self.test_harmonic
                 return answer
 
+    def lock_in_buffer_rate(self, *rate):
+        if self.test_flag != 'test':
+            if len(rate) == 1:
+                rt = str(rate[0])
+                if rt == 'Trigger':
+                    self.buffer_trigger = 1
+                else:
+                    temp = rt.split(' ')
+                    if len(temp) == 2 and temp[1] in self.buffer_rate_scale and float(temp[0]) > 0:
+                        rt_hz = float(temp[0]) * self.buffer_rate_scale[temp[1]]
+                        # available rates are rate_max / 2**n; n = 0 - 20
+                        rate_max = float(self.device_query('CAPTURERATEMAX?'))
+                        number_rt = int( min( max( round( np.log2( rate_max / rt_hz ) ), 0 ), 20 ) )
+                        if rate_max / 2**number_rt != rt_hz:
+                            general.message("Desired sample rate cannot be set, the nearest available value is used")
+                        self.device_write('CAPTURERATE ' + str(number_rt))
+                        self.buffer_trigger = 0
+                    else:
+                        general.message("Invalid sample rate")
+                        sys.exit()
+            elif len(rate) == 0:
+                if self.buffer_trigger == 1:
+                    answer = 'Trigger'
+                else:
+                    answer = str(float(self.device_query('CAPTURERATE?'))) + ' Hz'
+                return answer
+            else:
+                general.message("Invalid Argument")
+                sys.exit()
+
+        elif self.test_flag == 'test':
+            if len(rate) == 1:
+                rt = str(rate[0])
+                if rt != 'Trigger':
+                    temp = rt.split(' ')
+                    assert(len(temp) == 2 and temp[1] in self.buffer_rate_scale), "Invalid sample rate is given"
+                    assert(float(temp[0]) > 0), "Invalid sample rate is given"
+            elif len(rate) == 0:
+                answer = self.test_buffer_rate
+                return answer
+
+    def lock_in_buffer_start(self):
+        if self.test_flag != 'test':
+            # X and Y are captured; one shot
+            self.device_write('CAPTURECFG 1')
+            self.device_write('CAPTURELEN ' + str(self.buffer_length_max))
+            if self.buffer_trigger == 1:
+                # one point per trigger
+                self.device_write('CAPTURESTART 0,2')
+            else:
+                self.device_write('CAPTURESTART 0,0')
+        elif self.test_flag == 'test':
+            self.test_buffer_flag = 1
+
+    def lock_in_buffer_stop(self):
+        if self.test_flag != 'test':
+            self.device_write('CAPTURESTOP')
+        elif self.test_flag == 'test':
+            pass
+
+    def lock_in_buffer_points(self):
+        if self.test_flag != 'test':
+            # 8 bytes per XY point
+            answer = int(self.device_query('CAPTUREBYTES?')) // 8
+            return answer
+        elif self.test_flag == 'test':
+            answer = self.test_buffer_points
+            return answer
+
+    def lock_in_buffer_get_data(self, *channel):
+        if self.test_flag != 'test':
+            if len(channel) == 0:
+                channel = (1, )
+
+            if all( int(ch) in (1, 2) for ch in channel ) and len(channel) <= 2:
+                self.device_write('CAPTURESTOP')
+                points = int(self.device_query('CAPTUREBYTES?')) // 8
+                kbytes = ( 8*points + 1023 ) // 1024
+                # CAPTUREGET? returns not more than 64 kB at once
+                raw_answer = [ self.device_query_binary('CAPTUREGET? ' + str(offset) + ',' + str(min(64, kbytes - offset))) \
+                                for offset in range(0, kbytes, 64) ]
+                if points == 0:
+                    data = np.zeros( (0, 2) )
+                else:
+                    data = np.concatenate(raw_answer)[:2*points].reshape(-1, 2)
+
+                answer = [ data[:, int(ch) - 1].copy() for ch in channel ]
+                if len(answer) == 1:
+                    return answer[0]
+                else:
+                    return tuple(answer)
+            else:
+                general.message("Invalid Argument")
+                sys.exit()
+
+        elif self.test_flag == 'test':
+            if len(channel) == 0:
+                channel = (1, )
+            assert(all( int(ch) in (1, 2) for ch in channel ) and len(channel) <= 2), 'Invalid channel is given'
+            assert(self.test_buffer_flag == 1), 'Buffer is not started. Please, call lock_in_buffer_start() first'
+
+            answer = [ np.full(self.test_buffer_points, self.test_signal) for ch in channel ]
+            if len(answer) == 1:
+                return answer[0]
+            else:
+                return tuple(answer)
+
     def lock_in_command(self, command):
         if self.test_flag != 'test':
             self.device_write(command)
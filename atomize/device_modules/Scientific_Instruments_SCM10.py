@@ -4,8 +4,6 @@
 import os
 import gc
 import sys
-import pyvisa
-from pyvisa.constants import StopBits, Parity
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -37,15 +35,14 @@ class Scientific_Instruments_SCM10:
             if self.config['interface'] == 'rs232':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
+                    self.device = cutil.open_resource(self.config['serial_address'], read_termination=self.config['read_termination'],
                     write_termination=self.config['write_termination'], baud_rate=self.config['baudrate'],
                     data_bits=self.config['databits'], parity=self.config['parity'], stop_bits=self.config['stopbits'])
                     self.device.timeout = self.config['timeout'] # in ms
                     try:
                         # test should be here
                         answer = self.device_query('*IDN?')
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         self.status_flag = 0
                         general.message("No connection")
                         sys.exit()
@@ -53,7 +50,7 @@ class Scientific_Instruments_SCM10:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -64,14 +61,13 @@ class Scientific_Instruments_SCM10:
             elif self.config['interface'] == 'ethernet':
                 try:
                     self.status_flag = 1
-                    rm = pyvisa.ResourceManager()
-                    self.device = rm.open_resource(self.config['ethernet_address'], read_termination=self.config['read_termination'],
+                    self.device = cutil.open_resource(self.config['ethernet_address'], read_termination=self.config['read_termination'],
                     write_termination=self.config['write_termination'])
                     self.device.timeout = self.config['timeout'] # in ms
                     try:
                         # test should be here
                         answer = self.device_query('*IDN?')
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
@@ -79,7 +75,7 @@ class Scientific_Instruments_SCM10:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -4,6 +4,7 @@
 import os
 import sys
 import gc
+from math import gcd
 ###AWG
 sys.path.append('/home/pulseepr/Sources/AWG/Examples/python')
 ###sys.path.append('/home/anatoly/AWG/spcm_examples/python')
@@ -60,6 +61,8 @@ class Spectrum_M4I_2211_X8:
         self.delay_max = 8589934560
         self.delay_min = 0
         self.gc_collect_limit = 250*10**6
+        # size of the ring buffer in digitizer_fifo_stream() in the number of notify blocks
+        self.fifo_ring_size = int(float(self.specific_parameters['fifo_ring_size']))
 
         # Test run parameters
         # These values are returned by the modules in the test run 
@@ -343,71 +346,17 @@ class Spectrum_M4I_2211_X8:
                     return xs, data
 
                 elif self.card_mode == 2:
+                    answer = self.average_data( pnData, integral )
 
-                    if integral == False:
-                        if self.channel == 1:
-                            data = ( self.amplitude_0 / 1000) * np.ctypeslib.as_array(pnData, \
-                                    shape = (int( self.qwBufferSize.value / 2 ), )).reshape((self.aver, self.points)) / self.lMaxDACValue.value
-                            #data_ave = np.sum( data, axis = 0 ) / self.aver
-                            data_ave = np.average( data, axis = 0 )
-
-                        elif self.channel == 2:
-                            data = ( self.amplitude_1 / 1000) * np.ctypeslib.as_array(pnData, \
-                                    shape = (int( self.qwBufferSize.value / 2 ), )).reshape((self.aver, self.points)) / self.lMaxDACValue.value
-                            #data_ave = np.sum( data, axis = 0 ) / self.aver
-                            data_ave = np.average( data, axis = 0 )
-
-                        xs = np.arange( len(data_ave) ) / (self.sample_rate * 1000000)
-
-                        del pnData
-                        del pvBuffer
-
-                        # free memory when the limit is achieved
-                        if self.get_curve_counter * self.aver * self.points > self.gc_collect_limit:
-                            gc.collect()
-                            self.get_curve_counter = 0
-
-                        return xs, data_ave
-
-                    elif integral == True:
-                        if self.read == 1:
-                            if self.channel == 1:
-                                data = ( self.amplitude_0 / 1000) * np.ctypeslib.as_array(pnData, \
-                                    shape = (int( self.qwBufferSize.value / 2 ), )).reshape((self.aver, self.points)) / self.lMaxDACValue.value
-                                #data_ave = np.sum( data, axis = 0 ) / self.aver
-                                data_ave = np.average( data, axis = 0 )
-                                
-                                integ = np.sum( data_ave[self.win_left:self.win_right] ) * ( 10**(-6) / self.sample_rate )
-                                # integral in V*s
-
-                            elif self.channel == 2:
-                                data = ( self.amplitude_1 / 1000) * np.ctypeslib.as_array(pnData, \
-                                    shape = (int( self.qwBufferSize.value / 2 ), )).reshape((self.aver, self.points)) / self.lMaxDACValue.value
-                                #data_ave = np.sum( data, axis = 0 ) / self.aver
-                                data_ave = np.average( data, axis = 0 )
-
-                                integ = np.sum( data_ave[self.win_left:self.win_right] ) * ( 10**(-6) / self.sample_rate )
-                                # integral in V*s
-                        else:
-                            if self.channel == 1:
-                                integ = ( self.amplitude_0 / 1000) * np.sum( np.ctypeslib.as_array(pnData, \
-                                        shape = (int( self.qwBufferSize.value / 2 ), )) ) * ( 10**(-6) / self.sample_rate ) / ( self.lMaxDACValue.value * self.aver )
-                                # integral in V*s
-
-                            elif self.channel == 2:
-                                integ = ( self.amplitude_1 / 1000) * np.sum( np.ctypeslib.as_array(pnData, \
-                                        shape = (int( self.qwBufferSize.value / 2 ), )) ) * ( 10**(-6) / self.sample_rate ) / ( self.lMaxDACValue.value * self.aver )
-                                # integral in V*s                            
-
-                        del pnData
-                        del pvBuffer
-
-                        # free memory when the limit is achieved
-                        if self.get_curve_counter * self.aver * self.points > self.gc_collect_limit:
-                            gc.collect()
-                            self.get_curve_counter = 0
-
-                        return integ
+                    del pnData
+                    del pvBuffer
+
+                    # free memory when the limit is achieved
+                    if self.get_curve_counter * self.aver * self.points > self.gc_collect_limit:
+                        gc.collect()
+                        self.get_curve_counter = 0
+
+                    return answer
 
             elif self.channel == 3:
 
@@ -433,95 +382,17 @@ class Spectrum_M4I_2211_X8:
                     return xs, data1, data2
 
                 elif self.card_mode == 2:
-                    if integral == False:
-                        data = np.ctypeslib.as_array(pnData, \
-                                shape = (int( self.qwBufferSize.value / 1 ), )).reshape((self.aver, 2 * self.points))
-                        #data_ave = np.sum( data, axis = 0 ) / self.aver
-                        data_ave = np.average( data, axis = 0 )
-                        
-                        # CH0
-                        data1 = ( data_ave[0::2] * ( self.amplitude_0 / 1000) ) / self.lMaxDACValue.value
-                        # CH1
-                        data2 = ( data_ave[1::2] * ( self.amplitude_1 / 1000) ) / self.lMaxDACValue.value
-
-                        xs = np.arange( len(data1) ) / (self.sample_rate * 1000000)
-
-                        del pnData
-                        del pvBuffer
-
-                        # free memory when the limit is achieved
-                        if self.get_curve_counter * self.aver * self.points > self.gc_collect_limit:
-                            gc.collect()
-                            self.get_curve_counter = 0
-
-                        return xs, data1, data2
-
-                    elif integral == True:
-                        if self.read == 1:
-                            data = np.ctypeslib.as_array(pnData, \
-                                shape = (int( self.qwBufferSize.value / 1 ), )).reshape((self.aver, 2 * self.points))
-                            #data_ave = np.sum( data, axis = 0 ) / self.aver
-                            data_ave = np.average( data, axis = 0 )
-
-                            # CH0
-                            data1 = ( np.sum( data_ave[0::2][self.win_left:self.win_right] ) * ( 10**(-6) / self.sample_rate ) * ( self.amplitude_0 / 1000) ) / ( self.lMaxDACValue.value )
-                            # CH1
-                            data2 = ( np.sum( data_ave[1::2][self.win_left:self.win_right] ) * ( 10**(-6) / self.sample_rate ) * ( self.amplitude_1 / 1000) ) / ( self.lMaxDACValue.value )
-
-                            del pnData
-                            del pvBuffer
-
-                            # free memory when the limit is achieved
-                            if self.get_curve_counter * self.aver * self.points > self.gc_collect_limit:
-                                gc.collect()
-                                self.get_curve_counter = 0
-
-                            return data1, data2
-                        else:
-                            data = np.ctypeslib.as_array(pnData, shape = (int( self.qwBufferSize.value / 1 ), ))
-
-                            # CH0
-                            data1 = ( np.sum( data[0::2] ) * ( 10**(-6) / self.sample_rate ) * ( self.amplitude_0 / 1000) ) / ( self.lMaxDACValue.value * self.aver )
-                            # CH1
-                            data2 = ( np.sum( data[1::2] ) * ( 10**(-6) / self.sample_rate ) * ( self.amplitude_1 / 1000) ) / ( self.lMaxDACValue.value * self.aver )
-
-                            del pnData
-                            del pvBuffer
-
-                            # free memory when the limit is achieved
-                            if self.get_curve_counter * self.aver * self.points > self.gc_collect_limit:
-                                gc.collect()
-                                self.get_curve_counter = 0
-
-                            return data1, data2
-
-                    elif integral == 'Both':
-                        data = np.ctypeslib.as_array(pnData, \
-                                shape = (int( self.qwBufferSize.value / 1 ), )).reshape((self.aver, 2 * self.points))
-                        #data_ave = np.sum( data, axis = 0 ) / self.aver
-                        data_ave = np.average( data, axis = 0 )
-                        
-                        # CH0
-                        data1 = ( data_ave[0::2] * ( self.amplitude_0 / 1000) ) / self.lMaxDACValue.value
-                        # CH1
-                        data2 = ( data_ave[1::2] * ( self.amplitude_1 / 1000) ) / self.lMaxDACValue.value
-
-                        # CH0
-                        data1int = ( np.sum( data_ave[0::2][self.win_left:self.win_right] ) * ( 10**(-6) / self.sample_rate ) * ( self.amplitude_0 / 1000) ) / ( self.lMaxDACValue.value )
-                        # CH1
-                        data2int = ( np.sum( data_ave[1::2][self.win_left:self.win_right] ) * ( 10**(-6) / self.sample_rate ) * ( self.amplitude_1 / 1000) ) / ( self.lMaxDACValue.value )
-
-                        xs = np.arange( len(data1) ) / (self.sample_rate * 1000000)
-
-                        del pnData
-                        del pvBuffer
-
-                        # free memory when the limit is achieved
-                        if self.get_curve_counter * self.aver * self.points > self.gc_collect_limit:
-                            gc.collect()
-                            self.get_curve_counter = 0
-
-                        return xs, data1, data2, data1int, data2int
+                    answer = self.average_data( pnData, integral )
+
+                    del pnData
+                    del pvBuffer
+
+                    # free memory when the limit is achieved
+                    if self.get_curve_counter * self.aver * self.points > self.gc_collect_limit:
+                        gc.collect()
+                        self.get_curve_counter = 0
+
+                    return answer
 
             #print( len(data) )
             #xs = 2*np.arange( int(qwBufferSize.value / 4) )
@@ -564,6 +435,86 @@ class Spectrum_M4I_2211_X8:
                     elif self.card_mode == 2:
                         return dummy, self.test_integral, self.test_integral, dummy, dummy
 
+    def digitizer_fifo_stream(self, blocks = 0, integral = False):
+        """
+        Continuous acquisition in the FIFO mode of the card. It is a generator.
+        Settings of the 'Average' card mode are used. Each block consists of
+        the number of segments equal to the number of averages and is converted
+        in the same way as in digitizer_get_curve().
+        blocks = 0 means endless acquisition that is stopped when the generator is closed.
+        Input: digitizer_fifo_stream(blocks = 100, integral = True)
+        Output: the same as for digitizer_get_curve() for each block
+        """
+        if self.test_flag != 'test':
+
+            if self.channel == 1 or self.channel == 2:
+                block_size = int( self.points * self.aver ) * 1 * 1
+            elif self.channel == 3:
+                block_size = int( self.points * self.aver ) * 1 * 2
+
+            # notify size should be divisible by 4 kB
+            blocks_per_notify = int( 4096 / gcd( block_size, 4096 ) )
+            notify_size = block_size * blocks_per_notify
+            ring_size = notify_size * self.fifo_ring_size
+
+            # FIFO Multi mode with endless acquisition of segments
+            spcm_dwSetParam_i32(self.hCard, SPC_CARDMODE, SPC_REC_FIFO_MULTI)
+            spcm_dwSetParam_i32(self.hCard, SPC_SEGMENTSIZE, self.points )
+            spcm_dwSetParam_i32(self.hCard, SPC_POSTTRIGGER, self.posttrig_points)
+            spcm_dwSetParam_i64(self.hCard, SPC_LOOPS, 0)
+            spcm_dwSetParam_i32 (self.hCard, SPC_M2CMD, M2CMD_CARD_WRITESETUP)
+
+            # ring buffer; the driver notifies program after each notify_size bytes
+            pvBuffer = pvAllocMemPageAligned ( ring_size )
+            spcm_dwDefTransfer_i64 (self.hCard, SPCM_BUF_DATA, SPCM_DIR_CARDTOPC, notify_size, pvBuffer, uint64 (0), uint64 (ring_size))
+
+            spcm_dwSetParam_i32 (self.hCard, SPC_M2CMD, M2CMD_CARD_START | M2CMD_CARD_ENABLETRIGGER | M2CMD_DATA_STARTDMA)
+
+            lAvailUser = int32 (0)
+            lPCPos = int32 (0)
+            count = 0
+            try:
+                while blocks == 0 or count < blocks:
+                    dwError = spcm_dwSetParam_i32 (self.hCard, SPC_M2CMD, M2CMD_DATA_WAITDMA)
+
+                    # timeout Error
+                    if dwError == 263:
+                        general.message('A timeout occurred while waiting. Probably the digitizer is not triggered')
+                        break
+
+                    spcm_dwGetParam_i32 (self.hCard, SPC_DATA_AVAIL_USER_LEN, byref (lAvailUser))
+                    spcm_dwGetParam_i32 (self.hCard, SPC_DATA_AVAIL_USER_POS, byref (lPCPos))
+                    if lAvailUser.value < notify_size:
+                        continue
+
+                    # convert all blocks before returning the memory to the card
+                    answer = []
+                    for i in range( blocks_per_notify ):
+                        pnData = cast (addressof( pvBuffer ) + lPCPos.value + i * block_size, ptr8)
+                        answer.append( self.average_data( pnData, integral ) )
+
+                    spcm_dwSetParam_i32 (self.hCard, SPC_DATA_AVAIL_CARD_LEN, notify_size)
+
+                    for data in answer:
+                        if blocks != 0 and count >= blocks:
+                            break
+                        count += 1
+                        yield data
+
+            finally:
+                spcm_dwSetParam_i32 (self.hCard, SPC_M2CMD, M2CMD_CARD_STOP | M2CMD_DATA_STOPDMA)
+                # back to the standard 'Average' mode
+                self.digitizer_setup()
+
+        elif self.test_flag == 'test':
+            assert( self.card_mode == 2 ), "FIFO acquisition uses the settings of the 'Average' card mode"
+            assert( blocks >= 0 ), 'Incorrect number of blocks'
+            assert( integral == False or integral == True or integral == 'Both' ), 'Incorrect integral argument'
+
+            # endless acquisition is checked by one block
+            for i in range( max( blocks, 1 ) ):
+                yield self.digitizer_get_curve( integral = integral )
+
     def digitizer_close(self):
         """
         Close the digitizer. No argument; No output
@@ -1504,6 +1455,104 @@ class Spectrum_M4I_2211_X8:
 
         return int( y * ( ( x // y) + (x % y > 0) ) )
 
+    def raw_segments(self, pnData, num_ch):
+        """
+        A zero-copy view of the raw buffer in 'Average' card mode
+        in the form (averages, points, channels)
+        """
+        return np.ctypeslib.as_array(pnData, shape = (int( self.aver * self.points * num_ch ), )).reshape((self.aver, self.points, num_ch))
+
+    def sum_segments(self, pnData, num_ch):
+        """
+        A sum of all segments in the integer domain
+        Output is int64 array in the form (points, channels)
+        """
+        return np.sum( self.raw_segments( pnData, num_ch ), axis = 0, dtype = np.int64 )
+
+    def sum_window(self, pnData, num_ch):
+        """
+        A sum of the raw counts inside the integration window over all segments
+        Output is int64 array in the form (channels, )
+        """
+        return np.sum( self.raw_segments( pnData, num_ch )[:, self.win_left:self.win_right, :], axis = (0, 1), dtype = np.int64 )
+
+    def average_data(self, pnData, integral):
+        """
+        Convertion of the raw data in 'Average' card mode
+        Output is the same as for digitizer_get_curve()
+        """
+        if self.channel == 1 or self.channel == 2:
+            if self.channel == 1:
+                amp = self.amplitude_0 / 1000
+            elif self.channel == 2:
+                amp = self.amplitude_1 / 1000
+
+            if integral == False:
+                # segments are summed in the integer domain; convertion in V at the end
+                data_ave = self.sum_segments( pnData, 1 )[:, 0] * amp / ( self.lMaxDACValue.value * self.aver )
+
+                xs = np.arange( len(data_ave) ) / (self.sample_rate * 1000000)
+
+                return xs, data_ave
+
+            elif integral == True:
+                if self.read == 1:
+                    # integration window directly on the raw counts
+                    integ = self.sum_window( pnData, 1 )[0] * ( 10**(-6) / self.sample_rate ) * amp / ( self.lMaxDACValue.value * self.aver )
+                    # integral in V*s
+                else:
+                    integ = np.sum( self.raw_segments( pnData, 1 ), dtype = np.int64 ) * ( 10**(-6) / self.sample_rate ) * amp / ( self.lMaxDACValue.value * self.aver )
+                    # integral in V*s
+
+                return integ
+
+        elif self.channel == 3:
+            # coefficients for convertion of the summed raw counts in V
+            coef0 = ( self.amplitude_0 / 1000) / ( self.lMaxDACValue.value * self.aver )
+            coef1 = ( self.amplitude_1 / 1000) / ( self.lMaxDACValue.value * self.aver )
+
+            if integral == False:
+                # segments are summed in the integer domain; convertion in V at the end
+                data_sum = self.sum_segments( pnData, 2 )
+                # CH0
+                data1 = data_sum[:, 0] * coef0
+                # CH1
+                data2 = data_sum[:, 1] * coef1
+
+                xs = np.arange( len(data1) ) / (self.sample_rate * 1000000)
+
+                return xs, data1, data2
+
+            elif integral == True:
+                if self.read == 1:
+                    # integration window directly on the raw counts
+                    data_int = self.sum_window( pnData, 2 )
+                else:
+                    data_int = np.sum( self.raw_segments( pnData, 2 ), axis = (0, 1), dtype = np.int64 )
+
+                # CH0
+                data1 = data_int[0] * ( 10**(-6) / self.sample_rate ) * coef0
+                # CH1
+                data2 = data_int[1] * ( 10**(-6) / self.sample_rate ) * coef1
+
+                return data1, data2
+
+            elif integral == 'Both':
+                data_sum = self.sum_segments( pnData, 2 )
+                # CH0
+                data1 = data_sum[:, 0] * coef0
+                # CH1
+                data2 = data_sum[:, 1] * coef1
+
+                # CH0
+                data1int = np.sum( data_sum[self.win_left:self.win_right, 0] ) * ( 10**(-6) / self.sample_rate ) * coef0
+                # CH1
+                data2int = np.sum( data_sum[self.win_left:self.win_right, 1] ) * ( 10**(-6) / self.sample_rate ) * coef1
+
+                xs = np.arange( len(data1) ) / (self.sample_rate * 1000000)
+
+                return xs, data1, data2, data1int, data2int
+
 def main():
     pass
 
@@ -15,6 +15,7 @@ from itertools import groupby, chain
 from copy import deepcopy
 import numpy as np
 import atomize.device_modules.config.config_utils as cutil
+import atomize.device_modules.config.pulse_table as pt
 import atomize.general_modules.general_functions as general
 
 from pyspcm import *
@@ -65,6 +66,8 @@ class Spectrum_M4I_6631_X8:
         self.delay_max = 8589934560
         self.delay_min = 0
         self.gc_collect_limit = 250*10**6
+        # maximum number of calculated pulses kept in memory
+        self.waveform_cache_size = int(float(self.specific_parameters['waveform_cache_size']))
 
         # Test run parameters
         # These values are returned by the modules in the test run 
@@ -109,6 +112,8 @@ class Spectrum_M4I_6631_X8:
             self.setting_change_count = 0
             self.pulse_array = []
             self.pulse_array_init = []
+            # parsed times of the pulses
+            self.pulse_table = pt.PulseTable()
             self.pulse_name_array = []
             self.pulse_ch0_array = []
             self.pulse_ch1_array = []
@@ -129,6 +134,13 @@ class Spectrum_M4I_6631_X8:
             self.update_counter = 0
             self.visualize_counter = 0
 
+            # calculated pulses; 'Multi' buffer and its segments already written to the card
+            self.waveform_cache = {}
+            self.multi_buffer_shape = None
+            self.multi_buffer_keys = []
+            self.multi_card_keys = []
+            self.changed_segments = []
+
         elif self.test_flag == 'test':
             self.test_sample_rate = '1250 MHz'
             self.test_clock_mode = 'Internal'
@@ -176,6 +188,8 @@ class Spectrum_M4I_6631_X8:
             self.setting_change_count = 0
             self.pulse_array = []
             self.pulse_array_init = []
+            # parsed times of the pulses
+            self.pulse_table = pt.PulseTable()
             self.pulse_name_array = []
             self.pulse_ch0_array = []
             self.pulse_ch1_array = []
@@ -196,6 +210,13 @@ class Spectrum_M4I_6631_X8:
             self.update_counter = 0
             self.visualize_counter = 0
 
+            # calculated pulses; 'Multi' buffer and its segments already written to the card
+            self.waveform_cache = {}
+            self.multi_buffer_shape = None
+            self.multi_buffer_keys = []
+            self.multi_card_keys = []
+            self.changed_segments = []
+
     # Module functions
     def awg_name(self):
         answer = 'Spectrum M4I.6631-X8'
@@ -296,6 +317,9 @@ class Spectrum_M4I_6631_X8:
                 # Call: (SPC_M2CMD, M2CMD_CARD_WRITESETUP) -> the setup isn't valid"
                 pass
 
+            # the card memory should be written completely in the next awg_update()
+            self.multi_card_keys = [ None ] * len( self.multi_card_keys )
+
         elif self.test_flag == 'test':
             # to run several important checks
             if self.reset_count == 0 or self.shift_count == 1 or self.increment_count == 1 or self.setting_change_count == 1 or self.sequence_mode_count == 1:
@@ -374,26 +398,22 @@ class Spectrum_M4I_6631_X8:
                         self.update_counter = 0
 
                 elif self.card_mode == 512 and self.sequence_mode == 0:
-                    #for index, element in enumerate(buf):
-                    #    self.pnBuffer[index] = int(lMaxDACValue.value * element)
-                    #    #self.pnBuffer = (lMaxDACValue.value * self.define_buffer_multi()).astype('int64')
+                    # only the segments that differ from the card memory are transferred;
+                    # neighbouring segments are joined into one DMA transfer
+                    seg_bytes = int( self.qwBufferSize.value / len( self.multi_card_keys ) )
+                    for first, last in self.segment_runs( self.changed_segments ):
+                        # spcm_dwDefTransfer_i64 (device, buffer_type, direction, event (0=and of transfer), data, offset, buffer length)
+                        spcm_dwDefTransfer_i64 (self.hCard, SPCM_BUF_DATA, SPCM_DIR_PCTOCARD, int32 (0), \
+                                                cast( addressof(self.buf) + first*seg_bytes, ptr16 ), uint64 (first*seg_bytes), uint64 ( (last - first + 1)*seg_bytes ))
+                        # transfer
+                        spcm_dwSetParam_i32 (self.hCard, SPC_M2CMD, M2CMD_DATA_STARTDMA | M2CMD_DATA_WAITDMA)
 
-                    # we define the buffer for transfer and start the DMA transfer
-                    #sys.stdout.write("Starting the DMA transfer and waiting until data is in board memory\n")
-                    # spcm_dwDefTransfer_i64 (device, buffer_type, direction, event (0=and of transfer), data, offset, buffer length)
-                    spcm_dwDefTransfer_i64 (self.hCard, SPCM_BUF_DATA, SPCM_DIR_PCTOCARD, int32 (0), self.buf, uint64 (0), self.qwBufferSize.value)
-                    # transfer
-                    spcm_dwSetParam_i32 (self.hCard, SPC_M2CMD, M2CMD_DATA_STARTDMA | M2CMD_DATA_WAITDMA)
-                    #general.message("AWG buffer has been transferred to board memory")
+                    self.multi_card_keys = list( self.multi_buffer_keys )
 
+                    # the buffer is kept in self.multi_pvBuffer for the next update
                     del self.pnBuffer
                     del self.pvBuffer
                     del self.buf
-                    
-                    # free memory when the limit is achieved
-                    if self.update_counter * self.qwBufferSize.value > self.gc_collect_limit:
-                        gc.collect()
-                        self.update_counter = 0
 
                 elif self.sequence_mode == 1:
                     if self.channel == 1 or self.channel == 2:
@@ -498,6 +518,7 @@ class Spectrum_M4I_6631_X8:
         if self.test_flag != 'test':
             # clean up
             spcm_vClose (self.hCard)
+            self.multi_card_keys = [ None ] * len( self.multi_card_keys )
 
         elif self.test_flag == 'test':
             pass
@@ -549,6 +570,7 @@ class Spectrum_M4I_6631_X8:
               'delta_start': delta_start, 'amp': d_coef, 'phase_list': phase_list, 'n': n, 'b': b }
 
             self.pulse_array.append( pulse )
+            self.pulse_table.add( start = start, length = length, sigma = sigma, delta_start = delta_start, length_increment = length_increment )
             # for saving the initial pulse_array without increments
             # deepcopy helps to create a TRULY NEW array and not a link to the object
             self.pulse_array_init = deepcopy( self.pulse_array )
@@ -686,6 +708,7 @@ class Spectrum_M4I_6631_X8:
             assert(temp_b > 0), 'Parameter b should be more than 0'
 
             self.pulse_array.append( pulse )
+            self.pulse_table.add( start = start, length = length, sigma = sigma, delta_start = delta_start, length_increment = length_increment )
             self.pulse_array_init = deepcopy(self.pulse_array)
 
     def awg_next_phase(self):
@@ -772,6 +795,7 @@ class Spectrum_M4I_6631_X8:
             while i < len( self.pulse_array ):
                 if name == self.pulse_array[i]['name']:
                     self.pulse_array[i]['delta_start'] = str(delta_start)
+                    self.pulse_table.set(i, 'delta_start', delta_start)
                     self.shift_count = 1
                 else:
                     pass
@@ -796,6 +820,7 @@ class Spectrum_M4I_6631_X8:
                         assert( 1 == 2 ), 'Incorrect time dimension (s, ms, us, ns)'
 
                     self.pulse_array[i]['delta_start'] = str(delta_start)
+                    self.pulse_table.set(i, 'delta_start', delta_start)
                     self.shift_count = 1
                 else:
                     pass
@@ -979,6 +1004,7 @@ class Spectrum_M4I_6631_X8:
             while i < len( self.pulse_array ):
                 if name == self.pulse_array[i]['name']:
                     self.pulse_array[i]['length_increment'] = str(length_increment)
+                    self.pulse_table.set(i, 'length_increment', length_increment)
                     self.increment_count = 1
                 else:
                     pass
@@ -1002,6 +1028,7 @@ class Spectrum_M4I_6631_X8:
                         assert( 1 == 2 ), 'Incorrect time dimension (ms, us, ns)'
 
                     self.pulse_array[i]['length_increment'] = str(length_increment)
+                    self.pulse_table.set(i, 'length_increment', length_increment)
                     self.increment_count = 1
                 else:
                     pass
@@ -1034,28 +1061,8 @@ class Spectrum_M4I_6631_X8:
 
                 # increment start if in Single Joined
                 elif self.single_joined == 1:
-                    while i < len( self.pulse_array ):
-                        if int( self.pulse_array[i]['delta_start'][:-3] ) == 0:
-                            pass
-                        else:
-                            # convertion to ns
-                            temp = self.pulse_array[i]['delta_start'].split(' ')
-                            if temp[1] in self.timebase_dict:
-                                flag = self.timebase_dict[temp[1]]
-                                d_start = int((temp[0]))*flag
-                            else:
-                                pass
-
-                            temp2 = self.pulse_array[i]['start'].split(' ')
-                            if temp2[1] in self.timebase_dict:
-                                flag2 = self.timebase_dict[temp2[1]]
-                                st = int((temp2[0]))*flag2
-                            else:
-                                pass
-                                    
-                            self.pulse_array[i]['start'] = str( st + d_start ) + ' ns'
-
-                        i += 1
+                    for i in self.pulse_table.shift():
+                        self.pulse_array[i]['start'] = self.pulse_table.to_string(i, 'start')
 
             else:
                 if self.single_joined == 0:
@@ -1079,25 +1086,8 @@ class Spectrum_M4I_6631_X8:
                         if element in self.pulse_name_array:
                             pulse_index = self.pulse_name_array.index(element)
 
-                            if int( self.pulse_array[pulse_index]['delta_start'][:-3] ) == 0:
-                                pass
-                            else:
-                                # convertion to ns
-                                temp = self.pulse_array[pulse_index]['delta_start'].split(' ')
-                                if temp[1] in self.timebase_dict:
-                                    flag = self.timebase_dict[temp[1]]
-                                    d_start = int((temp[0]))*flag
-                                else:
-                                    pass
-
-                                temp2 = self.pulse_array[pulse_index]['start'].split(' ')
-                                if temp2[1] in self.timebase_dict:
-                                    flag2 = self.timebase_dict[temp2[1]]
-                                    st = int((temp2[0]))*flag2
-                                else:
-                                    pass
-                                        
-                                self.pulse_array[pulse_index]['start'] = str( st + d_start ) + ' ns'
+                            for i in self.pulse_table.shift( pulse_index ):
+                                self.pulse_array[i]['start'] = self.pulse_table.to_string(i, 'start')
 
         elif self.test_flag == 'test':
             self.shift_count = 1
@@ -1119,28 +1109,8 @@ class Spectrum_M4I_6631_X8:
 
                 # increment start if in Single Joined
                 elif self.single_joined == 1:
-                    while i < len( self.pulse_array ):
-                        if int( self.pulse_array[i]['delta_start'][:-3] ) == 0:
-                            pass
-                        else:
-                            # convertion to ns
-                            temp = self.pulse_array[i]['delta_start'].split(' ')
-                            if temp[1] in self.timebase_dict:
-                                flag = self.timebase_dict[temp[1]]
-                                d_start = int((temp[0]))*flag
-                            else:
-                                pass
-
-                            temp2 = self.pulse_array[i]['start'].split(' ')
-                            if temp2[1] in self.timebase_dict:
-                                flag2 = self.timebase_dict[temp2[1]]
-                                st = int((temp2[0]))*flag2
-                            else:
-                                pass
-                                    
-                            self.pulse_array[i]['start'] = str( st + d_start ) + ' ns'
-
-                        i += 1
+                    for i in self.pulse_table.shift():
+                        self.pulse_array[i]['start'] = self.pulse_table.to_string(i, 'start')
 
             else:
                 if self.single_joined == 0:
@@ -1168,25 +1138,8 @@ class Spectrum_M4I_6631_X8:
                         if element in self.pulse_name_array:
                             pulse_index = self.pulse_name_array.index(element)
 
-                            if int( self.pulse_array[pulse_index]['delta_start'][:-3] ) == 0:
-                                pass
-                            else:
-                                # convertion to ns
-                                temp = self.pulse_array[pulse_index]['delta_start'].split(' ')
-                                if temp[1] in self.timebase_dict:
-                                    flag = self.timebase_dict[temp[1]]
-                                    d_start = int((temp[0]))*flag
-                                else:
-                                    pass
-
-                                temp2 = self.pulse_array[pulse_index]['start'].split(' ')
-                                if temp2[1] in self.timebase_dict:
-                                    flag2 = self.timebase_dict[temp2[1]]
-                                    st = int((temp2[0]))*flag2
-                                else:
-                                    pass
-                                        
-                                self.pulse_array[pulse_index]['start'] = str( st + d_start ) + ' ns'
+                            for i in self.pulse_table.shift( pulse_index ):
+                                self.pulse_array[i]['start'] = self.pulse_table.to_string(i, 'start')
 
                         else:
                             assert(1 == 2), "There is no pulse with the specified name"
@@ -1195,134 +1148,35 @@ class Spectrum_M4I_6631_X8:
         """
         A function to increment both the length and sigma of the pulses.
         The function directly affects the pulse_array.
+        Lengths and sigmas are incremented in self.pulse_table; the string values
+        in the pulse_array are updated only for the incremented pulses
         """
         if self.test_flag != 'test':
             if len(pulses) == 0:
-                i = 0
-                while i < len( self.pulse_array ):
-                    if int( self.pulse_array[i]['length_increment'][:-3] ) == 0:
-                        pass
-                    else:
-                        # convertion to ns
-                        temp = self.pulse_array[i]['length_increment'].split(' ')
-                        if temp[1] in self.timebase_dict:
-                            flag = self.timebase_dict[temp[1]]
-                            d_length = int(float(temp[0]))*flag
-                        else:
-                            pass
-
-                        temp2 = self.pulse_array[i]['length'].split(' ')
-                        if temp2[1] in self.timebase_dict:
-                            flag2 = self.timebase_dict[temp2[1]]
-                            leng = int(float(temp2[0]))*flag2
-                        else:
-                            pass
-
-                        temp3 = self.pulse_array[i]['sigma'].split(' ')
-                        if temp3[1] in self.timebase_dict:
-                            flag3 = self.timebase_dict[temp3[1]]
-                            sigm = int(float(temp3[0]))*flag3
-                        else:
-                            pass
-
-                        if self.pulse_array[i]['function'] == 'SINE':
-                            self.pulse_array[i]['length'] = str( leng + d_length ) + ' ns'
-                            self.pulse_array[i]['sigma'] = str( sigm + d_length ) + ' ns'
-                        elif self.pulse_array[i]['function'] == 'GAUSS' or self.pulse_array[i]['function'] == 'SINC':
-                            ratio = leng/sigm
-                            self.pulse_array[i]['length'] = str( leng + ratio*d_length ) + ' ns'
-                            self.pulse_array[i]['sigma'] = str( sigm + d_length ) + ' ns'
-
-                    i += 1
+                index, factor = self.increment_factor( range( len(self.pulse_array) ) )
+                index = self.pulse_table.increment( index, factor )
 
                 self.increment_count = 1
                 self.current_phase_index = 0
 
             else:
-                set_from_list = set(pulses)
-                for element in set_from_list:
-                    if element in self.pulse_name_array:
-                        pulse_index = self.pulse_name_array.index(element)
-
-                        if int( self.pulse_array[pulse_index]['length_increment'][:-3] ) == 0:
-                            pass
-                        else:
-                            # convertion to ns
-                            temp = self.pulse_array[pulse_index]['length_increment'].split(' ')
-                            if temp[1] in self.timebase_dict:
-                                flag = self.timebase_dict[temp[1]]
-                                d_length = int(float(temp[0]))*flag
-                            else:
-                                pass
-
-                            temp2 = self.pulse_array[pulse_index]['length'].split(' ')
-                            if temp2[1] in self.timebase_dict:
-                                flag2 = self.timebase_dict[temp2[1]]
-                                leng = int(float(temp2[0]))*flag2
-                            else:
-                                pass
-
-                            temp3 = self.pulse_array[pulse_index]['sigma'].split(' ')
-                            if temp3[1] in self.timebase_dict:
-                                flag3 = self.timebase_dict[temp3[1]]
-                                sigm = int(float(temp3[0]))*flag3
-                            else:
-                                pass
+                index = [ self.pulse_name_array.index(element) for element in set(pulses) if element in self.pulse_name_array ]
+                if len(index) != 0:
+                    self.increment_count = 1
+                    self.current_phase_index = 0
 
-                            if self.pulse_array[pulse_index]['function'] == 'SINE':
-                                self.pulse_array[pulse_index]['length'] = str( leng + d_length ) + ' ns'
-                                self.pulse_array[pulse_index]['sigma'] = str( sigm + d_length ) + ' ns'
-                            elif self.pulse_array[pulse_index]['function'] == 'GAUSS' or self.pulse_array[i]['function'] == 'SINC':
-                                ratio = leng/sigm
-                                self.pulse_array[pulse_index]['length'] = str( leng + ratio*d_length ) + ' ns'
-                                self.pulse_array[pulse_index]['sigma'] = str( sigm + d_length ) + ' ns'
+                index, factor = self.increment_factor( index )
+                index = self.pulse_table.increment( index, factor )
 
-                        self.increment_count = 1
-                        self.current_phase_index = 0
+            for i in index:
+                self.pulse_array[i]['length'] = self.pulse_table.to_string(i, 'length')
+                self.pulse_array[i]['sigma'] = self.pulse_table.to_string(i, 'sigma')
 
         elif self.test_flag == 'test':
 
             if len(pulses) == 0:
-                i = 0
-                while i < len( self.pulse_array ):
-                    if int( self.pulse_array[i]['length_increment'][:-3] ) == 0:
-                        pass
-                    else:
-                        # convertion to ns
-                        temp = self.pulse_array[i]['length_increment'].split(' ')
-                        if temp[1] in self.timebase_dict:
-                            flag = self.timebase_dict[temp[1]]
-                            d_length = int(float(temp[0]))*flag
-                        else:
-                            assert(1 == 2), "Incorrect time dimension (ns, us, ms)"
-
-                        temp2 = self.pulse_array[i]['length'].split(' ')
-                        if temp2[1] in self.timebase_dict:
-                            flag2 = self.timebase_dict[temp2[1]]
-                            leng = int(float(temp2[0]))*flag2
-                        else:
-                            assert(1 == 2), "Incorrect time dimension (ns, us, ms)"
-
-                        temp3 = self.pulse_array[i]['sigma'].split(' ')
-                        if temp3[1] in self.timebase_dict:
-                            flag3 = self.timebase_dict[temp3[1]]
-                            sigm = int(float(temp3[0]))*flag3
-                        else:
-                            assert(1 == 2), "Incorrect time dimension (ns, us, ms)"
-                        
-                        ratio = leng/sigm
-                        if ( leng + ratio*d_length ) <= self.max_pulse_length:
-                            if self.pulse_array[i]['function'] == 'SINE':
-                                self.pulse_array[i]['length'] = str( leng + d_length ) + ' ns'
-                                self.pulse_array[i]['sigma'] = str( sigm + d_length ) + ' ns'
-                            elif self.pulse_array[i]['function'] == 'GAUSS' or self.pulse_array[i]['function'] == 'SINC':
-                                #ratio = leng/sigm
-                                self.pulse_array[i]['length'] = str( leng + ratio*d_length ) + ' ns'
-                                self.pulse_array[i]['sigma'] = str( sigm + d_length ) + ' ns'
-                        else:
-                            assert(1 == 2), 'Exceeded maximum pulse length' + str(self.max_pulse_length) + 'when increment the pulse'
-
-                    i += 1
+                index, factor = self.increment_factor( range( len(self.pulse_array) ) )
+                index = self.pulse_table.increment( index, factor )
 
                 self.increment_count = 1
                 self.current_phase_index = 0
@@ -1331,50 +1185,46 @@ class Spectrum_M4I_6631_X8:
                 set_from_list = set(pulses)
                 for element in set_from_list:
                     if element in self.pulse_name_array:
+                        pass
+                    else:
+                        assert(1 == 2), "There is no pulse with the specified name"
 
-                        pulse_index = self.pulse_name_array.index(element)
-                        if int( self.pulse_array[pulse_index]['length_increment'][:-3] ) == 0:
-                            pass
-                        else:
-                            # convertion to ns
-                            temp = self.pulse_array[pulse_index]['length_increment'].split(' ')
-                            if temp[1] in self.timebase_dict:
-                                flag = self.timebase_dict[temp[1]]
-                                d_length = int(float(temp[0]))*flag
-                            else:
-                                assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
+                index, factor = self.increment_factor( [ self.pulse_name_array.index(element) for element in set_from_list ] )
+                index = self.pulse_table.increment( index, factor )
 
-                            temp2 = self.pulse_array[pulse_index]['length'].split(' ')
-                            if temp2[1] in self.timebase_dict:
-                                flag2 = self.timebase_dict[temp2[1]]
-                                leng = int(float(temp2[0]))*flag2
-                            else:
-                                assert(1 == 2), "Incorrect time dimension (ns, us, ms, s)"
-                            
-                            temp3 = self.pulse_array[pulse_index]['sigma'].split(' ')
-                            if temp3[1] in self.timebase_dict:
-                                flag3 = self.timebase_dict[temp3[1]]
-                                sigm = int(float(temp3[0]))*flag3
-                            else:
-                                assert(1 == 2), "Incorrect time dimension (ns, us, ms)"
-
-                            ratio = leng/sigm
-                            if ( leng + ratio*d_length ) <= self.max_pulse_length:
-                                if self.pulse_array[pulse_index]['function'] == 'SINE':
-                                    self.pulse_array[pulse_index]['length'] = str( leng + d_length ) + ' ns'
-                                    self.pulse_array[pulse_index]['sigma'] = str( sigm + d_length ) + ' ns'
-                                elif self.pulse_array[pulse_index]['function'] == 'GAUSS' or self.pulse_array[i]['function'] == 'SINC':
-                                    #ratio = leng/sigm
-                                    self.pulse_array[pulse_index]['length'] = str( leng + ratio*d_length ) + ' ns'
-                                    self.pulse_array[pulse_index]['sigma'] = str( sigm + d_length ) + ' ns'
-                            else:
-                                assert(1 == 2), 'Exceeded maximum pulse length' + str(self.max_pulse_length) + 'when increment the pulse'
+                self.increment_count = 1
+                self.current_phase_index = 0
 
-                        self.increment_count = 1
-                        self.current_phase_index = 0
+            assert( np.all( self.pulse_table.table['length'][index] <= self.max_pulse_length ) ), \
+                    'Exceeded maximum pulse length' + str(self.max_pulse_length) + 'when increment the pulse'
 
-                    else:
-                        assert(1 == 2), "There is no pulse with the specified name"
+            for i in index:
+                self.pulse_array[i]['length'] = self.pulse_table.to_string(i, 'length')
+                self.pulse_array[i]['sigma'] = self.pulse_table.to_string(i, 'sigma')
+
+    def increment_factor(self, index):
+        """
+        Pulses that are incremented by awg_increment() and the coefficients of the length increment:
+        1 for SINE; length/sigma for GAUSS and SINC. Other pulses are not incremented.
+        Length and sigma of the incremented pulses are taken in whole ns
+        """
+        table = self.pulse_table.table
+        rows = []
+        factor = []
+        for i in index:
+            fun = self.pulse_array[i]['function']
+            if table['length_increment'][i] == 0:
+                pass
+            elif fun == 'SINE' or fun == 'GAUSS' or fun == 'SINC':
+                table['length'][i] = np.trunc( table['length'][i] )
+                table['sigma'][i] = np.trunc( table['sigma'][i] )
+                rows.append(i)
+                if fun == 'SINE':
+                    factor.append(1.)
+                else:
+                    factor.append( table['length'][i] / table['sigma'][i] )
+
+        return rows, factor
 
     def awg_reset(self):
         """
@@ -1385,6 +1235,7 @@ class Spectrum_M4I_6631_X8:
         if self.test_flag != 'test':
             # reset the pulses; deepcopy helps to create a TRULY NEW array
             self.pulse_array = deepcopy( self.pulse_array_init )
+            self.pulse_table.reset()
 
             # free memory
             gc.collect()
@@ -1400,6 +1251,7 @@ class Spectrum_M4I_6631_X8:
         elif self.test_flag == 'test':
             # reset the pulses; deepcopy helps to create a TRULY NEW array
             self.pulse_array = deepcopy( self.pulse_array_init )
+            self.pulse_table.reset()
 
             # free memory
             gc.collect()
@@ -1424,6 +1276,7 @@ class Spectrum_M4I_6631_X8:
 
                 # free memory
                 self.pulse_array = deepcopy(self.pulse_array_init)
+                self.pulse_table.reset()
                 self.reset_count = 0
                 self.increment_count = 0
                 self.shift_count = 0
@@ -1441,6 +1294,7 @@ class Spectrum_M4I_6631_X8:
                         self.pulse_array[pulse_index]['phase'] = self.pulse_array_init[pulse_index]['phase']
                         self.pulse_array[pulse_index]['length'] = self.pulse_array_init[pulse_index]['length']
                         self.pulse_array[pulse_index]['sigma'] = self.pulse_array_init[pulse_index]['sigma']
+                        self.pulse_table.reset( pulse_index, fields = ('length', 'sigma') )
 
                         self.reset_count = 0
                         self.increment_count = 0
@@ -1449,6 +1303,7 @@ class Spectrum_M4I_6631_X8:
         elif self.test_flag == 'test':
             if len(pulses) == 0:
                 self.pulse_array = deepcopy(self.pulse_array_init)
+                self.pulse_table.reset()
                 self.reset_count = 0
                 self.increment_count = 0
                 self.shift_count = 0
@@ -1467,6 +1322,7 @@ class Spectrum_M4I_6631_X8:
                         self.pulse_array[pulse_index]['phase'] = self.pulse_array_init[pulse_index]['phase']
                         self.pulse_array[pulse_index]['length'] = self.pulse_array_init[pulse_index]['length']
                         self.pulse_array[pulse_index]['sigma'] = self.pulse_array_init[pulse_index]['sigma']
+                        self.pulse_table.reset( pulse_index, fields = ('length', 'sigma') )
 
                         self.reset_count = 0
                         self.increment_count = 0
@@ -2037,6 +1893,7 @@ class Spectrum_M4I_6631_X8:
         self.phase_array_length = []
         self.pulse_name_array = []
         self.pulse_array_init = []
+        self.pulse_table.clear()
         self.pulse_ch0_array = []
         self.pulse_ch1_array = []
         
@@ -2057,6 +1914,7 @@ class Spectrum_M4I_6631_X8:
         self.phase_array_length = []
         self.pulse_name_array = []
         self.pulse_array_init = []
+        self.pulse_table.clear()
         self.pulse_ch0_array = []
         self.pulse_ch1_array = []
         
@@ -3096,14 +2954,7 @@ class Spectrum_M4I_6631_X8:
                 # get length
                 leng = p_array[i]['length']
 
-                if leng[-2:] == 'ns':
-                    leng_time = int(float(leng[:-3])*self.sample_rate/1000)
-                elif leng[-2:] == 'us':
-                    leng_time = int(float(leng[:-3])*1000*self.sample_rate/1000)
-                elif leng[-2:] == 'ms':
-                    leng_time = int(float(leng[:-3])*1000000*self.sample_rate/1000)
-                elif leng[-2:] == 's':
-                    leng_time = int(float(leng[:-3])*1000000000*self.sample_rate/1000)
+                leng_time = int( pt.parse_time(leng)*self.sample_rate/1000 )
 
                 # get frequency
                 freq = p_array[i]['frequency']
@@ -3121,38 +2972,17 @@ class Spectrum_M4I_6631_X8:
                 # get sigma
                 sig = p_array[i]['sigma']
 
-                if sig[-2:] == 'ns':
-                    sig_time = int(float(sig[:-3])*self.sample_rate/1000)
-                elif sig[-2:] == 'us':
-                    sig_time = int(float(sig[:-3])*1000*self.sample_rate/1000)
-                elif sig[-2:] == 'ms':
-                    sig_time = int(float(sig[:-3])*1000000*self.sample_rate/1000)
-                elif sig[-2:] == 's':
-                    sig_time = int(float(sig[:-3])*1000000000*self.sample_rate/1000)
+                sig_time = int( pt.parse_time(sig)*self.sample_rate/1000 )
 
                 # get start
                 st = p_array[i]['start']
 
-                if st[-2:] == 'ns':
-                    st_time = int(float(st[:-3])*self.sample_rate/1000)
-                elif st[-2:] == 'us':
-                    st_time = int(float(st[:-3])*1000*self.sample_rate/1000)
-                elif st[-2:] == 'ms':
-                    st_time = int(float(st[:-3])*1000000*self.sample_rate/1000)
-                elif st[-2:] == 's':
-                    st_time = int(float(st[:-3])*1000000000*self.sample_rate/1000)
+                st_time = int( pt.parse_time(st)*self.sample_rate/1000 )
 
                 # get delta_start
                 del_st = p_array[i]['delta_start']
 
-                if del_st[-2:] == 'ns':
-                    del_st_time = int(float(del_st[:-3])*self.sample_rate/1000)
-                elif del_st[-2:] == 'us':
-                    del_st_time = int(float(del_st[:-3])*1000*self.sample_rate/1000)
-                elif del_st[-2:] == 'ms':
-                    del_st_time = int(float(del_st[:-3])*1000000*self.sample_rate/1000)
-                elif del_st[-2:] == 's':
-                    del_st_time = int(float(del_st[:-3])*1000000000*self.sample_rate/1000)
+                del_st_time = int( pt.parse_time(del_st)*self.sample_rate/1000 )
 
                 # get amp
                 amp = float(p_array[i]['amp'])
@@ -3189,14 +3019,7 @@ class Spectrum_M4I_6631_X8:
                 # get length
                 leng = p_array[i]['length']
 
-                if leng[-2:] == 'ns':
-                    leng_time = int(float(leng[:-3])*self.sample_rate/1000)
-                elif leng[-2:] == 'us':
-                    leng_time = int(float(leng[:-3])*1000*self.sample_rate/1000)
-                elif leng[-2:] == 'ms':
-                    leng_time = int(float(leng[:-3])*1000000*self.sample_rate/1000)
-                elif leng[-2:] == 's':
-                    leng_time = int(float(leng[:-3])*1000000000*self.sample_rate/1000)
+                leng_time = int( pt.parse_time(leng)*self.sample_rate/1000 )
 
                 # get frequency
                 freq = p_array[i]['frequency']
@@ -3214,38 +3037,17 @@ class Spectrum_M4I_6631_X8:
                 # get sigma
                 sig = p_array[i]['sigma']
 
-                if sig[-2:] == 'ns':
-                    sig_time = int(float(sig[:-3])*self.sample_rate/1000)
-                elif sig[-2:] == 'us':
-                    sig_time = int(float(sig[:-3])*1000*self.sample_rate/1000)
-                elif sig[-2:] == 'ms':
-                    sig_time = int(float(sig[:-3])*1000000*self.sample_rate/1000)
-                elif sig[-2:] == 's':
-                    sig_time = int(float(sig[:-3])*1000000000*self.sample_rate/1000)
+                sig_time = int( pt.parse_time(sig)*self.sample_rate/1000 )
 
                 # get start
                 st = p_array[i]['start']
 
-                if st[-2:] == 'ns':
-                    st_time = int(float(st[:-3])*self.sample_rate/1000)
-                elif st[-2:] == 'us':
-                    st_time = int(float(st[:-3])*1000*self.sample_rate/1000)
-                elif st[-2:] == 'ms':
-                    st_time = int(float(st[:-3])*1000000*self.sample_rate/1000)
-                elif st[-2:] == 's':
-                    st_time = int(float(st[:-3])*1000000000*self.sample_rate/1000)
+                st_time = int( pt.parse_time(st)*self.sample_rate/1000 )
 
                 # get delta_start
                 del_st = p_array[i]['delta_start']
 
-                if del_st[-2:] == 'ns':
-                    del_st_time = int(float(del_st[:-3])*self.sample_rate/1000)
-                elif del_st[-2:] == 'us':
-                    del_st_time = int(float(del_st[:-3])*1000*self.sample_rate/1000)
-                elif del_st[-2:] == 'ms':
-                    del_st_time = int(float(del_st[:-3])*1000000*self.sample_rate/1000)
-                elif del_st[-2:] == 's':
-                    del_st_time = int(float(del_st[:-3])*1000000000*self.sample_rate/1000)
+                del_st_time = int( pt.parse_time(del_st)*self.sample_rate/1000 )
 
                 # get amp
                 amp = float(p_array[i]['amp'])
@@ -3384,6 +3186,10 @@ class Spectrum_M4I_6631_X8:
         If a number of enabled channels are 2:
         In every segment every even index is a new data sample for CH0,
         every odd index is a new data sample for CH1.
+
+        The buffer is kept between the calls and only the segments with
+        changed pulses are recalculated. self.changed_segments is the list
+        of segments that differ from the card memory
         """
 
         # all the data
@@ -3392,189 +3198,59 @@ class Spectrum_M4I_6631_X8:
 
         # define buffer differently for only one or two channels enabled
         if self.channel == 1 or self.channel == 2:
-            # two bytes per sample; multiply by number of enabled channels
-            self.buffer_size = len( np.zeros(2 * self.memsize * 1) ) 
-            #buf = np.zeros(self.memsize * 1, dtype = np.float64 )
-
-            # define the buffer
-            self.pnBuffer = c_void_p()
-            self.qwBufferSize = uint64 (self.buffer_size)  # buffer size
-            self.pvBuffer = pvAllocMemPageAligned (self.qwBufferSize.value)
-            self.pnBuffer = cast (self.pvBuffer, ptr16)
-
-            # pulses for different channel
-            for element in pulses:
-                # individual pulses at each channel
-                for index2, element2 in enumerate( element ):
-                    # segmented memory; mid_point for GAUSS, SINC, and WURST
-                    mid_point = int( element2[4]/2 )
-
-                    # take a segment: self.segment_memsize*index2, self.segment_memsize*(index2 + 1)
-                    for i in range ( self.segment_memsize*index2, self.segment_memsize*(index2 + 1), 1):
-                                             #[      0,        1,               2,           3,                4,               5,     6,           7,               8,        9,     10]
-                        if element2[1] == 0: # SINE; [channel, function, frequency (MHz), phase, length (samples), sigma (samples), start, delta_start, amp_coefficient, n_wurst, b_sech]
-                            if i <= ( element2[4] + self.segment_memsize*index2 ):
-                                #buf[i]
-                                self.pnBuffer[i] = int(self.maxCAD / element2[8] * sin(2*pi*(( i - self.segment_memsize*index2))*element2[2] / self.sample_rate + element2[3]) )
-                            else:
-                                # keeping 0
-                                break
-                        elif element2[1] == 1: # GAUSS
-                            if i <= ( element2[4] + self.segment_memsize*index2 ):
-                                self.pnBuffer[i] = int(self.maxCAD / element2[8] * exp(-((( i - self.segment_memsize*index2) - mid_point)**2)*(1/(2*element2[5]**2)))*\
-                                    sin(2*pi*(( i - self.segment_memsize*index2))*element2[2] / self.sample_rate + element2[3]) )
-                            else:
-                                break
-                        elif element2[1] == 2: # SINC
-                            if i <= ( element2[4] + self.segment_memsize*index2 ):
-                                self.pnBuffer[i] = int(self.maxCAD / element2[8] * np.sinc(2*(( i - self.segment_memsize*index2) - mid_point) / (element2[5]) )*\
-                                    sin(2*pi*( i - self.segment_memsize*index2)*element2[2] / self.sample_rate + element2[3]) )
-                            else:
-                                break
-                        elif element2[1] == 3: # BLANK
-                            break
-                        elif element2[1] == 4: # WURST
-                            # at = A*( 1 - abs( sin(pi*(t-tp/2)/tp) )^n )
-                            # ph = 2*pi*(Fstr*t + 0.5*( Ffin - Fstr )*t^2/tp )
-                            # WURST = at*sin(ph + phase_0)
-                            if i <= ( element2[4] + self.segment_memsize*index2 ):
-                                self.pnBuffer[i] = int( self.maxCAD / element2[8] * ( 1 - abs( sin( pi*( ( i - self.segment_memsize*index2) - mid_point ) / element2[4] ) ) ** element2[9] )*\
-                                    sin(2*pi*( ( i - self.segment_memsize*index2) *  element2[2][0] / self.sample_rate + 0.5 * (element2[2][1] - element2[2][0])*\
-                                    ( i - self.segment_memsize*index2)**2 / element2[4] / self.sample_rate ) + element2[3] ))
-
-                            else:
-                                break
-                        elif element2[1] == 5: # SECH/TANH
-                            # at = Sech[b*tp*2^(n - 1) ((t - tp/2)/tp)^n];
-                            # ph = 2*Pi*bw/b*Log[Cosh[b*(t - tp/2)]]/2/Tanh[b*tp/2]
-                            # SECH/TANH = at*sin(ph + phase_0)
-                            freq_cen = ( element2[2][1] + element2[2][0] ) / 2
-                            if i <= ( element2[4] + self.segment_memsize*index2 ):
-                                self.pnBuffer[i] = int( self.maxCAD / element2[8] * (1 / np.cosh( element2[10] * element2[4] * 2 **(element2[9] - 1) * ( ( ( i - self.segment_memsize*index2) - mid_point ) / element2[4]  ) ** element2[9] ) ) * \
-                                    sin(2*pi*(element2[2][1] - element2[2][0]) / self.sample_rate / element2[10] * \
-                                    np.log( np.cosh( element2[10] * ( ( i - self.segment_memsize*index2) - mid_point ) ) ) / 2 / np.tanh( element2[10] * mid_point ) + element2[3] + \
-                                        2 * pi * i * freq_cen / self.sample_rate ))
-                            else:
-                                break
-
-            return self.pvBuffer, self.pnBuffer
-
+            num_ch = 1
         elif self.channel == 3:
-            # two bytes per sample; multiply by number of enabled channels
-            self.buffer_size = len( np.zeros(2 * self.memsize * 2) )
-            #buf = np.zeros(self.memsize * 2)
-            
+            num_ch = 2
+
+        # two bytes per sample; multiply by number of enabled channels
+        self.buffer_size = 2 * self.memsize * num_ch
+
+        # pulses and waveform keys of each segment
+        seg_pulses = [ [] for i in range( segments ) ]
+        keys = [ [] for i in range( segments ) ]
+        # pulses for different channel
+        for element in pulses:
+            # individual pulses at each channel
+            for index2, element2 in enumerate( element ):
+                # even indexes for CH0, odd indexes for CH1
+                if index2 < segments and ( num_ch == 1 or element2[0] == 0 or element2[0] == 1 ):
+                    seg_pulses[index2].append( element2 )
+                    keys[index2].append( ( element2[0], self.waveform_key( element2, min( element2[4] + 1, self.segment_memsize ), \
+                                            abs_shift = self.segment_memsize*index2 ) ) )
+
+        if self.multi_buffer_shape != ( self.buffer_size, segments, self.channel ):
             # define the buffer
-            self.pnBuffer = c_void_p()
             self.qwBufferSize = uint64 (self.buffer_size)  # buffer size
-            self.pvBuffer = pvAllocMemPageAligned (self.qwBufferSize.value)
-            self.pnBuffer = cast (self.pvBuffer, ptr16)
+            self.multi_pvBuffer = pvAllocMemPageAligned (self.qwBufferSize.value)
+            # additional line to convertion back to numpy
+            self.multi_pnBuffer = np.ctypeslib.as_array(cast (self.multi_pvBuffer, ptr16), shape = (int(num_ch * self.memsize), ))
+            self.multi_buffer_shape = ( self.buffer_size, segments, self.channel )
+            self.multi_buffer_keys = [ None ] * segments
+            self.multi_card_keys = [ None ] * segments
+
+        self.qwBufferSize = uint64 (self.buffer_size)
+        self.pvBuffer = self.multi_pvBuffer
+        self.pnBuffer = self.multi_pnBuffer
+
+        for index2 in range( segments ):
+            if keys[index2] == self.multi_buffer_keys[index2]:
+                continue
+
+            # take a segment: num_ch*self.segment_memsize*index2, num_ch*self.segment_memsize*(index2 + 1)
+            seg_start = self.segment_memsize*index2
+            self.pnBuffer[num_ch*seg_start:num_ch*(seg_start + self.segment_memsize)] = 0
+            for element2 in seg_pulses[index2]:
+                wave = self.pulse_waveform( element2, min( element2[4] + 1, self.segment_memsize ), abs_shift = seg_start )
+                if num_ch == 1:
+                    self.pnBuffer[seg_start:seg_start + len(wave)] = wave
+                else:
+                    self.pnBuffer[2*seg_start + element2[0]:2*(seg_start + len(wave)) + element2[0]:2] = wave
 
-            # pulses for different channel
-            for element in pulses:
-                # individual pulses at each channel
-                for index2, element2 in enumerate( element ):
-                    # segments memory; mid_point for GAUSS, SINC, and WURST
-                    mid_point = int( element2[4]/2 )
-                    
-                    if element2[0] == 0:
-                        # take a segment: 2*self.segment_memsize*index2, 2*self.segment_memsize*(index2 + 1)
-                        # fill even indexes for CH0; step in the cycle is 2
-                        for i in range (2 * self.segment_memsize*index2, 2 * self.segment_memsize*(index2 + 1), 2):
-                                                 #[      0,        1,               2,           3,                4,               5,     6,           7,               8,        9,     10]
-                            if element2[1] == 0: # SINE; [channel, function, frequency (MHz), phase, length (samples), sigma (samples), start, delta_start, amp_coefficient, n_wurst, b_sech]
-                                if i <= (2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    # Sine Signal CH_0; i/2 in order to keep the frequency
-                                    #buf[i] 
-                                    self.pnBuffer[i] = int(self.maxCAD / element2[8] * sin(2*pi*(( i/2 - self.segment_memsize*index2))*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 1: # GAUSS
-                                if i <= ( 2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    self.pnBuffer[i] = int(self.maxCAD / element2[8] * exp(-((( i/2 - self.segment_memsize*index2) - mid_point)**2)*(1/(2*element2[5]**2)))*\
-                                        sin(2*pi*(( i/2 - self.segment_memsize*index2))*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 2: # SINC
-                                if i <= ( 2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    self.pnBuffer[i] = int(self.maxCAD / element2[8] * np.sinc(2*(( i/2 - self.segment_memsize*index2) - mid_point) / (element2[5]) )*\
-                                        sin(2*pi*( i/2 - self.segment_memsize*index2)*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 3: # BLANK
-                                break
-                            elif element2[1] == 4: # WURST
-                                # at = A*( 1 - abs( sin(pi*(t-tp/2)/tp) )^n )
-                                # ph = 2*pi*(Fstr*t + 0.5*( Ffin - Fstr )*t^2/tp )
-                                # WURST = at*sin(ph + phase_0)
-                                if i <= ( 2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * ( 1 - abs( sin( pi*( (  i/2 - self.segment_memsize*index2) - mid_point ) / element2[4] ) ) ** element2[9] )*\
-                                        sin(2*pi*( (  i/2 - self.segment_memsize*index2) *  element2[2][0] / self.sample_rate + 0.5 * (element2[2][1] - element2[2][0])*\
-                                        (  i/2 - self.segment_memsize*index2)**2 / element2[4] / self.sample_rate ) + element2[3] ))
-                                else:
-                                    break
-                            elif element2[1] == 5: # SECH/TANH
-                                # at = Sech[b*tp*2^(n - 1) ((t - tp/2)/tp)^n];
-                                # ph = 2*Pi*bw/b*Log[Cosh[b*(t - tp/2)]]/2/Tanh[b*tp/2]
-                                # SECH/TANH = at*sin(ph + phase_0)
-                                freq_cen = ( element2[2][1] + element2[2][0] ) / 2
-                                if i <= ( 2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * (1 / np.cosh( element2[10] * element2[4] * 2 **(element2[9] - 1) * ( ( ( i/2 - self.segment_memsize*index2) - mid_point ) / element2[4]  ) ** element2[9] ) ) * \
-                                        sin(2*pi*(element2[2][1] - element2[2][0]) / self.sample_rate / element2[10] * \
-                                        np.log( np.cosh( element2[10] * ( ( i/2 - self.segment_memsize*index2) - mid_point ) ) ) / 2 / np.tanh( element2[10] * mid_point ) + element2[3] + \
-                                        2 * pi * (i/2) * freq_cen / self.sample_rate ))
-                                else:
-                                    break
+            self.multi_buffer_keys[index2] = keys[index2]
 
-                    elif element2[0] == 1:
-                        # fill odd indexes for CH1; step in the cycle is 2
-                        for i in range (1 + 2 * self.segment_memsize*index2, 1 + 2 * self.segment_memsize*(index2 + 1), 2):
-                                                 #[      0,        1,               2,           3,                4,               5,     6,           7,               8,        9]
-                            if element2[1] == 0: # SINE; [channel, function, frequency (MHz), phase, length (samples), sigma (samples), start, delta_start, amp_coefficient, n_wurst]
-                                if (i - 1) <= ( 2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    # Sine Signal CH_1; i/2 in order to keep the frequency
-                                    #buf[i]
-                                    self.pnBuffer[i] = int(self.maxCAD / element2[8] * sin(2*pi*(( (i - 1)/2 - self.segment_memsize*index2 ))*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 1: # GAUSS
-                                if (i - 1) <= ( 2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    self.pnBuffer[i] = int(self.maxCAD / element2[8] * exp(-((( (i - 1)/2 - self.segment_memsize*index2) - mid_point)**2)*(1/(2*element2[5]**2)))*\
-                                        sin(2*pi*(( (i - 1)/2 - self.segment_memsize*index2))*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 2: # SINC
-                                if (i - 1) <= ( 2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    self.pnBuffer[i] = int(self.maxCAD / element2[8] * np.sinc(2*(( (i - 1)/2 - self.segment_memsize*index2) - mid_point) / (element2[5]) )*\
-                                        sin(2*pi*( (i - 1)/2 - self.segment_memsize*index2)*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 3: # BLANK
-                                break
-                            elif element2[1] == 4: # WURST
-                                # at = A*( 1 - abs( sin(pi*(t-tp/2)/tp) )^n )
-                                # ph = 2*pi*(Fstr*t + 0.5*( Ffin - Fstr )*t^2/tp )
-                                # WURST = at*sin(ph + phase_0)
-                                if (i - 1) <= ( 2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * ( 1 - abs( sin( pi*( (  (i - 1)/2 - self.segment_memsize*index2) - mid_point ) / element2[4] ) ) ** element2[9] )*\
-                                        sin(2*pi*( (  (i - 1)/2 - self.segment_memsize*index2) *  element2[2][0] / self.sample_rate + 0.5 * (element2[2][1] - element2[2][0])*\
-                                        (  (i - 1)/2 - self.segment_memsize*index2)**2 / element2[4] / self.sample_rate ) + element2[3] ))
-                                else:
-                                    break
-                            elif element2[1] == 5: # SECH/TANH
-                                # at = Sech[b*tp*2^(n - 1) ((t - tp/2)/tp)^n];
-                                # ph = 2*Pi*bw/b*Log[Cosh[b*(t - tp/2)]]/2/Tanh[b*tp/2]
-                                # SECH/TANH = at*sin(ph + phase_0)
-                                freq_cen = ( element2[2][1] + element2[2][0] ) / 2
-                                if (i - 1) <= ( 2 * element2[4] + 2 * self.segment_memsize*index2 ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * (1 / np.cosh( element2[10] * element2[4] * 2 **(element2[9] - 1) * ( ( ( (i - 1)/2 - self.segment_memsize*index2) - mid_point ) / element2[4]  ) ** element2[9] ) ) * \
-                                        sin(2*pi*(element2[2][1] - element2[2][0]) / self.sample_rate / element2[10] * \
-                                        np.log( np.cosh( element2[10] * ( ( (i - 1)/2 - self.segment_memsize*index2) - mid_point ) ) ) / 2 / np.tanh( element2[10] * mid_point ) + element2[3] + \
-                                        2 * pi * (i - 1)/2 * freq_cen / self.sample_rate ))
-                                else:
-                                    break
+        self.changed_segments = [ i for i in range( segments ) if self.multi_card_keys[i] != self.multi_buffer_keys[i] ]
 
-            return self.pvBuffer, self.pnBuffer
+        return self.pvBuffer, self.pnBuffer.ctypes.data_as(ptr16)
 
     def preparing_buffer_single(self):
         """
@@ -3678,59 +3354,17 @@ class Spectrum_M4I_6631_X8:
             self.pvBuffer = pvAllocMemPageAligned (self.qwBufferSize.value)
             self.pnBuffer = cast (self.pvBuffer, ptr16)
 
+            # additional line to convertion back to numpy
+            self.pnBuffer = np.ctypeslib.as_array(self.pnBuffer, shape = (int(self.memsize), ))
+
             # pulses for different channel
             for element in pulses:
                 # individual pulses at each channel
                 for index2, element2 in enumerate( element ):
-                    # mid_point for GAUSS, SINC, and WURST
-                    mid_point = int( element2[4]/2 )
-
-                    for i in range (0, self.memsize, 1):
-                                                    #[      0,        1,               2,     3,                4,               5,     6,           7,               8,       9,     10]
-                        if element2[1] == 0: # SINE; [channel, function, frequency (MHz), phase, length (samples), sigma (samples), start, delta_start, amp_coefficient, n_wurst, b_sech]
-                            if i <= ( element2[4] ):
-                                #buf[i]
-                                self.pnBuffer[i] = int( self.maxCAD / element2[8] * sin(2*pi*(( i ))*element2[2] / self.sample_rate + element2[3]) )
-                            else:
-                                break
-                        elif element2[1] == 1: # GAUSS
-                            if i <= ( element2[4] ):
-                                self.pnBuffer[i] = int( self.maxCAD / element2[8] * exp(-((( i ) - mid_point)**2)*(1/(2*element2[5]**2)))*\
-                                    sin(2*pi*(( i ))*element2[2] / self.sample_rate + element2[3]) )
-                            else:
-                                break
-                        elif element2[1] == 2: # SINC
-                            if i <= ( element2[4] ):
-                                self.pnBuffer[i] = int( self.maxCAD / element2[8] * np.sinc(2*(( i ) - mid_point) / (element2[5]) )*\
-                                    sin(2*pi*( i )*element2[2] / self.sample_rate + element2[3]) )
-                            else:
-                                break
-                        elif element2[1] == 3: # BLANK
-                            break
-                        elif element2[1] == 4: # WURST
-                            # at = A*( 1 - abs( sin(pi*(t-tp/2)/tp) )^n )
-                            # ph = 2*pi*(Fstr*t + 0.5*( Ffin - Fstr )*t^2/tp )
-                            # WURST = at*sin(ph + phase_0)
-                            if i <= ( element2[4] ):
-                                self.pnBuffer[i] = int( self.maxCAD / element2[8] * ( 1 - abs( sin( pi*( i - mid_point ) / element2[4] ) ) ** element2[9] )*\
-                                    sin(2*pi*( i * element2[2][0] / self.sample_rate + 0.5 * (element2[2][1] - element2[2][0])*\
-                                    i**2  / element2[4] / self.sample_rate ) + element2[3] ) )
-                            else:
-                                break
-                        elif element2[1] == 5: # SECH/TANH
-                            # at = Sech[b*tp*2^(n - 1) ((t - tp/2)/tp)^n];
-                            # ph = 2*Pi*bw/b*Log[Cosh[b*(t - tp/2)]]/2/Tanh[b*tp/2]
-                            # SECH/TANH = at*sin(ph + phase_0)
-                            freq_cen = ( element2[2][1] + element2[2][0] ) / 2
-                            if i <= ( element2[4] ):
-                                self.pnBuffer[i] = int( self.maxCAD / element2[8] * ( 1 / np.cosh( element2[10] * element2[4] * 2 **(element2[9] - 1) * ( ( i - mid_point ) / element2[4]  ) ** element2[9] ) ) * \
-                                    sin(2*pi*(element2[2][1] - element2[2][0]) / self.sample_rate / element2[10] * \
-                                    np.log( np.cosh( element2[10] * ( i - mid_point ) ) ) / 2 / np.tanh( element2[10] * mid_point ) + element2[3] + \
-                                    2 * pi * i * freq_cen / self.sample_rate ))
-                            else:
-                                break
+                    wave = self.pulse_waveform( element2, min( element2[4] + 1, self.memsize ) )
+                    self.pnBuffer[0:len(wave)] = wave
 
-            return self.pvBuffer, self.pnBuffer
+            return self.pvBuffer, self.pnBuffer.ctypes.data_as(ptr16)
 
         elif self.channel == 3:
             # two bytes per sample; multiply by number of enabled channels
@@ -3743,107 +3377,19 @@ class Spectrum_M4I_6631_X8:
             self.pvBuffer = pvAllocMemPageAligned (self.qwBufferSize.value)
             self.pnBuffer = cast (self.pvBuffer, ptr16)
 
+            # additional line to convertion back to numpy
+            self.pnBuffer = np.ctypeslib.as_array(self.pnBuffer, shape = (int(2 * self.memsize), ))
+
             # pulses for different channel
             for element in pulses:
                 # individual pulses at each channel
                 for index2, element2 in enumerate( element ):
-                    # mid_point for GAUSS, SINC, and WURST
-                    mid_point = int( element2[4]/2 )
-
-                    
-                    if element2[0] == 0:
-                        # fill even indexes for CH0; step in the cycle is 2
-                        for i in range (0, 2 * self.memsize, 2):
-                                                        #[      0,        1,               2,     3,                4,               5,     6,           7,               8,       9,     10]
-                            if element2[1] == 0: # SINE; [channel, function, frequency (MHz), phase, length (samples), sigma (samples), start, delta_start, amp_coefficient, n_wurst, b_sech]
-                                if i <= ( 2 * element2[4] ):
-                                    # Sine Signal CH_0; i/2 in order to keep the frequency
-                                    # buf[i]
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * sin(2*pi*(( i/2 ))*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 1: # GAUSS
-                                if i <= ( 2 * element2[4] ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * exp(-((( i/2 ) - mid_point)**2)*(1/(2*element2[5]**2)))*\
-                                        sin(2*pi*(( i/2 ))*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 2: # SINC
-                                if i <= ( 2 * element2[4] ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * np.sinc(2*(( i/2 ) - mid_point) / (element2[5]) )*\
-                                        sin(2*pi*( i/2 )*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 3: # BLANK
-                                break
-                            elif element2[1] == 4: # WURST
-                                # at = A*( 1 - abs( sin(pi*(t-tp/2)/tp) )^n )
-                                # ph = 2*pi*(Fstr*t + 0.5*( Ffin - Fstr )*t^2/tp )
-                                # WURST = at*sin(ph + phase_0)                            
-                                if i <= ( 2 * element2[4] ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * ( 1 - abs( sin( pi*( i/2 - mid_point ) / element2[4] ) ) ** element2[9] )*\
-                                        sin(2*pi*( i/2 * element2[2][0] / self.sample_rate + 0.5 * (element2[2][1] - element2[2][0])*\
-                                        (i/2)**2  / element2[4] / self.sample_rate ) + element2[3] ) )
-                            elif element2[1] == 5: # SECH/TANH
-                                # at = Sech[b*tp*2^(n - 1) ((t - tp/2)/tp)^n];
-                                # ph = 2*Pi*bw/b*Log[Cosh[b*(t - tp/2)]]/2/Tanh[b*tp/2]
-                                # SECH/TANH = at*sin(ph + phase_0)
-                                freq_cen = ( element2[2][1] + element2[2][0] ) / 2
-                                if i <= ( 2 * element2[4] ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * (1 / np.cosh( element2[10] * element2[4] * 2 **(element2[9] - 1) * ( ( i/2 - mid_point ) / element2[4]  ) ** element2[9] ) ) * \
-                                        sin(2*pi*(element2[2][1] - element2[2][0]) / self.sample_rate / element2[10] * \
-                                        np.log( np.cosh( element2[10] * ( i/2 - mid_point ) ) ) / 2 / np.tanh( element2[10] * mid_point ) + element2[3] + \
-                                        2 * pi * (i/2) * freq_cen / self.sample_rate ))
-                                else:
-                                    break
-
-                    elif element2[0] == 1:
-                        # fill odd indexes for CH1; step in the cycle is 2
-                        for i in range (1 , 1 + 2 * self.memsize, 2):
-                                                        #[      0,        1,               2,     3,                4,               5,     6,           7,               8,       9,     10]
-                            if element2[1] == 0: # SINE; [channel, function, frequency (MHz), phase, length (samples), sigma (samples), start, delta_start, amp_coefficient, n_wurst, b_sech]
-                                if (i - 1) <= ( 2 * element2[4] ):
-                                    # Sine Signal CH_1; i/2 in order to keep the frequency
-                                    #buf[i]
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * sin(2*pi*(( (i - 1)/2 ))*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 1: # GAUSS
-                                if (i - 1) <= ( 2 * element2[4] ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * exp(-((( (i - 1)/2 ) - mid_point)**2)*(1/(2*element2[5]**2)))*\
-                                        sin(2*pi*(( (i - 1)/2 ))*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 2: # SINC
-                                if (i - 1) <= ( 2 * element2[4] ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * np.sinc(2*(( (i - 1)/2 ) - mid_point) / (element2[5]) )*\
-                                        sin(2*pi*( (i - 1)/2 )*element2[2] / self.sample_rate + element2[3]) )
-                                else:
-                                    break
-                            elif element2[1] == 3: # BLANK
-                                break
-                            elif element2[1] == 4: # WURST
-                                # at = A*( 1 - abs( sin(pi*(t-tp/2)/tp) )^n )
-                                # ph = 2*pi*(Fstr*t + 0.5*( Ffin - Fstr )*t^2/tp )
-                                # WURST = at*sin(ph + phase_0)                            
-                                if (i - 1) <= ( 2 * element2[4] ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * ( 1 - abs( sin( pi*( (i - 1)/2 - mid_point ) / element2[4] ) ) ** element2[9] )*\
-                                        sin(2*pi*( (i - 1)/2 * element2[2][0] / self.sample_rate + 0.5 * (element2[2][1] - element2[2][0])*\
-                                        ((i - 1)/2)**2  / element2[4] / self.sample_rate ) + element2[3] ) )
-                            elif element2[1] == 5: # SECH/TANH
-                                # at = Sech[b*tp*2^(n - 1) ((t - tp/2)/tp)^n];
-                                # ph = 2*Pi*bw/b*Log[Cosh[b*(t - tp/2)]]/2/Tanh[b*tp/2]
-                                # SECH/TANH = at*sin(ph + phase_0)
-                                freq_cen = ( element2[2][1] + element2[2][0] ) / 2
-                                if (i - 1) <= ( 2 * element2[4] ):
-                                    self.pnBuffer[i] = int( self.maxCAD / element2[8] * (1 / np.cosh( element2[10] * element2[4] * 2 **(element2[9] - 1) * ( ( (i - 1)/2 - mid_point ) / element2[4]  ) ** element2[9] ) ) * \
-                                        sin(2*pi*(element2[2][1] - element2[2][0]) / self.sample_rate / element2[10] * \
-                                        np.log( np.cosh( element2[10] * ( (i - 1)/2 - mid_point ) ) ) / 2 / np.tanh( element2[10] * mid_point ) + element2[3] + \
-                                        2 * pi * (i - 1)/2 * freq_cen / self.sample_rate ))
-                                else:
-                                    break
+                    # even indexes for CH0, odd indexes for CH1
+                    if element2[0] == 0 or element2[0] == 1:
+                        wave = self.pulse_waveform( element2, min( element2[4] + 1, self.memsize ) )
+                        self.pnBuffer[element2[0]:2*len(wave) + element2[0]:2] = wave
 
-            return self.pvBuffer, self.pnBuffer
+            return self.pvBuffer, self.pnBuffer.ctypes.data_as(ptr16)
 
     def closest_power_of_two(self, x):
         """
@@ -3851,6 +3397,93 @@ class Spectrum_M4I_6631_X8:
         """
         return int( 2**int(log2(x - 1) + 1 ) )
 
+    def waveform_key(self, element, num_samples, abs_shift = 0, mid_shift = 0, rnd_phase = 0):
+        """
+        Key of the pulse_waveform() cache:
+        (function, frequency, phase, length, sigma, amp, n, b, number of samples, shifts, sample rate)
+        The pulse start matters only for the SECH/TANH carrier
+        """
+        if element[1] != 5:
+            abs_shift = 0
+            mid_shift = 0
+
+        return ( element[1], tuple( np.ravel( element[2] ) ), element[3] + rnd_phase, element[4], element[5], \
+                element[8], element[9], element[10], num_samples, abs_shift, mid_shift, self.sample_rate )
+
+    def pulse_waveform(self, element, num_samples, abs_shift = 0, mid_shift = 0, rnd_phase = 0):
+        """
+        Vectorized calculation of one AWG pulse as int64 samples
+        element is a row of convertion_to_numpy();
+        num_samples is the number of samples to calculate starting from the pulse start;
+        abs_shift is the position of the pulse start used by the SECH/TANH carrier;
+        mid_shift is added to mid_point in the SECH/TANH phase;
+        rnd_phase is an additional phase for DEER pulses
+        The order of the operations is the same as in the previous per-sample loops
+        Calculated pulses are cached, except the ones with a random phase;
+        the returned array should not be modified
+        """
+        if rnd_phase == 0:
+            key = self.waveform_key( element, num_samples, abs_shift = abs_shift, mid_shift = mid_shift )
+            if key in self.waveform_cache:
+                return self.waveform_cache[key]
+
+        # [channel, function, frequency (MHz), phase, length (samples), sigma (samples), start, delta_start, amp_coefficient, n_wurst, b_sech]
+        k = np.arange( num_samples, dtype = np.float64 )
+        # mid_point for GAUSS, SINC, WURST, and SECH/TANH
+        mid_point = int( element[4]/2 )
+        coef = self.maxCAD / element[8]
+        phase = element[3] + rnd_phase
+
+        if element[1] == 0: # SINE
+            wave = coef * np.sin(2*pi*k*element[2] / self.sample_rate + phase )
+        elif element[1] == 1: # GAUSS
+            wave = coef * np.exp(-((k - mid_point)**2)*(1/(2*element[5]**2))) * \
+                    np.sin(2*pi*k*element[2] / self.sample_rate + phase )
+        elif element[1] == 2: # SINC
+            wave = coef * np.sinc(2*(k - mid_point) / (element[5]) ) * \
+                    np.sin(2*pi*k*element[2] / self.sample_rate + phase )
+        elif element[1] == 4: # WURST
+            # at = A*( 1 - abs( sin(pi*(t-tp/2)/tp) )^n )
+            # ph = 2*pi*(Fstr*t + 0.5*( Ffin - Fstr )*t^2/tp )
+            # WURST = at*sin(ph + phase_0)
+            wave = coef * ( 1 - np.abs( np.sin( pi*( k - mid_point ) / element[4] ) ) ** element[9] ) * \
+                    np.sin(2*pi*( k * element[2][0] / self.sample_rate + 0.5 * (element[2][1] - element[2][0]) * \
+                    k**2 / element[4] / self.sample_rate ) + phase )
+        elif element[1] == 5: # SECH/TANH
+            # at = Sech[b*tp*2^(n - 1) ((t - tp/2)/tp)^n];
+            # ph = 2*Pi*bw/b*Log[Cosh[b*(t - tp/2)]]/2/Tanh[b*tp/2]
+            # SECH/TANH = at*sin(ph + phase_0)
+            freq_cen = ( element[2][1] + element[2][0] ) / 2
+            wave = coef * ( 1 / np.cosh( element[10] * element[4] * 2 **(element[9] - 1) * ( ( k - mid_point ) / element[4] ) ** element[9] ) ) * \
+                    np.sin(2*pi*(element[2][1] - element[2][0]) / self.sample_rate / element[10] * \
+                    np.log( np.cosh( element[10] * ( k - mid_point ) ) ) / 2 / np.tanh( element[10] * ( mid_point + mid_shift ) ) + phase + \
+                    2 * pi * ( k + abs_shift ) * freq_cen / self.sample_rate )
+        else: # BLANK
+            wave = np.zeros( 0 )
+
+        wave = wave.astype(int64)
+        if rnd_phase == 0:
+            if len( self.waveform_cache ) >= self.waveform_cache_size:
+                self.waveform_cache.clear()
+            wave.flags.writeable = False
+            self.waveform_cache[key] = wave
+
+        return wave
+
+    def segment_runs(self, segments):
+        """
+        Split a sorted list of segment indexes into runs of neighbouring ones
+        [1, 2, 3, 7] -> [(1, 3), (7, 7)]
+        """
+        runs = []
+        for index in segments:
+            if runs and runs[-1][1] == index - 1:
+                runs[-1] = ( runs[-1][0], index )
+            else:
+                runs.append( ( index, index ) )
+
+        return runs
+
     def write_seg_memory(self, hCard, dwStepIndex, dwStepNextIndex, dwSegmentIndex, dwLoops, dwFlags):
         """
         Function for setting up the sequence memory
@@ -3940,155 +3573,30 @@ class Spectrum_M4I_6631_X8:
             self.pvBuffer = pvAllocMemPageAligned (self.qwBufferSize.value)
             self.pnBuffer = cast (self.pvBuffer, ptr16)
 
+            # additional line to convertion back to numpy
+            self.pnBuffer = np.ctypeslib.as_array(self.pnBuffer, shape = (int(self.memsize), ))
+
             # run over defined pulses inside a sequence point
             for index, element in enumerate(arguments_array[0]):
-                # for DEER pulse with random phase
-                #rnd_phase = 2*pi*random.random()
-
-                if element == 0: # 'SINE'
-                    # always zero phase in Sine: i
-                    # one phase in Sine: i - pulse_start_smp[index]
-
-                    for i in range(pulse_start_smp[index], self.memsize):
-
-                        if i < (pulse_start_smp[index] ):
-                            pass
-                        elif ( i >= ( pulse_start_smp[index] ) and \
-                               i <= (pulse_start_smp[index] + pulse_length_smp[index] ) ):
-                            
-                            if pulse_phase_np[index] != 1000:
-                                # ( i - pulse_start_smp[index] ) for always zero phase
-                                self.pnBuffer[i] = int( self.maxCAD / pulse_amp[index] * sin(2*pi*(( i - pulse_start_smp[index] ))*pulse_frequency[index] / self.sample_rate + pulse_phase_np[index] ) )
-
-                            else:
-                                # for DEER pulse with random phase
-                                rnd_phase = 2*pi*random.random()
-                                self.pnBuffer[i] = int( self.maxCAD / pulse_amp[index] * sin(2*pi*(( i - pulse_start_smp[index] ))*pulse_frequency[index] / self.sample_rate + \
-                                                    pulse_phase_np[index] ) + rnd_phase )
-                        else:
-                            break
-
-                elif element == 1: # GAUSS
-                    # mid_point for GAUSS and SINC and WURST and SECH/TANH
-                    # always zero phase in Sine: i
-                    # one phase in Sine: i - pulse_start_smp[index]
-
-                    mid_point = int( pulse_start_smp[index] + ( pulse_length_smp[index] )/2 )
-
-                    for i in range(pulse_start_smp[index], self.memsize):
-                        if i < (pulse_start_smp[index] ):
-                            pass
-                        elif ( i >= ( pulse_start_smp[index] ) and \
-                               i <= (pulse_start_smp[index] + pulse_length_smp[index] ) ):
-                            
-                            if pulse_phase_np[index] != 1000:
-                                #self.full_buffer[point, i] 
-                                # ( i - pulse_start_smp[index] ) in Sine for always zero phase
-                                self.pnBuffer[i] = int( self.maxCAD / pulse_amp[index]* exp(-((( i ) - mid_point)**2)*(1/(2*pulse_sigma_smp[index]**2)))*\
-                                                        sin(2*pi*(( i - pulse_start_smp[index] ))*pulse_frequency[index] / self.sample_rate + pulse_phase_np[index] ) )
-
-                            else:
-                                # for DEER pulse with random phase
-                                rnd_phase = 2*pi*random.random()
-                                self.pnBuffer[i] = int( self.maxCAD / pulse_amp[index] * exp(-((( i ) - mid_point)**2)*(1/(2*pulse_sigma_smp[index]**2)))*\
-                                                        sin(2*pi*(( i - pulse_start_smp[index] ))*pulse_frequency[index] / self.sample_rate + pulse_phase_np[index] +\
-                                                        rnd_phase) )
-                        else:
-                            break
-
-                elif element == 2: # 'SINC'
-                    # mid_point for GAUSS and SINC and WURST and SECH/TANH
-                    # always zero phase in Sine: i
-                    # one phase in Sine: i - pulse_start_smp[index]
-
-                    mid_point = int( pulse_start_smp[index] + ( pulse_length_smp[index] )/2 )
-
-                    for i in range(pulse_start_smp[index], self.memsize):
-                        if i < (pulse_start_smp[index]):
-                            pass
-                        elif ( i >= ( pulse_start_smp[index] ) and \
-                               i <= (pulse_start_smp[index] + pulse_length_smp[index] ) ):
-                            
-                            if pulse_phase_np[index] != 1000:
-                                self.full_buffer[point, i] 
-                                # ( i - pulse_start_smp[index] ) in Sine for always zero phase
-                                self.pnBuffer[i] = int( self.maxCAD / pulse_amp[index] * np.sinc(2*(( i ) - mid_point) / (pulse_sigma_smp[index]) )*\
-                                                           sin(2*pi*(( i - pulse_start_smp[index] ))*pulse_frequency[index] / self.sample_rate + pulse_phase_np[index] ) )
-
-                            else:
-                                # for DEER pulse with random phase
-                                rnd_phase = 2*pi*random.random()
-                                self.pnBuffer[i] = int( self.maxCAD / pulse_amp[index] * np.sinc(2*(( i ) - mid_point) / (pulse_sigma_smp[index]) )*\
-                                                        sin(2*pi*(( i - pulse_start_smp[index] ))*pulse_frequency[index] / self.sample_rate + pulse_phase_np[index] +\
-                                                        rnd_phase) )
-                        else:
-                            break
-
-                elif element == 3: # BLANK
-                    pass
-
-                elif element == 4: # 'WURST'
-                    # mid_point for GAUSS and SINC and WURST and SECH/TANH
-                    # at = A*( 1 - abs( sin(pi*(t-tp/2)/tp) )^n )
-                    # ph = 2*pi*(Fstr*t + 0.5*( Ffin - Fstr )*t^2/tp )
-                    # WURST = at*sin(ph + phase_0)
-                    # ( i - pulse_start_smp[index] ) for 
-                    # always zero phase in Sine: i
-                    # one phase in Sine: i - pulse_start_smp[index]
-
-                    mid_point = int( pulse_start_smp[index] + ( pulse_length_smp[index] )/2 )
-
-                    for i in range(pulse_start_smp[index], self.memsize):
-                        if i < (pulse_start_smp[index]):
-                            pass
-                        elif ( i >= ( pulse_start_smp[index] ) and \
-                               i <= (pulse_start_smp[index] + pulse_length_smp[index] ) ):
-                            
-                            if pulse_phase_np[index] != 1000:
-                                # ( i - pulse_start_smp[index] ) in Sine for always zero phase
-                                self.pnBuffer[i] = int( self.maxCAD / pulse_amp[index] * ( 1 - abs( sin( pi*( i - mid_point ) / pulse_length_smp[index] ) ) ** pulse_n_wurst[index] )*\
-                                                        sin(2*pi*( ( i - pulse_start_smp[index] ) * pulse_frequency[index][0] / self.sample_rate + 0.5 * \
-                                                        (pulse_frequency[index][1] - pulse_frequency[index][0]) * ( i - pulse_start_smp[index] )**2 \
-                                                        / pulse_length_smp[index] / self.sample_rate ) + pulse_phase_np[index] ))
-
-                            else:
-                                # for DEER pulse with random phase
-                                rnd_phase = 2*pi*random.random()
-                                self.pnBuffer[i] = int( self.maxCAD / pulse_amp[index] * ( 1 - abs( sin( pi*( i - mid_point ) / pulse_length_smp[index] ) ) ** pulse_n_wurst[index] )*\
-                                                        sin(2*pi*( ( i - pulse_start_smp[index] ) * pulse_frequency[index][0] / self.sample_rate + 0.5 * \
-                                                        (pulse_frequency[index][1] - pulse_frequency[index][0]) * ( i - pulse_start_smp[index] )**2 \
-                                                        / pulse_length_smp[index] / self.sample_rate ) + pulse_phase_np[index] + rnd_phase ))
-
-                        else:
-                            break
-
-                elif element == 5: # 'SECH/TANH'
-                    # mid_point for GAUSS and SINC and WURST and SECH/TANH
-                    # at = A*Sech[b*tp*2^(n - 1) ((t - tp/2)/tp)^n]
-                    # ph = 2*Pi*bw/b*Log[Cosh[b*(t - tp/2)]]/2/Tanh[b*tp/2]
-                    # SECH = at*sin(ph + phase_0)
-                    # ( i - pulse_start_smp[index] ) for 
-                    # always zero phase in Sine: i
-                    # one phase in Sine: i - pulse_start_smp[index]
+                if element == 3: # BLANK
+                    continue
 
-                    mid_point = int( pulse_start_smp[index] + ( pulse_length_smp[index] )/2 )
-                    freq_cen = ( pulse_frequency[index][1] + pulse_frequency[index][0] ) / 2
-
-                    for i in range(pulse_start_smp[index], self.memsize):
-                        if i < (pulse_start_smp[index]):
-                            pass
-                        elif ( i >= ( pulse_start_smp[index] ) and \
-                               i <= (pulse_start_smp[index] + pulse_length_smp[index] ) ):
-                            
-                            # ( i - pulse_start_smp[index] ) in Sine for always zero phase
-                            self.pnBuffer[i] = int( self.maxCAD / pulse_amp[index] * ( 1 / np.cosh( pulse_b_sech[index] * pulse_length_smp[index] * 2 ** (pulse_n_wurst[index] - 1)  * \
-                                ( ( i - mid_point ) / pulse_length_smp[index] )** pulse_n_wurst[index] ) ) *\
-                                sin(2*pi*(pulse_frequency[index][1] - pulse_frequency[index][0]) / self.sample_rate / pulse_b_sech[index] * np.log( np.cosh( pulse_b_sech[index] \
-                                    * ( i - mid_point )  ) ) / 2 / np.tanh( pulse_b_sech[index] * mid_point ) + pulse_phase_np[index] + 2 * pi * i * freq_cen / self.sample_rate ))
-                        else:
-                            break
-
-            return self.pvBuffer, self.pnBuffer
+                # for DEER pulse with random phase; SECH/TANH is always without it
+                if pulse_phase_np[index] == 1000 and element != 5:
+                    rnd_phase = 2*pi*random.random()
+                else:
+                    rnd_phase = 0
+
+                # ( i - pulse_start_smp[index] ) in Sine for always zero phase
+                # mid_point and the SECH/TANH carrier are counted from the start of the buffer
+                start = pulse_start_smp[index]
+                element2 = ( 0, element, pulse_frequency[index], pulse_phase_np[index], pulse_length_smp[index], pulse_sigma_smp[index], \
+                             start, pulse_delta_start_smp[index], pulse_amp[index], pulse_n_wurst[index], pulse_b_sech[index] )
+                wave = self.pulse_waveform( element2, max( 0, min( pulse_length_smp[index] + 1, self.memsize - start ) ), \
+                                            abs_shift = start, mid_shift = start, rnd_phase = rnd_phase )
+                self.pnBuffer[start:start + len(wave)] = wave
+
+            return self.pvBuffer, self.pnBuffer.ctypes.data_as(ptr16)
 
         # Modification for vectorized buffer filling 12-08-2021
         # It decreases buffer filling time 2-3 times
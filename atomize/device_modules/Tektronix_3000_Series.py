@@ -4,7 +4,6 @@
 import os
 import gc
 import sys
-import pyvisa
 import numpy as np 
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
@@ -44,6 +43,12 @@ class Tektronix_3000_Series:
         self.tb_max = 10000000000 # in ns
         self.tb_min = 1           # in ns
 
+        # y_ref, y_inc, y_orig of the channels and the time resolution;
+        # they are queried once and cleared by the functions changing them
+        self.preamble_cache = {}
+        self.time_resolution_cache = 0
+        self.encoding_flag = 0
+
         # Test run parameters
         # These values are returned by the modules in the test run 
         if len(sys.argv) > 1:
@@ -53,10 +58,9 @@ class Tektronix_3000_Series:
 
         if self.test_flag != 'test':
             if self.config['interface'] == 'ethernet':
-                rm = pyvisa.ResourceManager()
                 try:
                     self.status_flag = 1
-                    self.device = rm.open_resource(self.config['ethernet_address'])
+                    self.device = cutil.open_resource(self.config['ethernet_address'])
                     self.device.timeout = self.config['timeout']; # in ms
                     self.device.read_termination = self.config['read_termination']
                     try:
@@ -69,7 +73,7 @@ class Tektronix_3000_Series:
                         #    general.message('During internal device test errors are found')
                         #    self.status_flag = 0
                         #    sys.exit()
-                    except pyvisa.VisaIOError:
+                    except cutil.VisaIOError:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
@@ -77,7 +81,7 @@ class Tektronix_3000_Series:
                         general.message("No connection")
                         self.status_flag = 0
                         sys.exit()
-                except pyvisa.VisaIOError:
+                except cutil.VisaIOError:
                     general.message("No connection")
                     self.status_flag = 0
                     sys.exit()
@@ -150,6 +154,27 @@ class Tektronix_3000_Series:
             self.status_flag = 0
             sys.exit()
 
+    def data_encoding(self):
+        # the encoding is set only once; the scaling depends on it
+        if self.encoding_flag == 0:
+            self.device_write('DATa:ENCdg RIBinary')
+            self.device_write('DATa:WIDth ' + '2')
+            self.clear_preamble()
+            self.encoding_flag = 1
+
+    def waveform_scaling(self, flag):
+        # the data source should be already set to flag
+        try:
+            return self.preamble_cache[flag]
+        except KeyError:
+            answer = self.device_query("WFMPre:YOFf?;YMUlt?;YZEro?").split(';')
+            self.preamble_cache[flag] = tuple( float(x) for x in answer )
+            return self.preamble_cache[flag]
+
+    def clear_preamble(self):
+        self.preamble_cache = {}
+        self.time_resolution_cache = 0
+
     #### device specific functions
     def oscilloscope_name(self):
         if self.test_flag != 'test':
@@ -195,6 +220,7 @@ class Tektronix_3000_Series:
                 if int(poi) != temp:
                     general.message("Desired record length cannot be set, the nearest available value is used")
                 self.device_write("HORizontal:RECOrdlength " + str(poi))
+                self.clear_preamble()
             elif len(points) == 0:
                 answer = int(self.device_query('HORizontal:RECOrdlength?'))
                 return answer
@@ -220,6 +246,7 @@ class Tektronix_3000_Series:
                 if at in self.ac_type_dic:
                     flag = self.ac_type_dic[at]
                     self.device_write("ACQuire:MODe "+ str(flag))
+                    self.clear_preamble()
                 else:
                     general.message("Invalid acquisition type")
                     sys.exit()
@@ -304,6 +331,7 @@ class Tektronix_3000_Series:
                     general.message("Timebase cannot be lower than 1 ns. The nearest available value is set")
 
                 self.device_write("HORizontal:SCAle "+ str(number_tb/1000000000))            
+                self.clear_preamble()
 
             elif len(timebase) == 0:
                 answer = float(self.device_query("HORizontal:SCAle?"))*1000000
@@ -336,8 +364,10 @@ class Tektronix_3000_Series:
 
     def oscilloscope_time_resolution(self):
         if self.test_flag != 'test':
-            points = int(self.oscilloscope_record_length())
-            answer = 1000000*float(self.device_query("HORizontal:SCAle?"))/points
+            if self.time_resolution_cache == 0:
+                points = int(self.oscilloscope_record_length())
+                self.time_resolution_cache = 1000000*float(self.device_query("HORizontal:SCAle?"))/points
+            answer = self.time_resolution_cache
             return answer
         elif self.test_flag == 'test':
             answer = 1000000*float(self.test_timebase)/self.test_record_length
@@ -401,16 +431,13 @@ class Tektronix_3000_Series:
                 flag = self.channel_dict[ch]
                 if flag[0] == 'C' and int(flag[-1]) <= self.analog_channels:
                     self.device_write('DATa:SOUrce ' + str(flag))
-                    self.device_write('DATa:ENCdg RIBinary')
-                    self.device_write('DATa:WIDth ' + '2') #?
+                    self.data_encoding()
 
                     array_y = self.device_read_binary('CURVe?')
                     #x_orig=float(self.device_query("WFMPre:XZEro?"))
                     #x_inc=float(self.device_query("WFMPre:XINcr?"))
                     #general.message(preamble)
-                    y_ref = float(self.device_query("WFMPre:YOFf?"))
-                    y_inc = float(self.device_query("WFMPre:YMUlt?"))
-                    y_orig = float(self.device_query("WFMPre:YZEro?"))
+                    y_ref, y_inc, y_orig = self.waveform_scaling(flag)
                     #general.message(y_inc)
                     #general.message(y_orig)
                     #general.message(y_ref)
@@ -435,6 +462,47 @@ class Tektronix_3000_Series:
                 array_y = np.arange(self.test_stop - self.test_start + 1)
                 return array_y
 
+    def oscilloscope_get_curves(self, *channels):
+        if self.test_flag != 'test':
+            flags = []
+            for channel in channels:
+                ch = str(channel)
+                if ch in self.channel_dict and self.channel_dict[ch][0] == 'C' and \
+                                        int(self.channel_dict[ch][-1]) <= self.analog_channels:
+                    flags.append( self.channel_dict[ch] )
+                else:
+                    general.message('Invalid channel')
+                    sys.exit()
+
+            if len(flags) == 0:
+                general.message("Invalid argument")
+                sys.exit()
+
+            self.data_encoding()
+            raw_data = []
+            scaling = []
+            for flag in flags:
+                self.device_write('DATa:SOUrce ' + str(flag))
+                raw_data.append( self.device_read_binary('CURVe?') )
+                scaling.append( self.waveform_scaling(flag) )
+
+            # y_ref, y_inc, y_orig as columns for all channels at once
+            y_ref, y_inc, y_orig = np.asarray(scaling).T[:, :, np.newaxis]
+            array_y = (np.asarray(raw_data) - y_ref)*y_inc + y_orig
+            return array_y
+
+        elif self.test_flag == 'test':
+            assert(len(channels) > 0), 'Invalid argument'
+            for channel in channels:
+                ch = str(channel)
+                assert(ch in self.channel_dict), 'Invalid channel is given'
+                flag = self.channel_dict[ch]
+                if flag[0] == 'C' and int(flag[-1]) > self.analog_channels:
+                    assert(1 == 2), 'Invalid channel is given'
+
+            array_y = np.tile( np.arange(self.test_stop - self.test_start + 1), (len(channels), 1) )
+            return array_y
+
     def oscilloscope_sensitivity(self, *channel):
         if self.test_flag != 'test':
             if len(channel) == 2:
@@ -449,6 +517,7 @@ class Tektronix_3000_Series:
                             flag = self.channel_dict[ch]
                             if flag[0] == 'C' and int(flag[-1]) <= self.analog_channels:
                                 self.device_write(str(flag) + ':SCAle ' + str(val/coef))
+                                self.clear_preamble()
                             else:
                                 general.message("Invalid channel is given")
                                 sys.exit()
@@ -522,6 +591,7 @@ class Tektronix_3000_Series:
                         flag = self.channel_dict[ch]
                         if flag[0] == 'C' and int(flag[-1]) <= self.analog_channels:
                             self.device_write(str(flag) + ':OFFSet ' + str(val/coef))
+                            self.clear_preamble()
                         else:
                             general.message("Invalid channel is given")
                             sys.exit()
@@ -592,6 +662,7 @@ class Tektronix_3000_Series:
                 if scaling in self.timebase_dict:
                     coef = self.timebase_dict[scaling]
                     self.device_write("HORizontal:DELay:TIMe " + str(offset/coef))
+                    self.clear_preamble()
                 else:
                     general.message("Incorrect horizontal offset")
                     sys.exit()
@@ -858,6 +929,9 @@ class Tektronix_3000_Series:
     def oscilloscope_command(self, command):
         if self.test_flag != 'test':
             self.device_write(command)
+            # any setting can be changed
+            self.clear_preamble()
+            self.encoding_flag = 0
         elif self.test_flag == 'test':
             pass
 
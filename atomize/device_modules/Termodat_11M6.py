@@ -5,8 +5,6 @@ import os
 import gc
 import sys
 import time
-import serial
-import minimalmodbus
 import atomize.device_modules.config.config_utils as cutil
 import atomize.general_modules.general_functions as general
 
@@ -48,6 +46,9 @@ class Termodat_11M6:
 
         if self.test_flag != 'test':
             if self.config['interface'] == 'rs485':
+                # serial and minimalmodbus are imported only in the real run
+                import serial
+                import minimalmodbus
                 try:
                     self.status_flag = 1
                     self.device = minimalmodbus.Instrument(self.config['serial_address'], self.modbus_parameters[1])
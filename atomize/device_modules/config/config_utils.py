@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import sys
+import threading
 import configparser
-from pyvisa.constants import StopBits, Parity
 import atomize.general_modules.general_functions as general
 
+# process-wide registry of VISA connections
+# one ResourceManager is created on the first request and shared by all the devices
+visa_resource_manager = None
+# resource name: LazyResource
+visa_resources = {}
+visa_lock = threading.RLock()
+
 # read config data
 def read_conf_util(path_config_file):
     # getting config data
@@ -34,15 +42,18 @@ def read_conf_util(path_config_file):
     baudrate = int(config['SERIAL']['baudrate'])
     databits = int(config['SERIAL']['databits'])
 
+    # pyvisa and minimalmodbus are imported only by the serial devices
     parity = config['SERIAL']['parity']
-    if interface != 'rs485':
+    if interface == 'rs232':
+        from pyvisa.constants import StopBits, Parity
+
         if parity == 'odd':
             parity = Parity.odd
         elif parity == 'even':
             parity = Parity.even
         elif parity == 'none':
             parity = Parity.none
-    else:
+    elif interface == 'rs485':
         import minimalmodbus
 
         if parity == 'even':
@@ -53,15 +64,14 @@ def read_conf_util(path_config_file):
             parity = minimalmodbus.serial.PARITY_NONE   
 
     stopbits = config['SERIAL']['stopbits']
-    if interface != 'rs485':
+    if interface == 'rs232':
         if stopbits == 'one':
             stopbits = StopBits.one
         elif stopbits == 'onehalf':
             stopbits = StopBits.one_and_a_half
         elif stopbits == 'two':
             stopbits = StopBits.two
-    else:
-        import minimalmodbus
+    elif interface == 'rs485':
         if stopbits == 'one':
             stopbits = 1
         elif stopbits == 'two':
@@ -124,6 +134,70 @@ def read_modbus_parameters(path_config_file):
     list_parameters = [mode, slave_address]
     return list_parameters
 
+def resource_manager():
+    """
+    The shared pyvisa ResourceManager; the VISA backend is initialized only once per process
+    """
+    global visa_resource_manager
+    with visa_lock:
+        if visa_resource_manager is None:
+            # pyvisa is imported only when the first VISA device is opened
+            import pyvisa
+            visa_resource_manager = pyvisa.ResourceManager()
+        return visa_resource_manager
+
+class LazyResource():
+    """
+    pyvisa resource that is opened on the first I/O.
+    Attributes set before that (timeout, read_termination, etc.) are
+    passed to open_resource(); after opening everything goes to the resource
+    """
+    def __init__(self, resource_name, **kwargs):
+        self.__dict__['resource_name'] = resource_name
+        self.__dict__['kwargs'] = kwargs
+        self.__dict__['resource'] = None
+
+    def open(self):
+        with visa_lock:
+            if self.resource is None:
+                import pyvisa
+                try:
+                    self.__dict__['resource'] = resource_manager().open_resource( self.resource_name, **self.kwargs )
+                except ( pyvisa.VisaIOError, ValueError ):
+                    general.message("No connection")
+                    sys.exit()
+
+        return self.resource
+
+    def __getattr__(self, name):
+        return getattr( self.open(), name )
+
+    def __setattr__(self, name, value):
+        if self.resource is None:
+            self.kwargs[name] = value
+        else:
+            setattr( self.resource, name, value )
+
+def open_resource(resource_name, **kwargs):
+    """
+    Use instead of pyvisa.ResourceManager().open_resource()
+    The same resource constructed twice shares one session
+    """
+    with visa_lock:
+        if resource_name not in visa_resources:
+            visa_resources[resource_name] = LazyResource( resource_name, **kwargs )
+        return visa_resources[resource_name]
+
+def __getattr__(name):
+    """
+    cutil.VisaIOError for the device modules;
+    pyvisa is imported only when the exception is needed
+    """
+    if name == 'VisaIOError':
+        import pyvisa
+        return pyvisa.VisaIOError
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # search a key for a given value in dictionary
 def search_keys_dictionary(dictionary, search_value):
     for key, value in dictionary.items():
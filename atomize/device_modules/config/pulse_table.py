@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+# convertion of time units to ns
+timebase_dict = {'s': 1000000000, 'ms': 1000000, 'us': 1000, 'ns': 1, }
+# already parsed time strings; cleared when it is too large
+time_cache = {}
+time_cache_size = 100000
+
+def parse_time(value):
+    """
+    '100 ns' -> 100.; '2 us' -> 2000.
+    Time strings are split and converted only once, then taken from time_cache
+    """
+    try:
+        return time_cache[value]
+    except KeyError:
+        temp = str(value).split(' ')
+        time = float(temp[0])*timebase_dict[temp[1]]
+
+        if len(time_cache) >= time_cache_size:
+            time_cache.clear()
+        time_cache[value] = time
+
+        return time
+
+def time_to_string(time):
+    """
+    110. -> '110 ns'; 110.5 -> '110.5 ns'
+    """
+    if float(time).is_integer():
+        return str( int(time) ) + ' ns'
+    else:
+        return str( float(time) ) + ' ns'
+
+class PulseTable():
+    """
+    Times of the pulses (in ns) as a numpy structured array.
+    The i-th row corresponds to the i-th pulse defined by pulser_pulse() / awg_pulse().
+    The strings are parsed only once when a pulse is added, after that
+    shift, increment and reset are done by numpy operations on the table
+    """
+    fields = ('start', 'length', 'sigma', 'delta_start', 'length_increment')
+    dtype = np.dtype( [ (name, np.float64) for name in fields ] )
+
+    def __init__(self):
+        self.table = np.zeros( 0, dtype = self.dtype )
+        # the initial state of the pulses for reset()
+        self.table_init = np.zeros( 0, dtype = self.dtype )
+
+    def __len__(self):
+        return len( self.table )
+
+    def add(self, start = '0 ns', length = '0 ns', sigma = '0 ns', delta_start = '0 ns', length_increment = '0 ns'):
+        row = np.array( [ ( parse_time(start), parse_time(length), parse_time(sigma), \
+                            parse_time(delta_start), parse_time(length_increment) ) ], dtype = self.dtype )
+        self.table = np.concatenate( (self.table, row) )
+        self.table_init = self.table.copy()
+
+    def clear(self):
+        self.table = np.zeros( 0, dtype = self.dtype )
+        self.table_init = np.zeros( 0, dtype = self.dtype )
+
+    def set(self, index, field, value):
+        self.table[field][index] = parse_time(value)
+
+    def rows(self, index = None):
+        """
+        Indexes of the pulses as an array; None means all the pulses
+        """
+        if index is None:
+            return np.arange( len(self.table) )
+        else:
+            return np.asarray( index, dtype = np.int64 ).reshape(-1)
+
+    def shift(self, index = None):
+        """
+        start += delta_start for the specified pulses
+        Returns the indexes of the pulses that were changed
+        """
+        index = self.rows(index)
+        index = index[ self.table['delta_start'][index] != 0 ]
+        self.table['start'][index] += self.table['delta_start'][index]
+
+        return index
+
+    def increment(self, index = None, factor = 1.):
+        """
+        length += factor*length_increment; sigma += length_increment for the specified pulses
+        factor is a number or an array of the same length as index
+        Returns the indexes of the pulses that were changed
+        """
+        index = self.rows(index)
+        factor = np.broadcast_to( factor, index.shape )
+        changed = self.table['length_increment'][index] != 0
+        index = index[changed]
+        self.table['length'][index] += factor[changed]*self.table['length_increment'][index]
+        self.table['sigma'][index] += self.table['length_increment'][index]
+
+        return index
+
+    def reset(self, index = None, fields = fields):
+        """
+        Return the specified fields of the pulses to the initial state
+        """
+        index = self.rows(index)
+        for name in fields:
+            self.table[name][index] = self.table_init[name][index]
+
+    def to_string(self, index, field, delay = 0):
+        """
+        Time of the pulse in the form of '100 ns'; delay in ns is added
+        """
+        return time_to_string( self.table[field][index] + delay )
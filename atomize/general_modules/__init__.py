@@ -1 +1,6 @@
-from atomize.main.client import LivePlotClient
\ No newline at end of file
+def __getattr__(name):
+    # PyQt6 is imported only when the plot client is requested
+    if name == 'LivePlotClient':
+        from atomize.main.client import LivePlotClient
+        return LivePlotClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -3,6 +3,7 @@
 
 import os
 import sys
+import zipfile
 import configparser
 import numpy as np
 from PyQt6.QtWidgets import QFileDialog, QDialog
@@ -40,6 +41,10 @@ class Saver_Opener():
 
     def open_1D(self, path, header = 0):
         if self.test_flag != 'test':
+            if str(path).endswith('.npz'):
+                header_array, data = self.open_npz(path, header = header)
+                return header_array, np.transpose(data)
+
             header_array = []
 
             file_to_read = open(str(path), 'r')
@@ -93,6 +98,9 @@ class Saver_Opener():
 
     def open_2D(self, path, header = 0):
         if self.test_flag != 'test':
+            if str(path).endswith('.npz'):
+                return self.open_npz(path, header = header)
+
             header_array = []
             file_to_read = open(str(path), 'r')
             for i, line in enumerate(file_to_read):
@@ -133,6 +141,10 @@ class Saver_Opener():
 
     def open_2D_appended(self, path, header = 0, chunk_size = 1):
         if self.test_flag != 'test':
+            if str(path).endswith('.npz'):
+                header_array, data = self.open_npz(path, header = header)
+                return header_array, np.array_split(data, chunk_size)
+
             header_array = []
             file_to_read = open(str(path), 'r')
             for i, line in enumerate(file_to_read):
@@ -217,19 +229,29 @@ class Saver_Opener():
         elif self.test_flag == 'test':
             return self.test_file_path, self.test_file_param_path
 
-    def save_header(self, filename, header = '', mode = 'w'):
+    def save_header(self, filename, header = '', mode = 'w', fmt = 'csv'):
         if self.test_flag != 'test':
+            if fmt == 'npz':
+                self.save_npz(filename, None, header = header, mode = mode)
+                return
+
             file_for_save = open(filename, mode)
             np.savetxt(file_for_save, [], fmt='%.5e', delimiter=',', \
                                         newline='\n', header=header, footer='', comments='# ', encoding=None)
             file_for_save.close()
         elif self.test_flag == 'test':
-            file_for_save = open(filename, mode)
-            file_for_save.close()
+            assert( fmt == 'csv' or fmt == 'npz' ), "Incorrect file format; should be 'csv' or 'npz'"
+            # the npz file is not created in the test run, as in save_npz()
+            if fmt == 'csv':
+                file_for_save = open(filename, mode)
+                file_for_save.close()
 
-    def save_data(self, filename, data, header = '', mode = 'w'):
+    def save_data(self, filename, data, header = '', mode = 'w', fmt = 'csv'):
         if self.test_flag != 'test':
-            if len( data.shape ) == 2:
+            if fmt == 'npz':
+                self.save_npz(filename, data, header = header, mode = mode)
+
+            elif len( data.shape ) == 2:
                 file_for_save = open(filename, mode)
                 np.savetxt(file_for_save, data, fmt='%.5e', delimiter=',', \
                                             newline='\n', header=header, footer='', comments='# ', encoding=None)
@@ -251,8 +273,83 @@ class Saver_Opener():
                         file_for_save.close()
 
         elif self.test_flag == 'test':
-            file_for_save = open(filename, mode)
-            file_for_save.close()
+            assert( fmt == 'csv' or fmt == 'npz' ), "Incorrect file format; should be 'csv' or 'npz'"
+            # the npz file is not created in the test run, as in save_npz()
+            if fmt == 'csv':
+                file_for_save = open(filename, mode)
+                file_for_save.close()
+
+    def npz_path(self, filename):
+        """
+        'data.csv' -> 'data.npz'; other names get the '.npz' extension added
+        """
+        filename = str(filename)
+        if filename.endswith('.npz'):
+            return filename
+        elif filename.endswith('.csv'):
+            return filename[:-4] + '.npz'
+        else:
+            return filename + '.npz'
+
+    def save_npz(self, filename, data, header = '', mode = 'w'):
+        """
+        Binary version of save_data(); data are stored as float64 without
+        rounding and the header is kept as the 'header' entry of the file.
+        In mode 'a' the data and the header are added to the file as new
+        entries 'data_000001', 'header_000001', etc. without reading the old ones;
+        open_npz() joins them along the first axis
+        """
+        if self.test_flag != 'test':
+            path = self.npz_path(filename)
+            if mode == 'a' and os.path.isfile(path):
+                with zipfile.ZipFile(path, 'a') as file_to_save:
+                    # the number of entries keeps the names unique and in order
+                    index = len( file_to_save.namelist() )
+                    if data is not None:
+                        with file_to_save.open(f'data_{index:06d}.npy', 'w', force_zip64 = True) as entry:
+                            np.lib.format.write_array(entry, np.asarray(data, dtype = np.float64), allow_pickle = False)
+                    if header != '':
+                        with file_to_save.open(f'header_{index:06d}.npy', 'w') as entry:
+                            np.lib.format.write_array(entry, np.array(header), allow_pickle = False)
+
+            elif data is None:
+                np.savez(path, header = np.array(header))
+            else:
+                np.savez(path, data = np.asarray(data, dtype = np.float64), header = np.array(header))
+
+        elif self.test_flag == 'test':
+            pass
+
+    def open_npz(self, path, header = 0):
+        """
+        Binary version of open_2D(); the header is returned in the same form
+        as for the csv files. The appended entries are joined here once
+        """
+        if self.test_flag != 'test':
+            header_array = []
+            with np.load(self.npz_path(path)) as file_to_read:
+                # 'header' and 'data' go before the appended entries
+                names = sorted( file_to_read.files, key = lambda x: (len(x.split('_')), x) )
+                headers = [ str(file_to_read[name]) for name in names if name.split('_')[0] == 'header' ]
+                blocks = [ file_to_read[name] for name in names if name.split('_')[0] == 'data' ]
+
+            full_header = '\n'.join( line for line in headers if line != '' )
+            for i, line in enumerate( full_header.split('\n') ):
+                if i is header: break
+                temp = ('# ' + line + '\n').split(":")
+                header_array.append(temp)
+
+            if len(blocks) == 0:
+                data = np.array([])
+            elif len(blocks) == 1:
+                data = blocks[0]
+            else:
+                data = np.concatenate( blocks )
+
+            return header_array, data
+
+        elif self.test_flag == 'test':
+            return self.test_header_array, self.test_data_2d
 
     def FileDialog(self, directory = '', mode = 'Open', fmt = ''):
 
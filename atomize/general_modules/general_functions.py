@@ -5,29 +5,100 @@ import sys
 import os
 import time
 import socket
-from threading import Thread
+import struct
+import atexit
+from threading import Thread, Lock, Event
+from concurrent.futures import ThreadPoolExecutor
 import configparser
 import numpy as np
-from atomize.main.client import LivePlotClient
 #from liveplot import LivePlotClient
 
+class Messenger():
+    """
+    One persistent connection of the script to the messenger socket server of the main window.
+    Each message is sent as a 4-byte big-endian length followed by the utf-8 text.
+    Messages are collected for interval (in s) and sent together by a background thread;
+    the rest is sent when the script exits
+    """
+    def __init__(self, address = ('localhost', 9091), interval = 0.05):
+        self.address = address
+        self.interval = interval
+        self.sock = None
+        self.buffer = []
+        self.lock = Lock()
+        self.event = Event()
+        self.thread = None
+        atexit.register(self.flush)
+
+    def send(self, text):
+        data = str(text).encode()
+        with self.lock:
+            self.buffer.append( struct.pack('>I', len(data)) + data )
+            if self.thread is None:
+                self.thread = Thread(target = self.run, daemon = True)
+                self.thread.start()
+        self.event.set()
+
+    def run(self):
+        while True:
+            self.event.wait()
+            time.sleep(self.interval)
+            self.event.clear()
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            data = b''.join(self.buffer)
+            self.buffer = []
+            if data == b'':
+                return
+
+            # the second attempt is for the case when the main window was restarted
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self.sock = socket.create_connection(self.address)
+                    self.sock.sendall(data)
+                    break
+                except OSError:
+                    if self.sock is not None:
+                        self.sock.close()
+                    self.sock = None
+
+class Plotter():
+    """
+    LivePlotClient and PyQt6 are imported by the first plot call,
+    so the scripts that do not plot don't pay for the import
+    """
+    def __init__(self):
+        self.client = None
+        self.lock = Lock()
+
+    def __getattr__(self, name):
+        with self.lock:
+            if self.client is None:
+                from atomize.main.client import LivePlotClient
+                self.client = LivePlotClient()
+        return getattr(self.client, name)
+
 # Test run parameters
+# there is no connection to the main window during the test run
 if len(sys.argv) > 1:
     test_flag = sys.argv[1]
 else:
     test_flag = 'None'
-    plotter = LivePlotClient()
+
+if test_flag != 'test':
+    plotter = Plotter()
+    # the connection is opened by the first message
+    messenger = Messenger()
 
 def message(*text):
     if test_flag != 'test':
-        sock = socket.socket()
-        sock.connect(('localhost', 9091))
         if len(text) == 1:
-            sock.send(str(text[0]).encode())
-            sock.close()
+            messenger.send(text[0])
         else:
-            sock.send(str(text).encode())
-            sock.close()
+            messenger.send(text)
     elif test_flag == 'test':
         pass
 
@@ -74,6 +145,50 @@ def scans(num_of_scans):
             yield index
             index += 1
 
+# one worker thread for each device used in poll()
+device_executors = {}
+
+def poll(*calls):
+    """
+    A function to query several devices at the same time.
+    Each call is a tuple (bound device method, *args), i.e. (ls335.tc_temperature, 'B'),
+    or a function without arguments. Calls of different devices run concurrently;
+    calls of one device run one after another in its own worker thread.
+    Other functions (i.e. lambda) run in a common thread pool.
+    Returns the results in the order of calls
+    """
+    tasks = []
+    for call in calls:
+        if callable(call):
+            func, args = call, ()
+        else:
+            func, args = call[0], tuple(call[1:])
+        tasks.append( (func, args) )
+
+    if test_flag != 'test':
+        futures = []
+        for func, args in tasks:
+            # bound method -> device instance; functools.partial -> its function
+            device = getattr( getattr(func, 'func', func), '__self__', None )
+            try:
+                executor = device_executors[id(device)][1]
+            except KeyError:
+                if device is None:
+                    executor = ThreadPoolExecutor( thread_name_prefix = 'poll' )
+                else:
+                    executor = ThreadPoolExecutor( max_workers = 1, thread_name_prefix = 'poll' )
+                # the device is kept to make its id unique
+                device_executors[id(device)] = (device, executor)
+            futures.append( executor.submit( func, *args ) )
+
+        return tuple( future.result() for future in futures )
+
+    elif test_flag == 'test':
+        for func, args in tasks:
+            assert( callable(func) ), 'Incorrect device call. Should be a tuple (device.function, *args)'
+
+        return tuple( func(*args) for func, args in tasks )
+
 def plot_1d(strname, xd, yd, label='label', xname='X',\
  xscale='arb. u.', yname='Y', yscale='arb. u.', scatter='False', timeaxis='False', vline='False', pr = 'None', text=''):
 
@@ -13,13 +13,32 @@ logging.root.setLevel(logging.WARNING)
 
 class LivePlotClient(object):
     
-    def __init__(self, timeout=2000, size=2**28):
+    def __init__(self, timeout=2000, size=2**22, slots=8):
         # from 06-08-2021; Freezing GUI when import general module
         
         #self.app = QCoreApplication.instance()
         #if self.app is None:
         #    self.app = QCoreApplication([])
 
+        # the connection and the shared memory are created by the first plot call;
+        # the memory starts small and grows when an array does not fit
+        self.sock = None
+        self.shared_mem = None
+        self.size = size
+        self.is_connected = True
+        self.timeout = timeout
+
+        # shared memory is a ring of slots; the server returns b'ok' for each read slot
+        # the first b'ok' is sent by the server after the connection
+        self.slots = slots
+        self.slot_size = 0
+        self.free_slots = 0
+        self.slot_index = 0
+        self.seq = 0
+        
+        atexit.register(self.close)
+
+    def connect(self):
         self.sock = QLocalSocket()
         self.sock.connectToServer("LivePlot")
 
@@ -27,54 +46,118 @@ class LivePlotClient(object):
             raise EnvironmentError("Couldn't find LivePlotter instance")
         self.sock.disconnected.connect(self.disconnect_received)
 
+        key = self.create_shared_memory(self.size)
+        self.sock.write(key.encode())      
+        self.sock.waitForBytesWritten()
+        self.free_slots = self.slots - 1
+
+    def create_shared_memory(self, size):
         key = str(uuid.uuid4())
         self.shared_mem = QSharedMemory(key)
         if not self.shared_mem.create(size):
             raise Exception("Couldn't create shared memory %s" % self.shared_mem.errorString())
         logging.debug('Memory created with key %s and size %s' % (key, self.shared_mem.size()))
-        
-        self.sock.write(key.encode())      
-        self.sock.waitForBytesWritten()
-        self.is_connected = True
-        self.timeout = timeout
-        
-        atexit.register(self.close)
 
+        self.slot_size = self.shared_mem.size() // self.slots
+        self.slot_index = 0
+        return key
+
+    def grow_shared_memory(self, arrsize):
+        """
+        Replace the shared memory by a larger one; the server attaches
+        to the new memory when it reads the 'shared_memory' meta
+        """
+        # the server should finish reading the old memory
+        if not self.wait_for_slots(self.slots):
+            return False
+
+        size = max(2 * self.shared_mem.size(), 1 << (arrsize - 1).bit_length())
+        old_mem = self.shared_mem
+        key = self.create_shared_memory(size)
+
+        meta_bytes = json.dumps({'name': '*', 'operation': 'shared_memory', 'key': key, 'arrsize': 0}).ljust(400)
+        self.sock.write(meta_bytes.encode())
+        self.sock.flush()
+        old_mem.detach()
+        return True
 
     def close(self):
+        if self.sock is None:
+            return
+        if self.is_connected:
+            self.sock.waitForBytesWritten(self.timeout)
         self.shared_mem.detach()
 
+    def wait_for_slots(self, number):
+        """
+        Wait until the server returns the required number of slots.
+        The wait is limited by self.timeout in total; after that the frame
+        is dropped, so a busy main window does not stop the experiment
+        """
+        deadline = time.monotonic() + self.timeout / 1000
+        while self.free_slots < number:
+            if not self.sock.bytesAvailable():
+                remaining = int( (deadline - time.monotonic()) * 1000 )
+                if remaining <= 0 or not self.sock.waitForReadyRead(remaining):
+                    if self.sock.state() != QLocalSocket.LocalSocketState.ConnectedState:
+                        self.is_connected = False
+                        return False
+                    if time.monotonic() >= deadline:
+                        logging.warning('LivePlotter server is busy; the frame has been dropped')
+                        return False
+                    continue
+            self.free_slots += len(self.sock.read(self.sock.bytesAvailable())) // 2
+        return True
+
     def send_to_plotter(self, meta, arr=None):
         if not self.is_connected:
             return
+        if self.sock is None:
+            self.connect()
         if meta["name"] is None:
             meta["name"] = "*"
         if arr is not None:
             arrbytes = bytearray(arr)
             arrsize = len(arrbytes)
             if arrsize > self.shared_mem.size():
-                raise ValueError("Array too big %s > %s" % (arrsize, self.shared_mem.size()))
+                if not self.grow_shared_memory(arrsize):
+                    return
             meta['arrsize'] = arrsize
             meta['dtype'] = str(arr.dtype)
             meta['shape'] = arr.shape
+
+            # number of slots for the array; large arrays take the whole memory
+            slots = -(-arrsize // self.slot_size)
+            if slots > 1 or self.slot_index + slots > self.slots:
+                slots = self.slots
+            if not self.wait_for_slots(slots):
+                return
+            if slots == self.slots:
+                self.slot_index = 0
+            meta['offset'] = self.slot_index * self.slot_size
+            meta['slots'] = slots
+            meta['seq'] = self.seq
         else:
             meta['arrsize'] = 0
-        meta_bytes = json.dumps(meta).ljust(300)
-        if len(meta_bytes) > 300:
-            raise ValueError("meta object is too large (> 300 char)")
+        meta_bytes = json.dumps(meta).ljust(400)
+        if len(meta_bytes) > 400:
+            raise ValueError("meta object is too large (> 400 char)")
 
         if arr is None:
             self.sock.write(meta_bytes.encode())
         else:
-            if not self.sock.bytesAvailable():
-                # should be clarified
-                self.sock.waitForReadyRead(1000)
-            self.sock.read(2)
+            # data are written to the free slot before the meta is sent
             self.shared_mem.lock()
-            self.sock.write(meta_bytes.encode())
             region = self.shared_mem.data()
-            region[:arrsize] = arrbytes
+            region[meta['offset']:meta['offset'] + arrsize] = arrbytes
             self.shared_mem.unlock()
+            self.sock.write(meta_bytes.encode())
+
+            self.free_slots -= slots
+            self.slot_index = ( self.slot_index + slots ) % self.slots
+            self.seq += 1
+
+        self.sock.flush()
 
     def plot_y(self, name, arr, extent=None, start_step=(0, 1), label=''):
         arr = np.array(arr)
@@ -92,7 +175,6 @@ class LivePlotClient(object):
             'label': label,
         }
         self.send_to_plotter(meta, arr.astype('float64'))
-        self.send_to_plotter({'name':'none', 'operation':'none'}, np.array([0.]))
 
     def plot_z(self, name, arr, extent=None, start_step=None, xname='X axis',\
      xscale='arb. u.', yname='Y axis', yscale='arb. u.', zname='Y axis', zscale='arb. u.', text=''):
@@ -121,7 +203,6 @@ class LivePlotClient(object):
             'value': text,
         }
         self.send_to_plotter(meta, arr.astype('float64'))
-        self.send_to_plotter({'name':'none', 'operation':'none'}, np.array([0.]))
 
     def plot_xy(self, name, xs, ys, label='', xname='X axis', xscale='arb. u.',\
      yname='Y axis', yscale='arb. u.', scatter='False', timeaxis='False', vline='False', text=''):
@@ -144,11 +225,9 @@ class LivePlotClient(object):
 
         if len( np.shape( ys ) ) == 1:
             self.send_to_plotter(meta, np.array([xs, ys]).astype('float64'))
-            self.send_to_plotter({'name':'none', 'operation':'none'}, np.array([0.]))
         elif len( np.shape( ys ) ) == 2:
             # simultaneous plot of two curves
             self.send_to_plotter(meta, np.array([[xs, xs], ys]).astype('float64'))
-            self.send_to_plotter({'name':'none', 'operation':'none'}, np.array([0.]))
 
     def append_y(self, name, point, start_step=(0, 1), label='', xname='X axis',\
      xscale='arb. u.', yname='Y axis', yscale='arb. u.',scatter='False', timeaxis='False', vline='False'):
@@ -167,7 +246,6 @@ class LivePlotClient(object):
             'TimeAxis': timeaxis,
             'Vline': vline
         })
-        self.send_to_plotter({'name':'none', 'operation':'none'}, np.array([0.]))
 
     def append_xy(self, name, x, y, label=''):
         self.send_to_plotter({
@@ -177,7 +255,6 @@ class LivePlotClient(object):
             'rank': 1,
             'label': label,
         })
-        self.send_to_plotter({'name':'none', 'operation':'none'}, np.array([0.]))
 
     def append_z(self, name, arr, start_step=None, xname='X axis',\
      xscale='arb. u.', yname='Y axis', yscale='arb. u.', zname='Y axis', zscale='arb. u.'):
@@ -195,7 +272,6 @@ class LivePlotClient(object):
             'Zname': zname,
             }
         self.send_to_plotter(meta, arr.astype('float64'))
-        self.send_to_plotter({'name':'none', 'operation':'none'}, np.array([0.]))
 
     def label(self, name, text):
         self.send_to_plotter({
@@ -203,7 +279,6 @@ class LivePlotClient(object):
             'operation': 'label',
             'value': text
         })
-        self.send_to_plotter({'name':'none', 'operation':'none'}, np.array([0.]))
 
     def clear(self, name=None):
         self.send_to_plotter({
@@ -222,7 +297,6 @@ class LivePlotClient(object):
             'name': name,
             'operation': 'remove'
         })
-        self.send_to_plotter({'name':'none', 'operation':'none'}, np.array([0.]))
 
     def disconnect_received(self):
         self.is_connected = False
@@ -8,7 +8,6 @@ import time
 import json
 import logging
 import signal
-import socket
 import threading
 import configparser
 import platform
@@ -74,7 +73,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.meta = None
         self.insert_dock_right = True
         self.conns = []
-        self.shared_mems = []
+        # connection: shared memory of the client; the client can replace it by a larger one
+        self.shared_mems = {}
         signal.signal(signal.SIGINT, self.close)
 
         # configuration data
@@ -87,6 +87,21 @@ class MainWindow(QtWidgets.QMainWindow):
         self.path = self.script_dir
         self.test_timeout = int(config['DEFAULT']['test_timeout']) * 1000 # in ms
 
+        # plot_y, plot_xy, and plot_z frames are drawn not more often than plot_refresh_interval;
+        # only the newest frame of each curve or image is drawn
+        self.pending_plots = {}
+        self.plot_timer = QtCore.QTimer(self)
+        self.plot_timer.setSingleShot(True)
+        self.plot_timer.setInterval(config['DEFAULT'].getint('plot_refresh_interval', fallback = 40)) # in ms
+        self.plot_timer.timeout.connect(self.draw_pending_plots)
+
+        # messages from the scripts are added to the text box not more often than message_refresh_interval
+        self.pending_messages = []
+        self.message_timer = QtCore.QTimer(self)
+        self.message_timer.setSingleShot(True)
+        self.message_timer.setInterval(config['DEFAULT'].getint('message_refresh_interval', fallback = 100)) # in ms
+        self.message_timer.timeout.connect(self.print_pending_messages)
+
         # for running different processes using QProcess
         self.process = QtCore.QProcess(self)
         self.process_text_editor = QtCore.QProcess(self)
@@ -116,7 +131,7 @@ class MainWindow(QtWidgets.QMainWindow):
         #print('closing')
         for conn in self.conns:
             conn.close()
-        for shm in self.shared_mems:
+        for shm in self.shared_mems.values():
             shm.detach()
         self._on_destroyed()
         #QApplication.instance().exit()
@@ -126,39 +141,80 @@ class MainWindow(QtWidgets.QMainWindow):
         conn = self.server.nextPendingConnection()
         conn.waitForReadyRead()
         key = str(conn.read(36).decode())
-        memory = QSharedMemory()
-        memory.setKey(key)
-        memory.attach()
-        logging.debug('attached to memory %s with size %s'%(key, memory.size()))
         #11-04-2021; Should be uncommented in case of problems
         #atexit.register(memory.detach)
         self.conns.append(conn)
-        self.shared_mems.append(memory)
-        conn.readyRead.connect(lambda: self.read_from(conn, memory))
-        conn.disconnected.connect(memory.detach)
+        self.attach_memory(conn, key)
+        conn.readyRead.connect(lambda: self.read_from(conn))
+        conn.disconnected.connect(lambda: self.shared_mems[conn].detach())
         conn.write(b'ok')
+        # the first frame can come together with the key
+        if conn.bytesAvailable():
+            self.read_from(conn)
+
+    def attach_memory(self, conn, key):
+        if conn in self.shared_mems:
+            self.shared_mems[conn].detach()
+        memory = QSharedMemory()
+        memory.setKey(key)
+        memory.attach()
+        logging.debug('attached to memory %s with size %s'%(key, memory.size()))
+        self.shared_mems[conn] = memory
 
     # noinspection PyNoneFunctionAssignment
-    def read_from(self, conn, memory):
-        logging.debug('reading data')
-        self.meta = json.loads(conn.read(300).decode())
-        if self.meta['arrsize'] != 0:
-            memory.lock()
-            raw_data = memory.data()
-            if raw_data!=None:
-                ba = raw_data[:self.meta['arrsize']]
-                arr = np.frombuffer(memoryview(ba), dtype=self.meta['dtype'])
-                memory.unlock()
-                conn.write(b'ok')
-                arr = arr.reshape(self.meta['shape']).copy()
-            else: 
+    def read_from(self, conn):
+        # the client can write several frames to different slots of the shared memory
+        # without waiting; they are drained in order of arrival
+        while conn.bytesAvailable() >= 400:
+            logging.debug('reading data')
+            self.meta = json.loads(conn.read(400).decode())
+            if self.meta['operation'] == 'shared_memory':
+                # the array does not fit; the client has created a larger memory
+                self.attach_memory(conn, self.meta['key'])
+                continue
+
+            memory = self.shared_mems[conn]
+            if self.meta['arrsize'] != 0:
+                offset = self.meta['offset']
+                memory.lock()
+                raw_data = memory.data()
+                if raw_data!=None:
+                    ba = raw_data[offset:offset + self.meta['arrsize']]
+                    arr = np.frombuffer(memoryview(ba), dtype=self.meta['dtype'])
+                    memory.unlock()
+                    # slots are free for the client
+                    conn.write(b'ok' * self.meta['slots'])
+                    arr = arr.reshape(self.meta['shape']).copy()
+                    logging.debug('frame %s from offset %s' % (self.meta['seq'], offset))
+                else: 
+                    memory.unlock()
+                    conn.write(b'ok' * self.meta['slots'])
+                    arr = None
+            else:
                 arr = None
-        else:
-            arr = None
 
-        self.do_operation(arr)
-        if conn.bytesAvailable():
-            self.read_from(conn, memory)
+            if self.meta['operation'] in ('plot_y', 'plot_xy', 'plot_z'):
+                # the previous pending frame of the same curve is dropped
+                key = (self.meta['name'], self.meta['operation'], self.meta.get('label', ''))
+                self.pending_plots[key] = (self.meta, arr)
+                if not self.plot_timer.isActive():
+                    self.plot_timer.start()
+            else:
+                # keep the order of operations
+                meta = self.meta
+                self.draw_pending_plots()
+                self.meta = meta
+                self.do_operation(arr)
+
+    def draw_pending_plots(self):
+        """
+        Draw the newest pending frames of plot_y, plot_xy, and plot_z
+        """
+        pending = self.pending_plots
+        self.pending_plots = {}
+        for meta, arr in pending.values():
+            self.meta = meta
+            self.do_operation(arr)
 
     def do_operation(self, arr = None):
         def clear(name):
@@ -264,42 +320,21 @@ class MainWindow(QtWidgets.QMainWindow):
             scat = meta['Scatter']
             taxis = meta['TimeAxis']
             verline = meta['Vline']
-            
-            xs, ys = pw.get_data(label)
-            new_ys = list(ys)
-            new_ys.append(meta['value'])
             start_step = meta['start_step']
             if start_step is not None:
-                x0, dx = start_step
-                nx = len(new_ys)
-                xs = np.linspace(x0, x0 + (nx - 1)*dx, nx)
-                pw.plot(xs, new_ys, name=label, xname=xnam, xscale =xscal, yname=ynam,\
-                 yscale =yscal, scatter=scat, timeaxis=taxis, vline=verline)
-            else:
-                pw.plot(new_ys, name=label, xname=xnam, xscale =xscal, yname=ynam,\
-                 yscale =yscal, scatter=scat, timeaxis=taxis, vline=verline)
+                start_step = tuple(start_step)
+
+            pw.append(label, meta['value'], start_step=start_step, xname=xnam, xscale =xscal,\
+             yname=ynam, yscale =yscal, scatter=scat, timeaxis=taxis, vline=verline)
 
 
         elif operation == 'append_xy':
             label = meta['label']
-            xs, ys = pw.get_data(label)
             xn, yn = meta['value']
-            new_xs = list(xs)
-            new_xs.append(xn)
-            new_ys = list(ys)
-            new_ys.append(yn)
-            pw.plot(new_xs, new_ys, parametric=True, name=label, scatter='False')
+            pw.append(label, yn, x=xn, parametric=True, scatter='False')
 
 
         elif operation == 'append_z':
-            image = pw.get_data()
-            if image is None:
-                image = np.array([arr])
-            else:
-                try:
-                    image = np.vstack((np.transpose(image), [arr]))
-                except ValueError:
-                    image = np.array([arr])
             start_step = meta['start_step']
             xnam = meta['Xname']
             xscal = meta['X']
@@ -311,10 +346,10 @@ class MainWindow(QtWidgets.QMainWindow):
                 (x0, dx), (y0, dy) = start_step
                 pw.setAxisLabels(xname=xnam, xscale =xscal, yname=ynam, yscale =yscal,\
                  zname=znam, zscale =zscal)
-                pw.setImage(image, pos=(x0, y0), scale=(dx, dy), axes={'y':0, 'x':1})
+                pw.append_row(arr, pos=(x0, y0), scale=(dx, dy))
             else:
                 pw.setAxisLabels(xname=xnam, xscale =xscal, yname=ynam, yscale =yscal)
-                pw.setImage(image, axes={'y':0, 'x':1})
+                pw.append_row(arr)
 
 
         elif operation == 'label':
@@ -524,6 +559,7 @@ class MainWindow(QtWidgets.QMainWindow):
         """
         text = self.process_python.readAllStandardOutput().data().decode()
         text_errors_script = self.process_python.readAllStandardError().data().decode()
+        self.print_pending_messages()
         if text_errors_script == '':
         #if text == '' and text_errors_script == '':
             self.text_errors.appendPlainText("Script done!")
@@ -615,16 +651,40 @@ class MainWindow(QtWidgets.QMainWindow):
             if self.textEdit.toPlainText() != '': # save file dialog will be opened after at least one character is added
                 self.save_file_dialog()
         
+    @QtCore.pyqtSlot(list)
+    def add_error_messages(self, messages):
+        """
+        A function for adding the messages received at once from a script;
+        This function runs when Helper.changedSignal.emit(list) is emitted.
+        :param messages: list of strings
+        """
+        for data in messages:
+            self.add_error_message(data)
+
+    def print_pending_messages(self):
+        """
+        Add all pending messages to the text box by one call
+        """
+        self.message_timer.stop()
+        if self.pending_messages:
+            self.text_errors.appendPlainText( '\n'.join(self.pending_messages) )
+            self.pending_messages = []
+
     @QtCore.pyqtSlot(str) 
     def add_error_message(self, data):
         """
         A function for adding an error message to a dedicated text box in the main window of the programm;
-        This function runs when Helper.changedSignal.emit(str) is emitted.
+        The messages are collected and added not more often than message_refresh_interval.
         :param data: string
         """
-        self.text_errors.appendPlainText(str(data))
+        self.pending_messages.append(str(data))
+
+        if data != 'Script stopped':
+            if not self.message_timer.isActive():
+                self.message_timer.start()
 
-        if data == 'Script stopped':
+        elif data == 'Script stopped':
+            self.print_pending_messages()
 
             path_to_main = os.path.abspath(os.getcwd())
             lib_path = os.path.join(path_to_main, 'atomize/general_modules', 'libspinapi.so')
@@ -867,10 +927,7 @@ class NameList(QDockWidget):
         del self[str(item.text())]
 
     def pause(self):
-        sock = socket.socket()
-        sock.connect(('localhost', 9091))
-        sock.send(b'Script stopped')
-        sock.close()
+        self.window.add_error_message('Script stopped')
 
     def __getitem__(self, item):
         return self.plot_dict[item]
@@ -901,8 +958,8 @@ def main():
     main = MainWindow()
     helper = socket_server.Helper()
     server = socket_server.Socket_server()
-    # to connect a function add_error_message when the signal from the helper will be emitted.
-    helper.changedSignal.connect(main.add_error_message, QtCore.Qt.ConnectionType.QueuedConnection)
+    # to connect a function add_error_messages when the signal from the helper will be emitted.
+    helper.changedSignal.connect(main.add_error_messages, QtCore.Qt.ConnectionType.QueuedConnection)
     threading.Thread(target = server.start_messenger_server, args = (helper, ), daemon = True).start()
     main.show()
     sys.exit(app.exec())
@@ -2,13 +2,18 @@
 # -*- coding: utf-8 -*-
 
 import socket
+import struct
 import threading
 from PyQt6 import QtCore
 
+# each message is sent as a 4-byte big-endian length followed by the utf-8 text
+HEADER = struct.Struct('>I')
+
 class Socket_server():
     """
     A class for creating and listening the socket server that connect errors messages from device modules
     and a dedicated text box in the main window of the programm.
+    Each script process keeps one connection open and sends length-prefixed messages through it.
     """
     def start_messenger_server(self, helper):
         """
@@ -17,27 +22,48 @@ class Socket_server():
         block the execution of the main programm.
         """
         sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         sock.bind(('', 9091))
         sock.listen(2)
         while True:
             client, addr = sock.accept()
             client_handler = threading.Thread(target=self.message, args=(helper, client), daemon = True).start()
+
     def message(self, helper, client):
         """
-        A function to read a message from clients and emit a special signal with the message 
-        to a helper class and finally to a dedicated text box in the main window of the programm.
+        A function to read messages from a client until it disconnects and emit a special signal
+        with the messages to a helper class and finally to a dedicated text box in the main window of the programm.
+        All the complete messages received at once are emitted as one list.
         This function should be run in another thread in order to not
         block the execution of the main programm.
-        """       
-        data = client.recv(1024).decode()
-        helper.changedSignal.emit(data)
-        #print(data)
+        """
+        buf = bytearray()
+        with client:
+            while True:
+                try:
+                    chunk = client.recv(65536)
+                except OSError:
+                    break
+                if not chunk:
+                    break
+                buf += chunk
+
+                messages = []
+                while len(buf) >= HEADER.size:
+                    size = HEADER.unpack_from(buf)[0]
+                    if len(buf) < HEADER.size + size:
+                        break
+                    messages.append( buf[HEADER.size:HEADER.size + size].decode(errors = 'replace') )
+                    del buf[:HEADER.size + size]
+
+                if messages:
+                    helper.changedSignal.emit(messages)
 
 class Helper(QtCore.QObject):
     """
     A helper class to connect an event in another thread to a function in the main thread.
     """
-    changedSignal = QtCore.pyqtSignal(str)
+    changedSignal = QtCore.pyqtSignal(list)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
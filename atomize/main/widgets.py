@@ -188,8 +188,12 @@ class CrosshairDock(CloseableDock):
         self.value_prev = 0
         # for delete and shift q_action
         self.qaction_added = 0
+        # preallocated buffers for append_y / append_xy
+        self.append_buffers = {}
 
     def plot(self, *args, **kwargs):
+        # data set directly; the next append starts from the curve
+        self.append_buffers.pop(kwargs.get('name', ''), None)
         self.plot_widget.parametric = kwargs.pop('parametric', False)
         vline_arg = kwargs.get('vline', '')
 
@@ -411,6 +415,7 @@ class CrosshairDock(CloseableDock):
         self.del_dict.pop(key_action, None)
         self.del_menu.removeAction(key_action)
         self.curves.pop(key_name, None)
+        self.append_buffers.pop(key_name, None)
         self.shifter_dict.pop(key_name, None)
         self.shift_menu.removeAction(qbox_action_name)
         self.avail_colors.append(self.used_colors[self.name_dict[key_action]])
@@ -509,6 +514,7 @@ class CrosshairDock(CloseableDock):
 
     def clear(self):
         self.plot_widget.clear()
+        self.append_buffers = {}
 
     def get_data(self, label):
         if label in self.curves:
@@ -516,6 +522,49 @@ class CrosshairDock(CloseableDock):
         else:
             return [], []
 
+    def append(self, name, y, x = None, start_step = None, **kwargs):
+        """
+        Append one point to the curve. The data are kept in preallocated
+        buffers with capacity doubling and the curve is set to a view
+        of the filled part, so an append is O(1) amortized.
+        If x is None, x is an index or x0 + i*dx for start_step = (x0, dx)
+        """
+        buf = self.append_buffers.get(name)
+        if buf is None:
+            xs, ys = self.get_data(name)
+            if ys is None:
+                xs, ys = [], []
+            n = len(ys)
+            buf = {'x': np.empty(max(2*n, 64)), 'y': np.empty(max(2*n, 64)), 'n': n, 'step': 'curve'}
+            buf['x'][:n] = xs
+            buf['y'][:n] = ys
+
+        n = buf['n']
+        if x is None and buf['step'] != start_step:
+            # x axis of the whole curve is defined by start_step
+            if start_step is None:
+                buf['x'][:n] = np.arange(n)
+            else:
+                buf['x'][:n] = start_step[0] + np.arange(n)*start_step[1]
+            buf['step'] = start_step
+
+        if n == len(buf['y']):
+            buf['x'] = np.resize(buf['x'], 2*n)
+            buf['y'] = np.resize(buf['y'], 2*n)
+
+        if x is None:
+            if start_step is None:
+                x = n
+            else:
+                x = start_step[0] + n*start_step[1]
+
+        buf['x'][n] = x
+        buf['y'][n] = y
+        buf['n'] = n + 1
+
+        self.plot(buf['x'][:n + 1], buf['y'][:n + 1], name = name, **kwargs)
+        self.append_buffers[name] = buf
+
     def redraw(self):
         xs_ys = []
         for name in self.curves:
@@ -542,6 +591,8 @@ class CrossSectionDock(CloseableDock):
         self.search_mode = False
         self.signals_connected = False
         self.set_histogram(False)
+        # preallocated rows for append_row; [rows, number of filled rows]
+        self.row_buffer = None
 
         save_action = QtGui.QAction('Save Data', self)
         save_action.triggered.connect(self.fileSaveDialog)
@@ -598,6 +649,8 @@ class CrossSectionDock(CloseableDock):
         self.h_cross_section_widget.plotItem.setLabel(axis='left', text=kwargs.get('zname', ''), units=kwargs.get('zscale', ''))
 
     def setImage(self, *args, **kwargs):
+        # image set directly; the next append_row starts from it
+        self.row_buffer = None
         item = self.plot_item.getViewBox()
         item.invertY(False)        
         if 'pos' in kwargs:
@@ -628,6 +681,33 @@ class CrossSectionDock(CloseableDock):
         else:
             return None
 
+    def append_row(self, row, **kwargs):
+        """
+        Append one row to the image. Rows are kept in a preallocated
+        buffer with capacity doubling and the image is set to a view
+        of the filled part. A row of a different length starts a new image
+        """
+        row = np.asarray(row)
+        if self.row_buffer is None or self.row_buffer[0].shape[1:] != row.shape:
+            image = self.get_data()
+            if image is None or np.transpose(image).shape[1:] != row.shape:
+                rows = np.empty((64,) + row.shape)
+                n = 0
+            else:
+                n = image.shape[-1]
+                rows = np.empty((max(2*n, 64),) + row.shape)
+                rows[:n] = np.transpose(image)
+        else:
+            rows, n = self.row_buffer
+
+        if n == len(rows):
+            rows = np.concatenate((rows, np.empty_like(rows)))
+
+        rows[n] = row
+        kwargs['axes'] = {'y':0, 'x':1}
+        self.setImage(rows[:n + 1], **kwargs)
+        self.row_buffer = [rows, n + 1]
+
     def clear(self):
         self.plot_item.enableAutoRange()
 
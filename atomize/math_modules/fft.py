@@ -4,99 +4,92 @@
 import sys
 import numpy as np
 
+# frequency axes (in MHz, sorted) already calculated for (length, sample spacing);
+# cleared when it is too large
+freq_cache = {}
+freq_cache_size = 1000
+
+def frequency_axis(length, sample_spacing):
+    """
+    Sorted frequency axis for the sample spacing in ns. It is the same as
+    fftfreq()[argsort(fftfreq())], but calculated only once. A copy is returned,
+    so the cached axis is not changed by the scripts
+    """
+    key = (length, sample_spacing)
+    try:
+        return freq_cache[key].copy()
+    except KeyError:
+        freq = np.fft.fftshift( np.fft.fftfreq(length, sample_spacing*10**(-3)) )
+        freq.flags.writeable = False
+
+        if len(freq_cache) >= freq_cache_size:
+            freq_cache.clear()
+        freq_cache[key] = freq
+
+        return freq.copy()
+
 class Fast_Fourier():
 
-    def __init__(self):
+    def __init__(self, workers = None):
+        """
+        workers = None means numpy.fft; an integer (-1 for all the CPU cores)
+        means multithreaded scipy.fft with this number of workers
+        """
+        self.workers = workers
+
         # Test run parameters
-        # These values are returned by the modules in the test run 
+        # These values are returned by the modules in the test run
         if len(sys.argv) > 1:
             self.test_flag = sys.argv[1]
         else:
             self.test_flag = 'None'
 
     def ph_correction(self, freq, data_i, data_q, cor1, cor2, cor3):
-        if self.test_flag != 'test':
-            data = data_i + 1j*data_q
-            data = data*np.exp( 1j*cor1 + 1j*cor2*freq + 1j*cor3*freq*freq )
-            if len( data_i.shape ) == 1:
-                return np.array( (np.real(data), np.imag(data)) )
-            else:
-                return np.array( (np.transpose( np.real(data) ), np.transpose( np.imag(data) )) )
-
-        elif self.test_flag == 'test':
-            data = data_i + 1j*data_q
-            data = data*np.exp( 1j*cor1 + 1j*cor2*freq + 1j*cor3*freq*freq )
-            if len( data_i.shape ) == 1:
-                return np.array( (np.real(data), np.imag(data)) )
-            else:
-                return np.array( (np.transpose( np.real(data) ), np.transpose( np.imag(data) )) )
-    
-    def fft(self, x_axis, data_i, data_q, sample_spacing, re = 'False'):
-        if self.test_flag != 'test':
-            if re == 'False':
-                data = data_i + 1j*data_q
-                sp = np.fft.fft( data )
-
-                freq = np.fft.fftfreq(x_axis.shape[-1], sample_spacing*10**(-3))
-                i = np.argsort(freq)
-
-                return freq[i], np.abs( sp[i] )
-
-            elif re == 'True':
-                data = data_i + 1j*data_q
-
-                if len( data_i.shape ) == 1:
-                    sp = np.fft.fft( data )
-                    freq = np.fft.fftfreq(x_axis.shape[-1], sample_spacing*10**(-3))
-                    i = np.argsort(freq)
-
-                    sp.real = sp.real[i]
-                    sp.imag = sp.imag[i]
-
-                    return freq[i], sp.real, sp.imag
-
-                else:
-                    sp = np.fft.fft( data, axis = 1 )
-                    freq = np.fft.fftfreq(x_axis.shape[-1], sample_spacing*10**(-3))
-                    i = np.argsort(freq)
-
-                    sp.real = sp.real[:,i]
-                    sp.imag = sp.imag[:,i]
+        if self.test_flag == 'test':
+            assert( np.shape(data_i) == np.shape(data_q) ), "Incorrect shape of the data"
 
-                    return freq[i], sp.real, sp.imag
-
-        elif self.test_flag == 'test':
-            if re == 'False':
-                data = data_i + 1j*data_q
-                sp = np.fft.fft( data )
-
-                freq = np.fft.fftfreq(x_axis.shape[-1], sample_spacing*10**(-3))
-                i = np.argsort(freq)
-
-                return freq[i], np.abs( sp[i] )
-
-            elif re == 'True':
-                data = data_i + 1j*data_q
-
-                if len( data_i.shape ) == 1:
-                    sp = np.fft.fft( data )
-                    freq = np.fft.fftfreq(x_axis.shape[-1], sample_spacing*10**(-3))
-                    i = np.argsort(freq)
-
-                    sp.real = sp.real[i]
-                    sp.imag = sp.imag[i]
-
-                    return freq[i], sp.real, sp.imag
-
-                else:
-                    sp = np.fft.fft( data, axis = 1 )
-                    freq = np.fft.fftfreq(x_axis.shape[-1], sample_spacing*10**(-3))
-                    i = np.argsort(freq)
+        data = data_i + 1j*data_q
+        data = data*np.exp( 1j*cor1 + 1j*cor2*freq + 1j*cor3*freq*freq )
+        if len( data.shape ) == 1:
+            return np.array( (data.real, data.imag) )
+        else:
+            return np.array( (np.transpose( data.real ), np.transpose( data.imag )) )
+
+    def fft(self, x_axis, data_i, data_q, sample_spacing, re = 'False', axis = -1, workers = None):
+        """
+        FFT of data_i + 1j*data_q along the axis; any number of traces
+        can be transformed at once as an N-D array.
+        Returns the sorted frequency axis and the absolute value of the spectrum
+        for re = 'False' or its real and imaginary parts for re = 'True'.
+        The frequency axis is cached.
+        """
+        if workers is None:
+            workers = self.workers
+
+        data = data_i + 1j*data_q
+        length = data.shape[axis]
+
+        if self.test_flag == 'test':
+            assert( np.shape(data_i) == np.shape(data_q) ), "Incorrect shape of the data"
+            assert( x_axis.shape[-1] == length ), "Incorrect length of the x axis"
+            assert( re == 'False' or re == 'True' ), "Incorrect re argument; should be 'True' or 'False'"
+
+        if workers is None:
+            sp = np.fft.fft( data, axis = axis )
+        else:
+            # scipy is imported only when multithreading is used
+            import scipy.fft
+            # data is a temporary array, so it can be overwritten
+            sp = scipy.fft.fft( data, axis = axis, overwrite_x = True, workers = workers )
 
-                    sp.real = sp.real[:,i]
-                    sp.imag = sp.imag[:,i]
+        freq = frequency_axis(length, sample_spacing)
+        sp = np.fft.fftshift( sp, axes = axis )
 
-                    return freq[i], sp.real, sp.imag
+        if re == 'False':
+            return freq, np.abs( sp )
+        elif re == 'True':
+            # views of the same complex array
+            return freq, sp.real, sp.imag
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
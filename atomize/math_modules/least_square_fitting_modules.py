@@ -1,21 +1,119 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import scipy
+import sys
 import numpy as np
-from scipy import optimize
+
+def fit_curves(model, x, curves, guesses):
+	"""
+	Fit of the curves one by one; used by math.batch_fit() in the worker processes
+	Output: parameters, their standard deviations and R^2 for each curve; NaN if the fit failed
+	"""
+	# scipy is imported only when fitting is used
+	from scipy.optimize import curve_fit
+
+	fitting = math()
+	function = getattr(fitting, model)
+	jacobian = getattr(fitting, model + '_jac')
+	bounds = fitting.models[model][1]
+
+	popt = np.full( guesses.shape, np.nan )
+	perr = np.full( guesses.shape, np.nan )
+	r_squared = np.full( len(curves), np.nan )
+
+	for i, y in enumerate(curves):
+		guess = guesses[i]
+		if np.any( np.isnan(guess) ):
+			guess = getattr(fitting, model + '_guess')(x, y)
+		try:
+			popt[i], pcov = curve_fit(function, x, y, p0 = guess, jac = jacobian, bounds = bounds)
+		except (RuntimeError, ValueError):
+			continue
+
+		perr[i] = np.sqrt( np.diag(pcov) )
+		ss_res = np.sum( (y - function(x, *popt[i]))**2 )
+		ss_tot = np.sum( (y - np.mean(y))**2 )
+		if ss_tot > 0:
+			r_squared[i] = 1 - (ss_res / ss_tot)
+
+	return popt, perr, r_squared
 
 class math():
 
+	# number of parameters and their bounds for the models;
+	# without bounds the faster Levenberg-Marquardt method is used
+	models = {'exponential': (3, (-np.inf, np.inf)),
+			  'stretched_exponential': (4, ([-np.inf, 0, 0, -np.inf], np.inf)),
+			  'bi_exponential': (5, (-np.inf, np.inf)), }
+
 	def __init__(self):
-		pass
+		# Test run parameters
+		if len(sys.argv) > 1:
+			self.test_flag = sys.argv[1]
+		else:
+			self.test_flag = 'None'
 
 	def exponential(self, x, a, k, b):
 		return a*np.exp(-x/k) + b
 
-	def one_exp_fit(self, curve, guess_array):
+	def exponential_jac(self, x, a, k, b):
+		e = np.exp(-x/k)
+		return np.column_stack( (e, a*e*x/k**2, np.ones_like(x)) )
+
+	def exponential_guess(self, x, y):
+		"""
+		Linearized guess: the offset is taken from the tail of the curve,
+		then log(|y - b|) is fitted by a straight line
+		"""
+		b = np.mean( y[-max(len(y)//10, 1):] )
+		z = y - b
+		sign = np.sign( z[np.argmax(np.abs(z))] ) or 1.
+		z = sign*z
+
+		# points too close to the offset are dominated by noise
+		mask = z > 0.1*np.max(z)
+		if np.count_nonzero(mask) > 1:
+			slope, intercept = np.polyfit(x[mask], np.log(z[mask]), 1, w = z[mask])
+			if slope < 0:
+				return np.array( (sign*np.exp(intercept), -1/slope, b) )
+
+		return np.array( (y[0] - b, max(abs(x[-1] - x[0])/3, np.finfo(float).eps), b) )
+
+	def stretched_exponential(self, x, a, k, beta, b):
+		return a*np.exp(-(x/k)**beta) + b
+
+	def stretched_exponential_jac(self, x, a, k, beta, b):
+		t = x/k
+		u = t**beta
+		e = np.exp(-u)
+		# u*log(t) -> 0 for t -> 0
+		log_t = np.log( np.where(t > 0, t, 1.) )
+		return np.column_stack( (e, a*e*u*beta/k, -a*e*u*log_t, np.ones_like(x)) )
+
+	def stretched_exponential_guess(self, x, y):
+		a, k, b = self.exponential_guess(x, y)
+		return np.array( (a, k, 1., b) )
 
-		popt_exp, pcov_exp = scipy.optimize.curve_fit(self.exponential, curve[0], curve[1], p0=guess_array)
+	def bi_exponential(self, x, a1, k1, a2, k2, b):
+		return a1*np.exp(-x/k1) + a2*np.exp(-x/k2) + b
+
+	def bi_exponential_jac(self, x, a1, k1, a2, k2, b):
+		e1 = np.exp(-x/k1)
+		e2 = np.exp(-x/k2)
+		return np.column_stack( (e1, a1*e1*x/k1**2, e2, a2*e2*x/k2**2, np.ones_like(x)) )
+
+	def bi_exponential_guess(self, x, y):
+		a, k, b = self.exponential_guess(x, y)
+		return np.array( (a/2, k/3, a/2, 3*k, b) )
+
+	def one_exp_fit(self, curve, guess_array = None):
+		# scipy is imported only when fitting is used
+		from scipy.optimize import curve_fit
+
+		if guess_array is None:
+			guess_array = self.exponential_guess(curve[0], curve[1])
+
+		popt_exp, pcov_exp = curve_fit(self.exponential, curve[0], curve[1], p0=guess_array, jac=self.exponential_jac)
 		    
 		axis_y_exp = self.exponential(curve[0], popt_exp[0], popt_exp[1], popt_exp[2])
 		model_data = np.transpose(np.column_stack((curve[0], axis_y_exp)))
@@ -27,5 +125,58 @@ class math():
 
 		return model_data, residuals, r_squared
 
+	def batch_fit(self, x_axis, curves, model = 'exponential', guess_array = None, processes = 1, chunk = 64):
+		"""
+		Fit of a stack of curves, i.e. one curve per field point or per pixel of a 2D scan.
+		curves is an array with the last axis of the same length as x_axis;
+		model is 'exponential', 'stretched_exponential' or 'bi_exponential';
+		guess_array is None (linearized guess for each curve), one guess for all the curves
+		or one guess per curve. By default the curves are fitted in the calling process;
+		processes > 1 (or None for all the CPU cores) fits them in chunks by a pool of processes.
+		The pool is started by fork where it is available (Linux, macOS). Otherwise (Windows)
+		each worker imports the script again, so the script has to be guarded by
+		if __name__ == '__main__':. The pool is not used in the test run.
+		Output: parameters, their standard deviations and R^2 with the shape of the stack;
+		NaN for the curves that could not be fitted.
+		"""
+		assert(model in self.models), f"Incorrect model; should be one of {', '.join(self.models)}"
+
+		x = np.asarray(x_axis, dtype = np.float64)
+		curves = np.asarray(curves, dtype = np.float64)
+		shape = curves.shape[:-1]
+		assert(curves.shape[-1] == len(x)), "Incorrect length of the curves"
+		curves = curves.reshape(-1, len(x))
+
+		parameters = self.models[model][0]
+		if guess_array is None:
+			guesses = np.full( (len(curves), parameters), np.nan )
+		else:
+			guesses = np.broadcast_to( np.asarray(guess_array, dtype = np.float64).reshape(-1, parameters), \
+									   (len(curves), parameters) )
+
+		if processes == 1 or len(curves) <= chunk or self.test_flag == 'test':
+			popt, perr, r_squared = fit_curves(model, x, curves, guesses)
+		else:
+			import multiprocessing
+			from itertools import repeat
+			from concurrent.futures import ProcessPoolExecutor
+
+			# fork does not run the script again in the workers
+			if 'fork' in multiprocessing.get_all_start_methods():
+				context = multiprocessing.get_context('fork')
+			else:
+				context = multiprocessing.get_context()
+
+			starts = range(0, len(curves), chunk)
+			with ProcessPoolExecutor(max_workers = processes, mp_context = context) as pool:
+				results = list( pool.map(fit_curves, repeat(model), repeat(x), \
+								[curves[i:i + chunk] for i in starts], [guesses[i:i + chunk] for i in starts]) )
+
+			popt = np.concatenate( [result[0] for result in results] )
+			perr = np.concatenate( [result[1] for result in results] )
+			r_squared = np.concatenate( [result[2] for result in results] )
+
+		return popt.reshape(shape + (parameters,)), perr.reshape(shape + (parameters,)), r_squared.reshape(shape)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup time of experimental scripts.
+The import statements of each script are run by 'python -X importtime' in the test mode,
+as it is done in the test run. The total import time and the slowest modules are printed.
+Usage: python3 startup_time_test.py [script.py ...]
+"""
+
+import os
+import sys
+import ast
+import time
+import subprocess
+
+path_to_tests = os.path.dirname(os.path.abspath(__file__))
+path_to_main = os.path.abspath(os.path.join(path_to_tests, '..', '..'))
+
+# typical scripts
+scripts = ['pulse_epr/01_resonator_tuning.py', 'pulse_epr/02_t2.py', 'CuPr_experiment.py',
+           'liveplot_2D_test.py', 'math_test.py']
+# number of the slowest modules to print
+slowest = 5
+
+def script_imports(script):
+    """
+    Import statements of the script as a source code
+    """
+    with open(script) as file:
+        tree = ast.parse(file.read())
+
+    return '\n'.join( ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)) )
+
+def import_time(code):
+    """
+    Run the code by 'python -X importtime' in the test mode
+    Output: wall time in s; list of (cumulative time in us, module) for the top level imports; error
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = path_to_main + os.pathsep + env.get('PYTHONPATH', '')
+
+    start_time = time.time()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import sys; sys.argv.append("test")\n' + code],
+                            capture_output = True, text = True, env = env)
+    wall_time = time.time() - start_time
+
+    top_level = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        # nested imports are indented
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            top_level.append( (int(cumulative), name.strip()) )
+
+    error = ''
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1]
+
+    return wall_time, top_level, error
+
+def main():
+    for script in (sys.argv[1:] or [os.path.join(path_to_tests, name) for name in scripts]):
+        wall_time, top_level, error = import_time( script_imports(script) )
+        total = sum( cumulative for cumulative, name in top_level )
+
+        print(os.path.relpath(script, path_to_tests) + ': imports ' + str(round(total / 1000, 1)) + ' ms; process ' + \
+              str(round(wall_time * 1000, 1)) + ' ms')
+        for cumulative, name in sorted(top_level, reverse = True)[:slowest]:
+            print('    ' + str(round(cumulative / 1000, 1)).rjust(8) + ' ms  ' + name)
+        if error != '':
+            print('    ' + error)
+
+if __name__ == "__main__":
+    main()